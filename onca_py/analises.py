@@ -0,0 +1,249 @@
+"""
+Cache persistente de análises, compartilhado entre partidas e processos
+
+Guarda em um banco SQLite o resultado das buscas (profundidade, tipo de
+limite, valor e melhor movimento) por posição. A chave é a mesma da tabela
+de transposição (chave Zobrist combinada com o lado a jogar), estável entre
+execuções porque as chaves Zobrist saem de uma semente fixa; como os valores
+da busca são do ponto de vista de quem maximiza, o lado que maximiza também
+faz parte da chave, assim como a configuração da busca (as opções que mudam
+o resultado, como a busca seletiva): uma análise só é aproveitada por uma
+busca configurada do mesmo jeito.
+
+O banco fica em modo WAL: vários processos do jogador leem ao mesmo tempo
+enquanto um deles grava. As gravações vão para uma fila e são feitas em
+lotes por uma thread, fora do caminho da busca. Acima de max_entradas, as
+análises usadas há mais tempo são descartadas: toda gravação renova o
+horário da análise, mesmo quando não a substitui por ser mais rasa, e uma
+análise reaproveitada é regravada, então as posições que se repetem ficam.
+
+BuscaAdversarial consulta o cache antes de buscar a raiz, carrega as
+análises mais profundas na tabela de transposição na primeira busca de
+cada lado e grava as posições da variação principal ao fim de cada busca.
+"""
+
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from jogo import codificar_movimento, decodificar_movimento
+
+# Máximo padrão de análises no banco e espera por um banco travado (s)
+LIMITE_ENTRADAS = 1_000_000
+ESPERA_TRAVA = 5.0
+
+# Gravações acumuladas antes de descartar as análises mais antigas
+INTERVALO_DESCARTE = 1000
+
+# Versão do esquema (PRAGMA user_version); um banco de outra versão é recriado
+VERSAO_ESQUEMA = 2
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS analises (
+    chave INTEGER NOT NULL,
+    lado_max TEXT NOT NULL,
+    configuracao TEXT NOT NULL,
+    profundidade INTEGER NOT NULL,
+    tipo INTEGER NOT NULL,
+    valor,
+    movimento INTEGER,
+    gravado REAL NOT NULL,
+    PRIMARY KEY (chave, lado_max, configuracao)
+);
+CREATE INDEX IF NOT EXISTS analises_gravado ON analises (gravado);
+"""
+
+# Uma análise só substitui outra de profundidade menor ou igual, mas o
+# horário é sempre renovado (o descarte é dos menos usados)
+_GRAVAR = """
+INSERT INTO analises (chave, lado_max, configuracao, profundidade, tipo, valor,
+                      movimento, gravado)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (chave, lado_max, configuracao) DO UPDATE SET
+    profundidade = CASE WHEN excluded.profundidade >= analises.profundidade
+                        THEN excluded.profundidade ELSE analises.profundidade END,
+    tipo = CASE WHEN excluded.profundidade >= analises.profundidade
+                THEN excluded.tipo ELSE analises.tipo END,
+    valor = CASE WHEN excluded.profundidade >= analises.profundidade
+                 THEN excluded.valor ELSE analises.valor END,
+    movimento = CASE WHEN excluded.profundidade >= analises.profundidade
+                     THEN excluded.movimento ELSE analises.movimento END,
+    gravado = excluded.gravado
+"""
+
+_FIM = object()  # Marca de fim da fila de gravação
+
+
+def _com_sinal(x):
+    """Converte um inteiro de 64 bits sem sinal para o INTEGER do SQLite"""
+    return x - (1 << 64) if x >= 1 << 63 else x
+
+
+def _sem_sinal(x):
+    """Inverso de _com_sinal"""
+    return x + (1 << 64) if x < 0 else x
+
+
+class CacheAnalises:
+    """Cache de análises em SQLite (modo WAL) com gravação assíncrona"""
+
+    def __init__(self, caminho, max_entradas=LIMITE_ENTRADAS):
+        """
+        Args:
+            caminho: Arquivo do banco (criado se não existir)
+            max_entradas: Limite de análises guardadas
+        """
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.consultas = 0
+        self.acertos = 0
+        self.gravacoes = 0
+
+        # Conexão de leitura, usada pela busca (e pela thread de ponderação)
+        self._conexao = sqlite3.connect(caminho, timeout=ESPERA_TRAVA,
+                                        check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        versao = self._conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao != VERSAO_ESQUEMA:
+            # Análises de outro esquema não dizem com que busca foram feitas
+            with self._conexao:
+                self._conexao.execute("DROP TABLE IF EXISTS analises")
+                self._conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+        self._conexao.executescript(_ESQUEMA)
+        self._trava = threading.Lock()
+
+        self._fila = queue.Queue()
+        self._escritor = threading.Thread(target=self._gravar_lotes, daemon=True)
+        self._escritor.start()
+
+    def consultar(self, chave, lado_max, configuracao):
+        """
+        Procura a análise de uma posição feita com a configuração dada
+
+        Returns:
+            Tupla (profundidade, tipo, valor, movimento) ou None
+        """
+        self.consultas += 1
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT profundidade, tipo, valor, movimento FROM analises "
+                "WHERE chave = ? AND lado_max = ? AND configuracao = ?",
+                (_com_sinal(chave), lado_max, configuracao),
+            ).fetchone()
+        if linha is None:
+            return None
+        self.acertos += 1
+        profundidade, tipo, valor, movimento = linha
+        if movimento is not None:
+            movimento = decodificar_movimento(_sem_sinal(movimento))
+        return profundidade, tipo, valor, movimento
+
+    def mais_profundas(self, lado_max, configuracao, limite):
+        """
+        Itera as `limite` análises mais profundas de um lado e configuração
+
+        Yields:
+            Tuplas (chave, profundidade, tipo, valor, movimento)
+        """
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT chave, profundidade, tipo, valor, movimento FROM analises "
+                "WHERE lado_max = ? AND configuracao = ? "
+                "ORDER BY profundidade DESC LIMIT ?",
+                (lado_max, configuracao, limite),
+            ).fetchall()
+        for chave, profundidade, tipo, valor, movimento in linhas:
+            if movimento is not None:
+                movimento = decodificar_movimento(_sem_sinal(movimento))
+            yield _sem_sinal(chave), profundidade, tipo, valor, movimento
+
+    def gravar(self, chave, lado_max, configuracao, profundidade, tipo, valor, movimento):
+        """Enfileira uma análise; a gravação é feita pela thread escritora"""
+        codigo = None if movimento is None else _com_sinal(codificar_movimento(movimento))
+        self._fila.put((_com_sinal(chave), lado_max, configuracao, profundidade, tipo,
+                        valor, codigo, time.time()))
+
+    def _gravar_lotes(self):
+        """Corpo da thread escritora: grava a fila em lotes"""
+        conexao = sqlite3.connect(self.caminho, timeout=ESPERA_TRAVA)
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        desde_descarte = 0
+        fim = False
+        while not fim:
+            lote = [self._fila.get()]
+            while True:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            if lote[-1] is _FIM:
+                lote.pop()
+                fim = True
+
+            if lote:
+                try:
+                    with conexao:
+                        conexao.executemany(_GRAVAR, lote)
+                except sqlite3.OperationalError as e:
+                    # Banco travado por outro processo além da espera: o
+                    # cache é só uma otimização, o lote é descartado
+                    print(f"Cache de análises: lote descartado ({e})", file=sys.stderr)
+                    continue
+                self.gravacoes += len(lote)
+                desde_descarte += len(lote)
+
+            if desde_descarte >= INTERVALO_DESCARTE or (fim and desde_descarte):
+                self._descartar(conexao)
+                desde_descarte = 0
+        conexao.close()
+
+    def _descartar(self, conexao):
+        """Remove as análises gravadas há mais tempo acima de max_entradas"""
+        total = conexao.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            with conexao:
+                conexao.execute(
+                    "DELETE FROM analises WHERE rowid IN "
+                    "(SELECT rowid FROM analises ORDER BY gravado LIMIT ?)",
+                    (excesso,),
+                )
+
+    def num_entradas(self):
+        """Número de análises no banco (sem as que ainda estão na fila)"""
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+
+    def fechar(self):
+        """Grava o que está na fila e fecha o banco"""
+        if self._escritor is None:
+            return
+        self._fila.put(_FIM)
+        self._escritor.join()
+        self._escritor = None
+        with self._trava:
+            self._conexao.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Formato: python analises.py analises.db")
+        sys.exit(1)
+
+    cache = CacheAnalises(sys.argv[1])
+    with cache._trava:
+        linhas = cache._conexao.execute(
+            "SELECT configuracao, lado_max, profundidade, COUNT(*) FROM analises "
+            "GROUP BY configuracao, lado_max, profundidade "
+            "ORDER BY configuracao, lado_max, profundidade"
+        ).fetchall()
+    print(f"{cache.num_entradas()} análises em {cache.caminho}")
+    for configuracao, lado_max, profundidade, quantidade in linhas:
+        print(f"  busca {configuracao}, lado {lado_max}, profundidade {profundidade}: {quantidade}")
+    cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
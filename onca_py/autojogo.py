@@ -0,0 +1,210 @@
+"""
+Autojogo sem Redis - partidas IA vs IA em paralelo
+
+Joga muitas partidas completas usando EstadoJogo/BuscaAdversarial
+diretamente, distribuídas entre processos. Cada partida tem sua própria
+semente (que também sorteia os primeiros lances, para variar as aberturas)
+e é gravada como uma linha JSON assim que termina. Partidas já presentes
+no arquivo de saída são puladas, então uma execução interrompida continua
+de onde parou. O fim de cada partida é decidido por controlador.vitoria,
+testando só o lado que jogou, como nas partidas do controlador.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from jogo_bitboard import EstadoBitboard
+from busca import BuscaAdversarial
+from controlador import vitoria
+
+OUTRO = lambda l: 'c' if l == 'o' else 'o'
+
+
+def jogar_partida(id_jogo, semente, profundidade=3, tempo_limite=None,
+                  lances_aleatorios=4, max_jogadas=100, lado_inicial='o'):
+    """
+    Joga uma partida completa IA vs IA
+
+    Args:
+        id_jogo: Identificador da partida no arquivo de saída
+        semente: Semente dos lances aleatórios de abertura
+        profundidade: Profundidade máxima da busca de cada lado
+        tempo_limite: Tempo limite por jogada em segundos (None = sem limite)
+        lances_aleatorios: Quantos lances iniciais são sorteados
+        max_jogadas: Número máximo de jogadas (como no controlador)
+        lado_inicial: Lado que começa
+
+    Returns:
+        Dicionário com os movimentos (formato de movimento_para_string),
+        o resultado e, por jogada, os nós explorados e o tempo gasto
+    """
+    rng = random.Random(semente)
+    estado = EstadoBitboard()
+    buscas = {
+        lado: BuscaAdversarial(profundidade_maxima=profundidade,
+                               tempo_limite=tempo_limite, memoria_tt_mb=8)
+        for lado in ('o', 'c')
+    }
+
+    lado = lado_inicial
+    movimentos, nos, tempos = [], [], []
+    resultado = 'empate'
+
+    for jogada in range(max_jogadas):
+        inicio = time.time()
+        possiveis = estado.gerar_movimentos(lado)
+        if not possiveis:
+            movimento = None
+            nos_jogada = 0
+        elif jogada < lances_aleatorios:
+            movimento = rng.choice(possiveis)
+            nos_jogada = 0
+        else:
+            movimento = buscas[lado].melhor_movimento(estado, lado)
+            nos_jogada = buscas[lado].nos_explorados
+
+        if movimento is None:
+            movimentos.append(f"{lado} n")
+        else:
+            movimentos.append(estado.movimento_para_string(lado, movimento))
+            estado.fazer_movimento(lado, movimento)
+        nos.append(nos_jogada)
+        tempos.append(round(time.time() - inicio, 4))
+
+        # Adjudica como o controlador: só quem jogou é testado, e com a regra
+        # dele (que para a onça olha só os 9 deslocamentos de vitoria)
+        if vitoria(lado, estado.para_string()):
+            resultado = lado
+            break
+
+        lado = OUTRO(lado)
+
+    return {
+        'jogo': id_jogo,
+        'semente': semente,
+        'profundidade': profundidade,
+        'resultado': resultado,
+        'movimentos': movimentos,
+        'nos': nos,
+        'tempos': tempos,
+    }
+
+
+def _fim_ultima_linha(arquivo, bloco=1 << 16):
+    """
+    Posição logo depois do último b'\\n' do arquivo (0 se não houver)
+
+    Lê de trás para frente em blocos de tamanho fixo, sem carregar o arquivo.
+    """
+    fim = arquivo.seek(0, os.SEEK_END)
+    while fim > 0:
+        inicio = max(0, fim - bloco)
+        arquivo.seek(inicio)
+        pos = arquivo.read(fim - inicio).rfind(b'\n')
+        if pos >= 0:
+            return inicio + pos + 1
+        fim = inicio
+    return 0
+
+
+def jogos_concluidos(caminho):
+    """
+    Lê o arquivo de saída e retorna os ids das partidas já gravadas
+
+    Uma última linha incompleta (execução interrompida durante a escrita)
+    é descartada do arquivo para que novas linhas não fiquem corrompidas.
+    """
+    concluidos = set()
+    if not os.path.exists(caminho):
+        return concluidos
+
+    with open(caminho, 'rb+') as arquivo:
+        fim_valido = _fim_ultima_linha(arquivo)
+        if fim_valido < arquivo.seek(0, os.SEEK_END):
+            arquivo.truncate(fim_valido)
+
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                concluidos.add(json.loads(linha)['jogo'])
+            except (ValueError, KeyError):
+                continue
+
+    return concluidos
+
+
+def executar(caminho_saida, num_jogos, processos=None, profundidade=3,
+             lances_aleatorios=4, semente_base=0, tempo_limite=None,
+             max_jogadas=100):
+    """
+    Joga num_jogos partidas em paralelo gravando cada uma ao terminar
+
+    No máximo 2 partidas por processo ficam pendentes ao mesmo tempo, então
+    a memória usada não cresce com o número de partidas.
+
+    Returns:
+        Número de partidas jogadas nesta execução
+    """
+    processos = processos or os.cpu_count() or 1
+    concluidos = jogos_concluidos(caminho_saida)
+    a_jogar = (i for i in range(num_jogos) if i not in concluidos)
+    max_pendentes = 2 * processos
+    jogadas = 0
+
+    with ProcessPoolExecutor(max_workers=processos) as executor, \
+            open(caminho_saida, 'a', encoding='utf-8') as saida:
+        pendentes = set()
+
+        while True:
+            for id_jogo in a_jogar:
+                pendentes.add(executor.submit(
+                    jogar_partida, id_jogo, semente_base + id_jogo, profundidade,
+                    tempo_limite, lances_aleatorios, max_jogadas
+                ))
+                if len(pendentes) >= max_pendentes:
+                    break
+
+            if not pendentes:
+                break
+
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                registro = futuro.result()
+                saida.write(json.dumps(registro, separators=(',', ':')) + '\n')
+                saida.flush()
+                jogadas += 1
+                print(f"Partida {registro['jogo']}: {registro['resultado']} "
+                      f"({len(registro['movimentos'])} jogadas)", file=sys.stderr)
+
+    return jogadas
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Formato: python autojogo.py saida.jsonl jogos [processos profundidade aleatorios semente]")
+        print("  saida.jsonl: arquivo de saída (uma partida por linha; retoma se existir)")
+        print("  jogos: número total de partidas")
+        print("  processos: (opcional) processos em paralelo (padrão: número de CPUs)")
+        print("  profundidade: (opcional) profundidade da busca (padrão: 3)")
+        print("  aleatorios: (opcional) lances iniciais sorteados (padrão: 4)")
+        print("  semente: (opcional) semente base das partidas (padrão: 0)")
+        sys.exit(1)
+
+    caminho = sys.argv[1]
+    num_jogos = int(sys.argv[2])
+    processos = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    profundidade = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+    aleatorios = int(sys.argv[5]) if len(sys.argv) > 5 else 4
+    semente = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+
+    inicio = time.time()
+    jogadas = executar(caminho, num_jogos, processos, profundidade, aleatorios, semente)
+    print(f"{jogadas} partidas em {time.time() - inicio:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
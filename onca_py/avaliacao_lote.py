@@ -0,0 +1,192 @@
+"""
+Avaliação em lote com NumPy - mesma heurística de BuscaAdversarial._avaliar
+
+Um lote de tabuleiros é codificado como duas matrizes 0/1 (uma linha por
+tabuleiro, uma coluna por casa, na ordem de CASAS): cachorros e onça. Os
+termos da heurística saem de produtos com matrizes de adjacência:
+
+    vizinhos ocupados por cachorros = (onca @ ADJ) * cachorros
+    conexões entre cachorros        = (cachorros @ ADJ) * cachorros
+    passos livres da onça           = (onca @ PASSOS) * vazias
+
+Os saltos da onça (inclusive os encadeados, que contam um movimento por
+prefixo, como em gerar_movimentos) são expandidos nível a nível para o
+lote inteiro. Os valores são idênticos aos da versão escalar, inclusive na
+avaliação dos cachorros: todos os termos são inteiros (exatos em qualquer
+ordem), menos o cerco, que nas duas versões é somado por último.
+
+NumPy é opcional: sem ele NUMPY_DISPONIVEL é False e a busca usa apenas a
+avaliação escalar.
+"""
+
+from jogo import EstadoJogo, CASAS, INDICE, PASSOS, SALTOS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+NUMPY_DISPONIVEL = np is not None
+
+VITORIA = 10000
+
+
+def bits_estado(estado):
+    """Bits (cachorros, onca) de um EstadoJogo ou EstadoBitboard"""
+    if hasattr(estado, 'cachorros'):
+        return estado.cachorros, estado.onca
+    cachorros = onca = 0
+    for pos, peca in estado.tabuleiro.items():
+        if peca == 'c':
+            cachorros |= 1 << INDICE[pos]
+        elif peca == 'o':
+            onca |= 1 << INDICE[pos]
+    return cachorros, onca
+
+
+class AvaliadorLote:
+    """Avalia lotes de posições com a heurística de BuscaAdversarial"""
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("AvaliadorLote requer NumPy")
+
+        n = len(CASAS)
+        self.adjacencia = np.zeros((n, n), dtype=np.int64)
+        self.passos = np.zeros((n, n), dtype=np.int64)
+        for i, pos in enumerate(CASAS):
+            for vizinho in EstadoJogo.ADJACENCIAS[pos]:
+                self.adjacencia[i, INDICE[vizinho]] = 1
+            for destino in PASSOS[pos]:
+                self.passos[i, INDICE[destino]] = 1
+        self.num_vizinhos = self.adjacencia.sum(axis=1)
+
+        # Saltos de cada casa, completados até o maior número de saltos
+        max_saltos = max(len(SALTOS[pos]) for pos in CASAS)
+        self.salto_meio = np.zeros((n, max_saltos), dtype=np.int64)
+        self.salto_destino = np.zeros((n, max_saltos), dtype=np.int64)
+        self.salto_existe = np.zeros((n, max_saltos), dtype=bool)
+        for i, pos in enumerate(CASAS):
+            for k, (meio, destino) in enumerate(SALTOS[pos]):
+                self.salto_meio[i, k] = INDICE[meio]
+                self.salto_destino[i, k] = INDICE[destino]
+                self.salto_existe[i, k] = True
+
+        # Termos de posição da onça e avanço dos cachorros por casa
+        self.posicao_onca = np.array(
+            [(5 - abs(c - 3)) * 15 + l * 8 for l, c in CASAS], dtype=np.int64
+        )
+        self.peso_avanco = np.array(
+            [(l - 3) * 15 if l >= 4 else 0 for l, c in CASAS], dtype=np.int64
+        )
+        self._colunas = np.arange(n, dtype=np.int64)
+
+    def _movimentos_onca(self, cachorros, onca, vazias_bits, x_onca, x_vazias):
+        """
+        Conta os movimentos da onça de cada tabuleiro
+
+        Returns:
+            Tupla (total, saltos) de arrays com um valor por tabuleiro
+        """
+        tamanho = len(cachorros)
+        passos = ((x_onca @ self.passos) * x_vazias).sum(axis=1)
+        saltos = np.zeros(tamanho, dtype=np.int64)
+
+        # Caminhos em aberto: tabuleiro, casa atual e cachorros já saltados
+        tabuleiros = np.nonzero(onca)[0]
+        casas = np.argmax(x_onca[tabuleiros], axis=1)
+        capturados = np.zeros(len(tabuleiros), dtype=np.int64)
+
+        while len(tabuleiros):
+            meio = self.salto_meio[casas]
+            destino = self.salto_destino[casas]
+            validos = (
+                self.salto_existe[casas]
+                & ((cachorros[tabuleiros, None] >> meio) & 1).astype(bool)
+                & ~((capturados[:, None] >> meio) & 1).astype(bool)
+                & ((vazias_bits[tabuleiros, None] >> destino) & 1).astype(bool)
+            )
+            linhas, k = np.nonzero(validos)
+            tabuleiros = tabuleiros[linhas]
+            capturados = capturados[linhas] | (np.int64(1) << meio[linhas, k])
+            casas = destino[linhas, k]
+            saltos += np.bincount(tabuleiros, minlength=tamanho)
+
+        return passos + saltos, saltos
+
+    def avaliar(self, posicoes, lado):
+        """
+        Avalia um lote de posições
+
+        Args:
+            posicoes: Sequência de pares de bits (cachorros, onca)
+            lado: Lado que está maximizando
+
+        Returns:
+            Lista de valores, igual a [_avaliar(estado, lado) for ...]
+        """
+        if not posicoes:
+            return []
+
+        cachorros = np.array([p[0] for p in posicoes], dtype=np.int64)
+        onca = np.array([p[1] for p in posicoes], dtype=np.int64)
+        todas = (np.int64(1) << len(CASAS)) - 1
+        vazias_bits = todas & ~(cachorros | onca)
+
+        x_cachorros = (cachorros[:, None] >> self._colunas) & 1
+        x_onca = (onca[:, None] >> self._colunas) & 1
+        x_vazias = (vazias_bits[:, None] >> self._colunas) & 1
+
+        num_cachorros = x_cachorros.sum(axis=1)
+        movimentos, saltos = self._movimentos_onca(
+            cachorros, onca, vazias_bits, x_onca, x_vazias
+        )
+        proximos = ((x_onca @ self.adjacencia) * x_cachorros).sum(axis=1)
+        tem_onca = onca != 0
+
+        if lado == 'o':
+            valores = self._avaliar_onca(num_cachorros, movimentos, saltos,
+                                         proximos, x_onca)
+        else:
+            valores = self._avaliar_cachorros(num_cachorros, movimentos, proximos,
+                                              tem_onca, x_onca, x_cachorros)
+
+        # Vitórias, na ordem de EstadoJogo.vencedor
+        vence_onca = num_cachorros <= 9
+        vence_cachorros = ~vence_onca & (movimentos == 0)
+        resultado = valores.tolist()
+        ganho, perda = (VITORIA, -VITORIA) if lado == 'o' else (-VITORIA, VITORIA)
+        for i in np.nonzero(vence_onca)[0].tolist():
+            resultado[i] = ganho
+        for i in np.nonzero(vence_cachorros)[0].tolist():
+            resultado[i] = perda
+        return resultado
+
+    def _avaliar_onca(self, num_cachorros, movimentos, saltos, proximos, x_onca):
+        """Termos de BuscaAdversarial._avaliar_onca (todos inteiros)"""
+        score = (14 - num_cachorros) * 500
+        score += np.where(num_cachorros <= 11, (11 - num_cachorros) * 200, 0)
+        score += movimentos * 10
+        score += x_onca @ self.posicao_onca
+        score += saltos * 100
+        score -= np.where(movimentos <= 2, 100, 0)
+        score -= np.where(movimentos == 0, 5000, 0)
+        score -= proximos * 20
+        return score
+
+    def _avaliar_cachorros(self, num_cachorros, movimentos, proximos, tem_onca,
+                           x_onca, x_cachorros):
+        """Termos de BuscaAdversarial._avaliar_cachorros (o cerco por último, como lá)"""
+        score = num_cachorros * 300
+        score -= np.where(num_cachorros <= 11, (11 - num_cachorros) * 400, 0)
+        score += (20 - movimentos) * 50
+        score += np.where(movimentos == 0, 10000, np.where(movimentos <= 2, 500, 0))
+        score += proximos * 80
+        conexoes = ((x_cachorros @ self.adjacencia) * x_cachorros).sum(axis=1)
+        score += conexoes * 5 + x_cachorros @ self.peso_avanco
+
+        # O cerco, único termo fracionário, vai por último, como na escalar
+        total_adjacentes = x_onca @ self.num_vizinhos
+        proporcao = np.divide(proximos, total_adjacentes,
+                              out=np.zeros(len(proximos)), where=tem_onca)
+        return score.astype(np.float64) + proporcao * 200
@@ -3,31 +3,207 @@ Módulo de busca adversarial - Implementa o algoritmo Minimax com podas Alfa-Bet
 """
 
 import time
-from jogo import EstadoJogo
+from jogo import EstadoJogo, ZOBRIST_LADO, SALTOS, CASAS
+from jogo_bitboard import VIZINHOS
+from transposicao import (TabelaTransposicao, EXATO, LIMITE_INFERIOR,
+                          LIMITE_SUPERIOR)
+from avaliacao_lote import AvaliadorLote, NUMPY_DISPONIVEL, bits_estado
+
+# Meia largura da janela de aspiração em torno do valor da iteração anterior
+JANELA_ASPIRACAO = 50
+
+# Pesos das heurísticas dinâmicas de ordenação. Uma captura vale 1000
+# menos até 50 pela distância ao centro, então a soma dos bônus dinâmicos
+# fica limitada a LIMITE_DINAMICO, abaixo de qualquer captura
+BONUS_ASSASSINO = 900
+LIMITE_HISTORICO = 700
+LIMITE_DINAMICO = 900
+
+# Orçamento padrão de nós da busca de quiescência por chamada de melhor_movimento
+LIMITE_QUIESCENCIA = 200000
+
+# Busca seletiva: movimentos buscados por inteiro antes de reduzir,
+# redução do movimento nulo, mobilidade mínima da onça para passar a vez
+# e margem da poda de futilidade
+MOVIMENTOS_SEM_REDUCAO = 3
+REDUCAO_NULO = 2
+MOBILIDADE_MINIMA_NULO = 3
+MARGEM_FUTILIDADE = 300
+
+# Nós entre duas consultas ao relógio e valor a partir do qual a vitória
+# está garantida (as heurísticas ficam bem abaixo de 10000)
+INTERVALO_RELOGIO = 1024
+LIMIAR_VITORIA = 9000
+
+# Máximo de análises do cache persistente carregadas na tabela de transposição
+LIMITE_SEMENTE_ANALISES = 100000
+
+# Máximo de avaliações em lote guardadas antes de esvaziar o cache
+LIMITE_CACHE_AVALIACOES = 1 << 16
+
+# Termos da avaliação por casa (índice de CASAS), para a avaliação incremental
+POSICAO_ONCA = tuple((5 - abs(c - 3)) * 15 + l * 8 for l, c in CASAS)
+NUM_VIZINHOS = tuple(mascara.bit_count() for mascara in VIZINHOS)
+
+# Contadores zerados a cada busca (somados entre processos na busca paralela)
+CONTADORES = (
+    'nos_explorados', 'cortes_alfa', 'cortes_beta', 'acertos_finais',
+    'cortes_primeiro_movimento', 'nos_quiescencia', 'reducoes',
+    'reducoes_refeitas', 'cortes_nulos', 'podas_futilidade', 'avaliacoes_lote',
+    'acertos_analises',
+)
 
 class BuscaAdversarial:
     """Implementa busca Minimax com poda Alfa-Beta"""
     
-    def __init__(self, profundidade_maxima=4, tempo_limite=None):
+    def __init__(self, profundidade_maxima=4, tempo_limite=None, memoria_tt_mb=32,
+                 finais=None, quiescencia=True, limite_quiescencia=LIMITE_QUIESCENCIA,
+                 reducoes=True, movimento_nulo=True, futilidade=True,
+                 reprodutivel=False, avaliacao_lote=False, verificar_avaliacao=False,
+                 gerenciador_tempo=None, analises=None, telemetria=None):
         """
         Inicializa o algoritmo de busca
         
         Args:
             profundidade_maxima: Profundidade máxima da árvore de busca
             tempo_limite: Tempo limite em segundos (None = sem limite)
+            memoria_tt_mb: Limite de memória da tabela de transposição (MB)
+            finais: BaseFinais consultada como conhecimento perfeito (opcional)
+            quiescencia: Estende as folhas com as capturas pendentes da onça
+            limite_quiescencia: Máximo de nós de quiescência por busca
+            reducoes: Busca com profundidade reduzida os movimentos tardios
+            movimento_nulo: Poda pelo movimento nulo (passar a vez)
+            futilidade: Poda movimentos simples sem chance perto das folhas
+            reprodutivel: Desliga a busca seletiva e só aproveita análises da
+                tabela de transposição feitas na mesma profundidade; o valor
+                de cada profundidade passa a ser o do minimax, qualquer que
+                seja a ordem de busca ou o conteúdo da tabela (a busca
+                paralela usa isso para reproduzir a serial)
+            avaliacao_lote: Avalia os filhos dos nós de profundidade 1 de
+                uma vez com NumPy (ignorado se NumPy não estiver instalado)
+            verificar_avaliacao: Confere cada avaliação incremental com a
+                escalar (depuração; torna a busca mais lenta)
+            gerenciador_tempo: GerenciadorTempo já iniciado para a jogada;
+                substitui tempo_limite pelos seus prazos, para cedo com um
+                único movimento ou vitória forçada e estende o prazo suave
+                quando o melhor movimento muda
+            analises: CacheAnalises persistente, consultado antes de buscar a
+                raiz e gravado com a variação principal de cada busca
+            telemetria: TelemetriaBusca que registra, por jogada, nós,
+                ramificação e cortes por ply e o tempo de cada etapa
         """
         self.profundidade_maxima = profundidade_maxima
         self.tempo_limite = tempo_limite
+        self.gerenciador_tempo = gerenciador_tempo
         self.inicio_busca = None
+        self._interrompida = False
+        self._iniciar_relogio(None)
         self.nos_explorados = 0
         self.cortes_alfa = 0
         self.cortes_beta = 0
+        
+        # A tabela sobrevive entre chamadas de melhor_movimento; os valores
+        # são do ponto de vista de lado_max, então ela é limpa se ele mudar
+        self.tabela = TabelaTransposicao(memoria_tt_mb)
+        self._lado_tabela = None
+        self.finais = finais
+        self.analises = analises
+        
+        # Resultado da última iteração completa
+        self.profundidade_completa = 0
+        self.valor_raiz = None
+        self.variacao_principal = []
+        self.falhas_aspiracao = 0
+        
+        # Ordenação dinâmica: assassinos por ply e histórico de cortes por
+        # (lado, origem, destino)
+        self.assassinos = []
+        self.historico = {}
+        
+        self.usar_quiescencia = quiescencia
+        self.limite_quiescencia = limite_quiescencia
+        
+        self._seletiva = (reducoes, movimento_nulo, futilidade)
+        self._configurar_selecao(reprodutivel)
+        self._em_movimento_nulo = False
+        
+        # Valores das folhas avaliadas em lote, por chave Zobrist (valem
+        # enquanto lado_max não muda)
+        self.avaliador_lote = None
+        if avaliacao_lote and NUMPY_DISPONIVEL:
+            self.avaliador_lote = AvaliadorLote()
+        self._avaliacoes = {}
+        self.verificar_avaliacao = verificar_avaliacao
+        self._zerar_contadores()
+        
+        self.telemetria = telemetria
+        if telemetria is not None:
+            telemetria.instrumentar(self)
+    
+    def _configurar_selecao(self, reprodutivel):
+        """Liga a busca reprodutível ou volta à busca seletiva configurada"""
+        self.reprodutivel = reprodutivel
+        if reprodutivel:
+            self.usar_reducoes = self.usar_movimento_nulo = self.usar_futilidade = False
+        else:
+            self.usar_reducoes, self.usar_movimento_nulo, self.usar_futilidade = self._seletiva
+    
+    def _zerar_contadores(self):
+        """Zera os contadores de estatísticas da busca"""
+        for nome in CONTADORES:
+            setattr(self, nome, 0)
+    
+    def _iniciar_relogio(self, prazo):
+        """Define o prazo absoluto (time.monotonic) da busca; None = sem prazo"""
+        self._prazo = prazo
+        self._esgotado = self._interrompida
+        self._contagem_relogio = INTERVALO_RELOGIO
+    
+    def definir_prazo(self, prazo):
+        """
+        Troca o prazo de uma busca em andamento (em outra thread)
+        
+        Usado pela ponderação: a busca no tempo do adversário corre sem
+        prazo e passa a ter o da jogada quando a previsão se confirma.
+        """
+        self._contagem_relogio = 1
+        self._prazo = prazo
+    
+    def interromper(self):
+        """
+        Faz a busca em andamento (em outra thread) terminar o quanto antes
+        
+        A interrupção vale também para uma busca que ainda vai começar, até
+        limpar_interrupcao, que deve ser chamado depois que ela terminar.
+        """
+        self._interrompida = True
+        self._esgotado = True
+    
+    def limpar_interrupcao(self):
+        """Libera as próximas buscas depois de interromper"""
+        self._interrompida = False
+        self._esgotado = False
+    
+    def prazo_vencido(self):
+        """Consulta o relógio agora; uma vez vencido, o prazo continua vencido"""
+        if not self._esgotado and self._prazo is not None:
+            self._esgotado = time.monotonic() >= self._prazo
+        return self._esgotado
     
     def tempo_esgotado(self):
-        """Verifica se o tempo limite foi atingido"""
-        if self.tempo_limite is None:
+        """
+        Verifica se o tempo limite foi atingido
+        
+        Chamado em todo nó, consulta o relógio só a cada INTERVALO_RELOGIO
+        chamadas; entre elas vale a última resposta.
+        """
+        if self._esgotado or self._prazo is None:
+            return self._esgotado
+        self._contagem_relogio -= 1
+        if self._contagem_relogio > 0:
             return False
-        return (time.time() - self.inicio_busca) >= self.tempo_limite
+        self._contagem_relogio = INTERVALO_RELOGIO
+        return self.prazo_vencido()
     
     def melhor_movimento(self, estado, lado):
         """
@@ -40,56 +216,302 @@ class BuscaAdversarial:
         Returns:
             Tupla (tipo, posicoes) representando o melhor movimento
         """
-        self.inicio_busca = time.time()
-        self.nos_explorados = 0
-        self.cortes_alfa = 0
-        self.cortes_beta = 0
+        self.inicio_busca = time.monotonic()
+        gerenciador = self.gerenciador_tempo
+        if gerenciador is not None:
+            self._iniciar_relogio(gerenciador.prazo_rigido)
+        elif self.tempo_limite is not None:
+            self._iniciar_relogio(self.inicio_busca + self.tempo_limite)
+        else:
+            self._iniciar_relogio(None)
+        self._zerar_contadores()
+        self.profundidade_completa = 0
+        self.valor_raiz = None
+        self.variacao_principal = []
+        self.falhas_aspiracao = 0
+        self._preparar_ordenacao()
+        self._avaliacoes.clear()
         
-        # Usa busca iterativa por profundidade crescente
-        melhor_mov = None
-        melhor_valor = float('-inf')
+        if self._lado_tabela != lado:
+            self.tabela.limpar()
+            self._lado_tabela = lado
+            if self.analises is not None:
+                self._carregar_analises(lado)
+        self.tabela.nova_busca()
+        
+        # Posição ganha na base de finais: joga o caminho mais curto
+        if self.finais is not None:
+            movimento = self._movimento_finais(estado, lado)
+            if movimento is not None:
+                return movimento
+        
+        # Toda a árvore é percorrida sobre uma única cópia mutável do estado
+        estado = estado.copiar()
+        if self.telemetria is not None:
+            self.telemetria.instrumentar_estado(estado)
+        chave_raiz = estado.chave ^ ZOBRIST_LADO[lado]
+        
+        movimentos = estado.gerar_movimentos(lado)
+        if not movimentos:
+            return None
+        if gerenciador is not None and len(movimentos) == 1:
+            return movimentos[0]
         
-        # Tenta com profundidades crescentes
+        # Raiz já analisada na profundidade pedida em outra partida
+        if self.analises is not None:
+            movimento = self._consultar_analises(estado, lado, chave_raiz, movimentos)
+            if movimento is not None:
+                return movimento
+        
+        # Ordena movimentos para melhorar poda (capturas primeiro para onça)
+        entrada = self.tabela.consultar(chave_raiz)
+        mov_tt = entrada[4] if entrada is not None and not self.reprodutivel else None
+        movimentos = self._ordenar_movimentos(estado, lado, movimentos, mov_tt)
+        
+        # Se nem a primeira iteração terminar, joga o primeiro da ordenação
+        melhor_mov = movimentos[0]
+        movimento_anterior = None
+        valor_anterior = None
+        
+        # Busca iterativa por profundidade crescente
         for prof in range(1, self.profundidade_maxima + 1):
-            if self.tempo_esgotado():
+            if self.prazo_vencido():
+                break
+            # Relido a cada iteração: a ponderação só o recebe no acerto
+            gerenciador = self.gerenciador_tempo
+            if gerenciador is not None and prof > 1 and not gerenciador.pode_iterar():
                 break
             
-            movimentos = estado.gerar_movimentos(lado)
-            
-            if not movimentos:
-                return None
-            
-            # Ordena movimentos para melhorar poda (capturas primeiro para onça)
-            movimentos = self._ordenar_movimentos(estado, lado, movimentos)
+            # A variação principal da iteração anterior é buscada primeiro
+            movimentos.remove(melhor_mov)
+            movimentos.insert(0, melhor_mov)
             
-            alfa = float('-inf')
-            beta = float('+inf')
+            # Janela de aspiração em torno do valor da iteração anterior
+            if valor_anterior is None:
+                alfa, beta = float('-inf'), float('+inf')
+            else:
+                alfa = valor_anterior - JANELA_ASPIRACAO
+                beta = valor_anterior + JANELA_ASPIRACAO
             
-            for movimento in movimentos:
-                if self.tempo_esgotado():
-                    break
-                
-                novo_estado = estado.aplicar_movimento(lado, movimento)
-                
-                # Minimax com poda alfa-beta
-                valor = self._minimax(
-                    novo_estado,
-                    prof - 1,
-                    alfa,
-                    beta,
-                    False,  # Próximo nível é MIN
-                    lado
+            while True:
+                mov, valor, completa = self._iteracao_raiz(
+                    estado, lado, prof, movimentos, alfa, beta
                 )
                 
-                if valor > melhor_valor:
-                    melhor_valor = valor
-                    melhor_mov = movimento
+                # Um movimento só é devolvido se foi buscado por completo e
+                # provou ser melhor que todos os anteriores da iteração
+                if mov is not None:
+                    melhor_mov = mov
+                    movimentos.remove(mov)
+                    movimentos.insert(0, mov)
                 
-                alfa = max(alfa, valor)
+                if not completa:
+                    break
+                
+                # Valor fora da janela: repete a iteração com a janela aberta
+                if valor <= alfa:
+                    alfa = float('-inf')
+                    self.falhas_aspiracao += 1
+                elif valor >= beta:
+                    beta = float('+inf')
+                    self.falhas_aspiracao += 1
+                else:
+                    break
+            
+            if not completa:
+                break
+            
+            gerenciador = self.gerenciador_tempo
+            if gerenciador is not None:
+                # Decisão ainda instável: dá mais tempo antes da próxima
+                if prof > 1 and melhor_mov != movimento_anterior:
+                    gerenciador.estender()
+            movimento_anterior = melhor_mov
+            
+            valor_anterior = valor
+            self.valor_raiz = valor
+            self.profundidade_completa = prof
+            self.tabela.gravar(chave_raiz, prof, EXATO, valor, melhor_mov)
+            
+            # Vitória forçada: aprofundar não muda a decisão
+            if gerenciador is not None and valor >= LIMIAR_VITORIA:
+                break
+        
+        self.variacao_principal = self._extrair_variacao(estado, lado, melhor_mov)
+        if self.analises is not None and self.profundidade_completa > 0:
+            self._gravar_analises(estado, lado)
+        return melhor_mov
+    
+    def _configuracao(self):
+        """
+        Opções que mudam o resultado da busca, gravadas com cada análise no
+        cache persistente: q quiescência (e seu limite), r reduções, n
+        movimento nulo, f futilidade, e busca reprodutível; '-' = desligada
+        """
+        opcoes = (('q', self.usar_quiescencia), ('r', self.usar_reducoes),
+                  ('n', self.usar_movimento_nulo), ('f', self.usar_futilidade),
+                  ('e', self.reprodutivel))
+        return (''.join(letra if ligada else '-' for letra, ligada in opcoes)
+                + f":{self.limite_quiescencia}")
+    
+    def _carregar_analises(self, lado):
+        """Semeia a tabela de transposição com as análises mais profundas do lado"""
+        limite = min(LIMITE_SEMENTE_ANALISES, self.tabela.num_baldes)
+        analises = self.analises.mais_profundas(lado, self._configuracao(), limite)
+        for chave, profundidade, tipo, valor, movimento in analises:
+            self.tabela.gravar(chave, profundidade, tipo, valor, movimento)
+    
+    def _consultar_analises(self, estado, lado, chave_raiz, movimentos):
+        """
+        Consulta a raiz no cache persistente
         
+        Só valem análises feitas com a mesma configuração de busca. A
+        análise guardada vai para a tabela de transposição (ordena a
+        busca); se for exata e tão profunda quanto a busca pedida (na busca
+        reprodutível, exatamente dessa profundidade), a busca é dispensada.
+        
+        Returns:
+            Movimento a jogar, ou None para buscar normalmente
+        """
+        configuracao = self._configuracao()
+        analise = self.analises.consultar(chave_raiz, lado, configuracao)
+        if analise is None:
+            return None
+        profundidade, tipo, valor, movimento = analise
+        if movimento not in movimentos:
+            return None
+        
+        self.tabela.gravar(chave_raiz, profundidade, tipo, valor, movimento)
+        if tipo != EXATO or profundidade < self.profundidade_maxima:
+            return None
+        if self.reprodutivel and profundidade != self.profundidade_maxima:
+            return None
+        
+        self.acertos_analises += 1
+        self.valor_raiz = valor
+        self.profundidade_completa = profundidade
+        self.variacao_principal = self._extrair_variacao(estado, lado, movimento)
+        # Regrava para a análise reaproveitada não ser descartada
+        self.analises.gravar(chave_raiz, lado, configuracao, profundidade, tipo, valor,
+                             movimento)
+        return movimento
+    
+    def _gravar_analises(self, estado, lado):
+        """Grava no cache persistente as posições da variação principal"""
+        lado_max = lado
+        configuracao = self._configuracao()
+        gravadas = 0
+        for movimento in self.variacao_principal:
+            entrada = self.tabela.consultar(estado.chave ^ ZOBRIST_LADO[lado])
+            if entrada is None or entrada[1] <= 0:
+                break
+            chave, profundidade, tipo, valor, mov_tt, _ = entrada
+            self.analises.gravar(chave, lado_max, configuracao, profundidade, tipo, valor,
+                                 mov_tt)
+            estado.fazer_movimento(lado, movimento)
+            gravadas += 1
+            lado = 'c' if lado == 'o' else 'o'
+        for _ in range(gravadas):
+            estado.desfazer_movimento()
+    
+    def _movimento_finais(self, estado, lado):
+        """
+        Retorna o movimento que vence mais rápido segundo a base de finais,
+        ou None se a posição não é uma vitória conhecida para o lado
+        """
+        resultado = self.finais.sondar(estado, lado)
+        if resultado is None or resultado[0] != lado:
+            return None
+        
+        outro = 'c' if lado == 'o' else 'o'
+        melhor_mov = None
+        melhor_distancia = None
+        
+        for movimento in estado.gerar_movimentos(lado):
+            filho = estado.aplicar_movimento(lado, movimento)
+            if filho.vencedor() == lado:
+                return movimento
+            resultado = self.finais.sondar(filho, outro)
+            if resultado is None or resultado[0] != lado:
+                continue
+            if melhor_distancia is None or resultado[1] < melhor_distancia:
+                melhor_mov = movimento
+                melhor_distancia = resultado[1]
+        
+        if melhor_mov is not None:
+            self.acertos_finais += 1
         return melhor_mov
     
-    def _minimax(self, estado, profundidade, alfa, beta, maximizando, lado_max):
+    def _valor_finais(self, resultado, lado_max):
+        """Valor de uma posição resolvida pela base de finais"""
+        vencedor, distancia = resultado
+        # Vitórias mais curtas (e derrotas mais longas) valem mais
+        valor = 10000 - distancia
+        return valor if vencedor == lado_max else -valor
+    
+    def _iteracao_raiz(self, estado, lado, prof, movimentos, alfa, beta):
+        """
+        Busca os movimentos da raiz (já ordenados) em uma profundidade
+        
+        O primeiro movimento é buscado com a janela (alfa, beta) inteira e os
+        demais com janela nula, refeitos só quando superam alfa.
+        
+        Returns:
+            Tupla (melhor_mov, melhor_valor, completa). melhor_mov é o último
+            movimento que superou alfa (None se nenhum superou) e completa é
+            False se o tempo acabou antes de todos os movimentos
+        """
+        melhor_mov = None
+        melhor_valor = float('-inf')
+        
+        for i, movimento in enumerate(movimentos):
+            if self.prazo_vencido():
+                return melhor_mov, melhor_valor, False
+            
+            estado.fazer_movimento(lado, movimento)
+            if i == 0:
+                valor = self._minimax(estado, prof - 1, alfa, beta, False, lado)
+            else:
+                valor = self._minimax(estado, prof - 1, alfa, alfa + 1, False, lado)
+                if alfa < valor < beta:
+                    valor = self._minimax(estado, prof - 1, alfa, beta, False, lado)
+            estado.desfazer_movimento()
+            
+            # Valor de uma subárvore interrompida não é confiável
+            if self.tempo_esgotado():
+                return melhor_mov, melhor_valor, False
+            
+            if valor > melhor_valor:
+                melhor_valor = valor
+            if valor > alfa:
+                alfa = valor
+                melhor_mov = movimento
+                if valor >= beta:
+                    break
+        
+        return melhor_mov, melhor_valor, True
+    
+    def _extrair_variacao(self, estado, lado, movimento):
+        """Segue os movimentos da tabela de transposição a partir da raiz"""
+        variacao = []
+        vistas = set()
+        while movimento is not None and len(variacao) < self.profundidade_maxima:
+            if movimento not in estado.gerar_movimentos(lado):
+                break
+            variacao.append(movimento)
+            estado.fazer_movimento(lado, movimento)
+            lado = 'c' if lado == 'o' else 'o'
+            chave = estado.chave ^ ZOBRIST_LADO[lado]
+            entrada = self.tabela.consultar(chave)
+            if chave in vistas or entrada is None:
+                break
+            vistas.add(chave)
+            movimento = entrada[4]
+        for _ in variacao:
+            estado.desfazer_movimento()
+        return variacao
+    
+    def _minimax(self, estado, profundidade, alfa, beta, maximizando, lado_max, ply=1):
         """
         Algoritmo Minimax com poda Alfa-Beta
         
@@ -100,6 +522,7 @@ class BuscaAdversarial:
             beta: Valor beta para poda
             maximizando: True se é nó MAX, False se é MIN
             lado_max: Lado que está maximizando ('o' ou 'c')
+            ply: Distância do nó até a raiz
         
         Returns:
             Valor heurístico do estado
@@ -110,59 +533,334 @@ class BuscaAdversarial:
         if self.tempo_esgotado():
             return self._avaliar(estado, lado_max)
         
-        if profundidade == 0 or estado.eh_terminal():
+        lado_atual = lado_max if maximizando else ('c' if lado_max == 'o' else 'o')
+        
+        # Base de finais: valor exato, dispensa avaliação e busca
+        if self.finais is not None:
+            resultado = self.finais.sondar(estado, lado_atual)
+            if resultado is not None:
+                self.acertos_finais += 1
+                return self._valor_finais(resultado, lado_max)
+        
+        if estado.eh_terminal():
             return self._avaliar(estado, lado_max)
         
-        lado_atual = lado_max if maximizando else ('c' if lado_max == 'o' else 'o')
+        if profundidade == 0:
+            if self.usar_quiescencia:
+                return self._quiescencia(estado, alfa, beta, maximizando, lado_max)
+            return self._avaliar(estado, lado_max)
+        
+        # Consulta a tabela de transposição
+        chave = estado.chave ^ ZOBRIST_LADO[lado_atual]
+        alfa_original, beta_original = alfa, beta
+        mov_tt = None
+        entrada = self.tabela.consultar(chave)
+        if entrada is not None:
+            _, prof_tt, tipo_tt, valor_tt, mov_tt, _ = entrada
+            # Uma análise mais profunda vale mais, mas muda o resultado
+            # conforme a ordem em que a tabela foi preenchida
+            if prof_tt == profundidade or (prof_tt > profundidade and not self.reprodutivel):
+                if tipo_tt == EXATO:
+                    return valor_tt
+                if tipo_tt == LIMITE_INFERIOR:
+                    alfa = max(alfa, valor_tt)
+                else:
+                    beta = min(beta, valor_tt)
+                if beta <= alfa:
+                    return valor_tt
+        
+        # Nós de janela nula (fora da variação principal) admitem poda seletiva
+        janela_nula = beta - alfa <= 1
+        
+        # Movimento nulo: se mesmo passando a vez o lado a jogar ainda passa
+        # da janela, a posição é boa demais e a busca reduzida basta
+        if (self.usar_movimento_nulo and janela_nula and not self._em_movimento_nulo
+                and profundidade > REDUCAO_NULO
+                and self._movimento_nulo_permitido(estado, lado_atual)):
+            self._em_movimento_nulo = True
+            if maximizando:
+                valor_nulo = self._minimax(
+                    estado, profundidade - 1 - REDUCAO_NULO, beta - 1, beta, False, lado_max, ply + 1
+                )
+            else:
+                valor_nulo = self._minimax(
+                    estado, profundidade - 1 - REDUCAO_NULO, alfa, alfa + 1, True, lado_max, ply + 1
+                )
+            self._em_movimento_nulo = False
+            
+            if not self.tempo_esgotado():
+                if maximizando and valor_nulo >= beta:
+                    self.cortes_nulos += 1
+                    return beta
+                if not maximizando and valor_nulo <= alfa:
+                    self.cortes_nulos += 1
+                    return alfa
+        
         movimentos = estado.gerar_movimentos(lado_atual)
         
         # Se não há movimentos, avalia o estado
         if not movimentos:
             return self._avaliar(estado, lado_max)
         
+        # Futilidade: perto das folhas, movimentos simples não recuperam uma
+        # avaliação que está longe da janela
+        futil = False
+        if self.usar_futilidade and profundidade == 1 and janela_nula:
+            estatico = self._avaliar(estado, lado_max)
+            if maximizando:
+                futil = estatico + MARGEM_FUTILIDADE <= alfa
+            else:
+                futil = estatico - MARGEM_FUTILIDADE >= beta
+        
         # Ordena movimentos para melhorar poda
-        movimentos = self._ordenar_movimentos(estado, lado_atual, movimentos)
+        movimentos = self._ordenar_movimentos(estado, lado_atual, movimentos, mov_tt, ply)
+        melhor = None
+        
+        # Os filhos são folhas: avalia todos de uma vez
+        if profundidade == 1 and self.avaliador_lote is not None:
+            self._avaliar_filhos(estado, lado_atual, movimentos, lado_max)
         
         if maximizando:
             valor = float('-inf')
-            for movimento in movimentos:
+            for i, movimento in enumerate(movimentos):
                 if self.tempo_esgotado():
                     break
                 
-                novo_estado = estado.aplicar_movimento(lado_atual, movimento)
-                valor = max(valor, self._minimax(
-                    novo_estado, profundidade - 1, alfa, beta, False, lado_max
-                ))
+                if futil and i > 0 and movimento[0] == 'm':
+                    self.podas_futilidade += 1
+                    continue
+                
+                estado.fazer_movimento(lado_atual, movimento)
+                if i == 0:
+                    valor_filho = self._minimax(
+                        estado, profundidade - 1, alfa, beta, False, lado_max, ply + 1
+                    )
+                else:
+                    # Janela nula: só prova que o movimento não supera alfa
+                    reducao = self._reducao(profundidade, i, movimento, mov_tt, ply)
+                    valor_filho = self._minimax(
+                        estado, profundidade - 1 - reducao, alfa, alfa + 1, False, lado_max, ply + 1
+                    )
+                    if reducao and valor_filho > alfa:
+                        self.reducoes_refeitas += 1
+                        valor_filho = self._minimax(
+                            estado, profundidade - 1, alfa, alfa + 1, False, lado_max, ply + 1
+                        )
+                    if alfa < valor_filho < beta:
+                        valor_filho = self._minimax(
+                            estado, profundidade - 1, alfa, beta, False, lado_max, ply + 1
+                        )
+                estado.desfazer_movimento()
+                if valor_filho > valor:
+                    valor = valor_filho
+                    melhor = movimento
                 
                 alfa = max(alfa, valor)
                 if beta <= alfa:
                     self.cortes_beta += 1
+                    self._registrar_corte(lado_atual, movimento, profundidade, ply, i)
                     break  # Poda Beta
-            
-            return valor
         else:
             valor = float('+inf')
-            for movimento in movimentos:
+            for i, movimento in enumerate(movimentos):
                 if self.tempo_esgotado():
                     break
                 
-                novo_estado = estado.aplicar_movimento(lado_atual, movimento)
-                valor = min(valor, self._minimax(
-                    novo_estado, profundidade - 1, alfa, beta, True, lado_max
-                ))
+                if futil and i > 0 and movimento[0] == 'm':
+                    self.podas_futilidade += 1
+                    continue
+                
+                estado.fazer_movimento(lado_atual, movimento)
+                if i == 0:
+                    valor_filho = self._minimax(
+                        estado, profundidade - 1, alfa, beta, True, lado_max, ply + 1
+                    )
+                else:
+                    # Janela nula: só prova que o movimento não fica abaixo de beta
+                    reducao = self._reducao(profundidade, i, movimento, mov_tt, ply)
+                    valor_filho = self._minimax(
+                        estado, profundidade - 1 - reducao, beta - 1, beta, True, lado_max, ply + 1
+                    )
+                    if reducao and valor_filho < beta:
+                        self.reducoes_refeitas += 1
+                        valor_filho = self._minimax(
+                            estado, profundidade - 1, beta - 1, beta, True, lado_max, ply + 1
+                        )
+                    if alfa < valor_filho < beta:
+                        valor_filho = self._minimax(
+                            estado, profundidade - 1, alfa, beta, True, lado_max, ply + 1
+                        )
+                estado.desfazer_movimento()
+                if valor_filho < valor:
+                    valor = valor_filho
+                    melhor = movimento
                 
                 beta = min(beta, valor)
                 if beta <= alfa:
                     self.cortes_alfa += 1
+                    self._registrar_corte(lado_atual, movimento, profundidade, ply, i)
                     break  # Poda Alfa
-            
-            return valor
+        
+        # Só grava resultados de subárvores buscadas por completo
+        if melhor is not None and not self.tempo_esgotado():
+            if valor <= alfa_original:
+                tipo = LIMITE_SUPERIOR
+            elif valor >= beta_original:
+                tipo = LIMITE_INFERIOR
+            else:
+                tipo = EXATO
+            self.tabela.gravar(chave, profundidade, tipo, valor, melhor)
+        
+        return valor
+    
+    def _reducao(self, profundidade, indice, movimento, mov_tt, ply):
+        """
+        Redução de profundidade de um movimento tardio (0 = busca inteira)
+        
+        Só movimentos simples depois dos primeiros são reduzidos; o
+        movimento da tabela e os assassinos do ply ficam de fora.
+        """
+        if (not self.usar_reducoes or profundidade < 3
+                or indice < MOVIMENTOS_SEM_REDUCAO or movimento[0] != 'm'
+                or movimento == mov_tt):
+            return 0
+        if ply < len(self.assassinos) and movimento in self.assassinos[ply]:
+            return 0
+        self.reducoes += 1
+        return 1
+    
+    def _movimento_nulo_permitido(self, estado, lado):
+        """
+        Decide se o lado pode passar a vez na poda pelo movimento nulo
+        
+        Passar só é uma boa aproximação quando jogar não é uma obrigação
+        ruim (zugzwang). Aqui isso acontece nos bloqueios: com a onça quase
+        cercada, qualquer movimento dos cachorros pode abrir o cerco e a
+        própria onça só tem lances forçados. Com uma captura pendente, passar
+        com os cachorros entregaria uma peça e a busca nula seria inútil.
+        """
+        _, movimentos_onca, saltos, _ = estado.analisar()
+        if len(movimentos_onca) < MOBILIDADE_MINIMA_NULO:
+            return False
+        if lado == 'c' and saltos:
+            return False
+        return True
     
-    def _ordenar_movimentos(self, estado, lado, movimentos):
+    def _quiescencia(self, estado, alfa, beta, maximizando, lado_max):
+        """
+        Continua a busca nas folhas enquanto houver capturas pendentes
+        
+        Com a onça a jogar só os saltos são buscados; com os cachorros a
+        jogar, só os movimentos que bloqueiam a casa de pouso de um salto ou
+        tiram da frente o cachorro ameaçado, além de deixar a onça capturar
+        (os demais movimentos dos cachorros não resolvem a ameaça). O lado
+        a jogar pode ainda aceitar a avaliação estática (stand-pat), que
+        serve de limite para a poda.
+        
+        Returns:
+            Valor heurístico do estado
+        """
+        self.nos_explorados += 1
+        self.nos_quiescencia += 1
+        
+        if (self.nos_quiescencia > self.limite_quiescencia
+                or estado.eh_terminal() or self.tempo_esgotado()):
+            return self._avaliar(estado, lado_max)
+        
+        lado_atual = lado_max if maximizando else ('c' if lado_max == 'o' else 'o')
+        _, movimentos_onca, saltos, _ = estado.analisar()
+        if not saltos:
+            return self._avaliar(estado, lado_max)
+        capturas = [mov for mov in movimentos_onca if mov[0] == 's']
+        
+        if lado_atual == 'o':
+            parado = self._avaliar(estado, lado_max)
+            lances = self._ordenar_movimentos(estado, 'o', capturas)
+        else:
+            # Casas de pouso e cachorros ameaçados pelo primeiro salto
+            pousos = {mov[1][1] for mov in capturas}
+            origem = capturas[0][1][0]
+            ameacados = {meio for meio, destino in SALTOS[origem] if destino in pousos}
+            lances = [mov for mov in estado.gerar_movimentos('c')
+                      if mov[1][-1] in pousos or mov[1][0] in ameacados]
+            # Sem bloquear, a onça captura: avalia a posição com ela a jogar
+            parado = self._quiescencia(estado, alfa, beta, not maximizando, lado_max)
+        
+        if maximizando:
+            if parado >= beta:
+                return parado
+            valor = parado
+            alfa = max(alfa, parado)
+            for movimento in lances:
+                estado.fazer_movimento(lado_atual, movimento)
+                valor_filho = self._quiescencia(estado, alfa, beta, False, lado_max)
+                estado.desfazer_movimento()
+                valor = max(valor, valor_filho)
+                alfa = max(alfa, valor)
+                if beta <= alfa:
+                    break
+        else:
+            if parado <= alfa:
+                return parado
+            valor = parado
+            beta = min(beta, parado)
+            for movimento in lances:
+                estado.fazer_movimento(lado_atual, movimento)
+                valor_filho = self._quiescencia(estado, alfa, beta, True, lado_max)
+                estado.desfazer_movimento()
+                valor = min(valor, valor_filho)
+                beta = min(beta, valor)
+                if beta <= alfa:
+                    break
+        
+        return valor
+    
+    def _preparar_ordenacao(self):
+        """
+        Prepara as heurísticas dinâmicas de ordenação para uma nova busca:
+        os movimentos assassinos (killer moves) são descartados e o
+        histórico é reduzido à metade, para que posições antigas pesem menos
+        """
+        self.assassinos = []
+        for chave in list(self.historico):
+            self.historico[chave] //= 2
+            if not self.historico[chave]:
+                del self.historico[chave]
+    
+    def _registrar_corte(self, lado, movimento, profundidade, ply, indice):
+        """Atualiza assassinos e histórico com o movimento que causou um corte"""
+        if indice == 0:
+            self.cortes_primeiro_movimento += 1
+        
+        # Capturas já vêm primeiro pela prioridade estática
+        tipo, posicoes = movimento
+        if tipo == 's':
+            return
+        
+        while len(self.assassinos) <= ply:
+            self.assassinos.append([None, None])
+        slots = self.assassinos[ply]
+        if slots[0] != movimento:
+            slots[1] = slots[0]
+            slots[0] = movimento
+        
+        chave = (lado, posicoes[0], posicoes[-1])
+        self.historico[chave] = self.historico.get(chave, 0) + profundidade * profundidade
+    
+    def _ordenar_movimentos(self, estado, lado, movimentos, mov_tt=None, ply=None):
         """
         Ordena movimentos para melhorar eficiência da poda
-        Movimentos mais promissores primeiro
+        Movimentos mais promissores primeiro; o movimento da tabela de
+        transposição (mov_tt), se houver, vem antes de todos. Às prioridades
+        estáticas somam-se os assassinos do ply e o histórico de cortes,
+        exceto fora da árvore (ply None) na busca reprodutível: lá a ordem
+        da raiz decide os empates e não pode depender das buscas anteriores
         """
+        assassinos = ()
+        if ply is not None and ply < len(self.assassinos):
+            assassinos = self.assassinos[ply]
+        historico = self.historico if ply is not None or not self.reprodutivel else {}
+        
         def prioridade(mov):
             tipo, posicoes = mov
             score = 0
@@ -202,9 +900,37 @@ class BuscaAdversarial:
                     if dist_depois < dist_antes:
                         score += 30
             
+            # Heurísticas dinâmicas ficam abaixo de uma captura
+            dinamico = min(historico.get((lado, posicoes[0], posicoes[-1]), 0),
+                           LIMITE_HISTORICO)
+            if mov in assassinos:
+                dinamico += BONUS_ASSASSINO if mov == assassinos[0] else BONUS_ASSASSINO - 100
+            score += min(dinamico, LIMITE_DINAMICO)
+            
             return -score  # Negativo para ordenação decrescente
         
-        return sorted(movimentos, key=prioridade)
+        ordenados = sorted(movimentos, key=prioridade)
+        if mov_tt is not None and mov_tt in ordenados:
+            ordenados.remove(mov_tt)
+            ordenados.insert(0, mov_tt)
+        return ordenados
+    
+    def _avaliar_filhos(self, estado, lado, movimentos, lado_max):
+        """Avalia em lote os filhos ainda fora do cache de avaliações"""
+        avaliacoes = self._avaliacoes
+        chaves = []
+        posicoes = []
+        for movimento in movimentos:
+            estado.fazer_movimento(lado, movimento)
+            if estado.chave not in avaliacoes:
+                chaves.append(estado.chave)
+                posicoes.append(bits_estado(estado))
+            estado.desfazer_movimento()
+        
+        if len(avaliacoes) > LIMITE_CACHE_AVALIACOES:
+            avaliacoes.clear()
+        avaliacoes.update(zip(chaves, self.avaliador_lote.avaliar(posicoes, lado_max)))
+        self.avaliacoes_lote += len(posicoes)
     
     def _avaliar(self, estado, lado):
         """
@@ -217,6 +943,28 @@ class BuscaAdversarial:
         Returns:
             Valor heurístico (positivo favorece 'lado', negativo favorece oponente)
         """
+        # Folha já avaliada em lote
+        if self._avaliacoes:
+            valor = self._avaliacoes.get(estado.chave)
+            if valor is not None:
+                return valor
+        
+        # Estados que mantêm os componentes da avaliação (EstadoBitboard)
+        if hasattr(estado, 'conexoes'):
+            valor = self._avaliar_incremental(estado, lado)
+            if self.verificar_avaliacao:
+                escalar = self._avaliar_escalar(estado, lado)
+                if valor != escalar:
+                    raise AssertionError(
+                        f"Avaliação incremental {valor} difere da escalar "
+                        f"{escalar}:\n{estado.para_string()}"
+                    )
+            return valor
+        
+        return self._avaliar_escalar(estado, lado)
+    
+    def _avaliar_escalar(self, estado, lado):
+        """Avaliação completa, percorrendo o tabuleiro"""
         # Verifica vitória
         vencedor = estado.vencedor()
         if vencedor == lado:
@@ -229,6 +977,40 @@ class BuscaAdversarial:
         else:
             return self._avaliar_cachorros(estado)
     
+    def _avaliar_incremental(self, estado, lado):
+        """
+        Mesmo valor de _avaliar_escalar usando os componentes do estado
+        
+        As conexões e o avanço dos cachorros vêm prontos do estado, o cerco
+        é uma máscara de vizinhos e a mobilidade da onça vem da análise do
+        estado, já feita para o teste de fim de jogo.
+        """
+        num_cachorros, movimentos_onca, saltos, vencedor = estado.analisar()
+        if vencedor is not None:
+            return 10000 if vencedor == lado else -10000
+        movimentos = len(movimentos_onca)
+        
+        i = estado.onca.bit_length() - 1
+        proximos = (VIZINHOS[i] & estado.cachorros).bit_count()
+        
+        if lado == 'o':
+            score = (14 - num_cachorros) * 500
+            if num_cachorros <= 11:
+                score += (11 - num_cachorros) * 200
+            score += movimentos * 10 + POSICAO_ONCA[i] + saltos * 100
+            if movimentos <= 2:
+                score -= 100
+            return score - proximos * 20
+        
+        score = num_cachorros * 300
+        if num_cachorros <= 11:
+            score -= (11 - num_cachorros) * 400
+        score += (20 - movimentos) * 50
+        if movimentos <= 2:
+            score += 500
+        score += proximos * 80 + estado.conexoes * 5 + estado.avanco
+        return score + proximos / NUM_VIZINHOS[i] * 200
+    
     def _avaliar_onca(self, estado):
         """Avalia o estado do ponto de vista da onça"""
         score = 0
@@ -301,6 +1083,7 @@ class BuscaAdversarial:
         
         # 3. Cerco à onça (cachorros próximos)
         pos_onca = estado.posicao_onca()
+        cerco = 0
         if pos_onca:
             cachorros_proximos = 0
             posicoes_adjacentes_ocupadas = 0
@@ -320,7 +1103,7 @@ class BuscaAdversarial:
             total_adjacentes = len(EstadoJogo.ADJACENCIAS.get(pos_onca, []))
             if total_adjacentes > 0:
                 proporcao_cercada = cachorros_proximos / total_adjacentes
-                score += proporcao_cercada * 200
+                cerco = proporcao_cercada * 200
         
         # 4. Formação defensiva (cachorros agrupados)
         posicoes_cachorros = estado.posicoes_cachorros()
@@ -337,7 +1120,10 @@ class BuscaAdversarial:
             if l >= 4:  # Cachorros nas linhas avançadas
                 score += (l - 3) * 15
         
-        return score
+        # O cerco é o único termo fracionário: somado por último a um total
+        # inteiro, o valor não depende da ordem das somas (as avaliações
+        # incremental e em lote chegam ao mesmo float)
+        return score + cerco
     
     def obter_estatisticas(self):
         """Retorna estatísticas da última busca"""
@@ -345,5 +1131,19 @@ class BuscaAdversarial:
             'nos_explorados': self.nos_explorados,
             'cortes_alfa': self.cortes_alfa,
             'cortes_beta': self.cortes_beta,
-            'tempo_decorrido': time.time() - self.inicio_busca if self.inicio_busca else 0
+            'tt_consultas': self.tabela.consultas,
+            'tt_acertos': self.tabela.acertos,
+            'finais_acertos': self.acertos_finais,
+            'profundidade_completa': self.profundidade_completa,
+            'valor': self.valor_raiz,
+            'falhas_aspiracao': self.falhas_aspiracao,
+            'cortes_primeiro_movimento': self.cortes_primeiro_movimento,
+            'nos_quiescencia': self.nos_quiescencia,
+            'reducoes': self.reducoes,
+            'reducoes_refeitas': self.reducoes_refeitas,
+            'cortes_nulos': self.cortes_nulos,
+            'podas_futilidade': self.podas_futilidade,
+            'avaliacoes_lote': self.avaliacoes_lote,
+            'analises_acertos': self.acertos_analises,
+            'tempo_decorrido': time.monotonic() - self.inicio_busca if self.inicio_busca else 0
         }
@@ -0,0 +1,309 @@
+"""
+Busca adversarial paralela - divide os movimentos da raiz entre processos
+
+Cada movimento da raiz é buscado por um processo de um
+ProcessPoolExecutor. Os processos compartilham o alfa da raiz (o melhor
+valor já provado na rodada) e um prazo absoluto (time.monotonic), de modo
+que o tempo_limite, ou o prazo rígido do gerenciador de tempo, continua
+valendo para a busca como um todo.
+"""
+
+import math
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from busca import BuscaAdversarial, CONTADORES
+from finais import BaseFinais
+
+# Abaixo desta profundidade a sobrecarga de enviar tarefas não compensa
+PROFUNDIDADE_MINIMA_PARALELA = 3
+
+# Estado global de cada processo trabalhador
+_alfa_compartilhado = None  # [rodada, alfa]
+_busca_processo = None
+_id_busca_processo = None
+
+
+def _inicializar_processo(alfa_compartilhado, memoria_tt_mb, diretorio_finais, opcoes):
+    """Inicializador do processo trabalhador"""
+    global _alfa_compartilhado, _busca_processo
+    _alfa_compartilhado = alfa_compartilhado
+    # Cada processo mapeia as tabelas de finais por conta própria
+    finais = BaseFinais(diretorio_finais) if diretorio_finais else None
+    _busca_processo = BuscaAdversarial(memoria_tt_mb=memoria_tt_mb, finais=finais,
+                                       **opcoes)
+
+
+def _buscar_movimento_raiz(id_busca, rodada, estado, lado, movimento, prof, beta,
+                           prazo, reprodutivel):
+    """
+    Busca um movimento da raiz em um processo trabalhador
+
+    rodada identifica a chamada de _iteracao_raiz: uma tarefa que sobrou de
+    uma rodada anterior (outra profundidade ou janela) não mexe no alfa
+    compartilhado.
+
+    Returns:
+        Tupla (valor, alfa_usado, completo, contadores, tempo), com
+        contadores = {nome: valor} dos CONTADORES da busca
+    """
+    global _id_busca_processo
+    busca = _busca_processo
+
+    # A tabela vale só dentro de uma mesma chamada de melhor_movimento, para
+    # que o resultado não dependa de quais tarefas cada processo recebeu antes
+    if _id_busca_processo != id_busca:
+        busca.tabela.limpar()
+        busca.tabela.nova_busca()
+        busca._preparar_ordenacao()
+        busca._avaliacoes.clear()
+        busca._lado_tabela = lado
+        _id_busca_processo = id_busca
+
+    inicio_cpu = time.process_time()
+    busca.inicio_busca = time.monotonic()
+    busca._iniciar_relogio(prazo)
+    busca._zerar_contadores()
+    busca._configurar_selecao(reprodutivel)
+
+    with _alfa_compartilhado.get_lock():
+        if _alfa_compartilhado[0] == rodada:
+            alfa = _alfa_compartilhado[1]
+        else:
+            alfa = -math.inf
+    estado.fazer_movimento(lado, movimento)
+    valor = busca._minimax(estado, prof - 1, alfa, beta, False, lado)
+    estado.desfazer_movimento()
+    completo = not busca.tempo_esgotado()
+
+    # Só valores exatos de buscas completas podem subir o alfa compartilhado
+    # (um limite inferior acima de beta deixaria a janela dos outros vazia)
+    if completo and alfa < valor < beta:
+        with _alfa_compartilhado.get_lock():
+            if _alfa_compartilhado[0] == rodada and valor > _alfa_compartilhado[1]:
+                _alfa_compartilhado[1] = valor
+
+    contadores = {nome: getattr(busca, nome) for nome in CONTADORES}
+    return valor, alfa, completo, contadores, time.process_time() - inicio_cpu
+
+
+class BuscaParalela(BuscaAdversarial):
+    """
+    Minimax com poda Alfa-Beta com os movimentos da raiz divididos entre
+    processos
+
+    Os resultados são conciliados na ordem dos movimentos, como na busca
+    serial, e um valor que foi cortado por um alfa maior que o da busca
+    serial é refeito no processo principal quando ainda poderia mudar a
+    escolha. A busca seletiva e as análises mais profundas da tabela de
+    transposição dependem da janela e da tabela de cada processo, que não
+    são as da busca serial; por isso, em profundidade fixa (sem
+    tempo_limite nem gerenciador de tempo), a busca é sempre reprodutível
+    (ver BuscaAdversarial) aqui e nos processos, e devolve o mesmo valor e
+    o mesmo movimento que a serial com reprodutivel=True. Com prazo, fica
+    a busca configurada, já que lá a profundidade alcançada vale mais que
+    a reprodutibilidade.
+
+    Com medir_speedup, cada jogada é repetida por uma BuscaAdversarial
+    serial com as mesmas opções até a profundidade que a paralela
+    completou, e obter_estatisticas informa o ganho de tempo real.
+    """
+
+    def __init__(self, profundidade_maxima=4, tempo_limite=None, memoria_tt_mb=32,
+                 finais=None, num_processos=None, gerenciador_tempo=None,
+                 analises=None, medir_speedup=False, **opcoes):
+        """
+        Args:
+            num_processos: Número de processos (None = número de CPUs)
+            gerenciador_tempo: Usado só no processo principal; os processos
+                recebem o prazo rígido de cada tarefa
+            analises: Cache persistente, usado só no processo principal
+            medir_speedup: Repete cada jogada na busca serial para medir o
+                ganho (custa o tempo da busca serial a cada jogada)
+            opcoes: Demais opções de BuscaAdversarial, repassadas aos processos
+        """
+        super().__init__(profundidade_maxima, tempo_limite, memoria_tt_mb, finais,
+                         gerenciador_tempo=gerenciador_tempo, analises=analises,
+                         **opcoes)
+        self.opcoes = opcoes
+        self.num_processos = num_processos or os.cpu_count() or 1
+        self.memoria_tt_mb = memoria_tt_mb
+        self._executor = None
+        self._alfa = None
+        self._id_busca = 0
+        self._rodada = 0
+        self._reprodutivel_configurado = self.reprodutivel
+        self.tempo_processos = 0.0
+        self.pesquisas_refeitas = 0
+        self.tempo_busca = 0.0
+        self.tempo_completo = 0.0
+
+        # Busca serial de referência para o ganho (medir_speedup)
+        self.medir_speedup = medir_speedup
+        self._serial = None
+        self.tempo_serial = None
+        self.nos_serial = None
+        self.mesmo_movimento_serial = None
+
+    def _obter_executor(self):
+        """Cria o pool de processos na primeira busca e o reutiliza depois"""
+        if self._executor is None:
+            self._alfa = multiprocessing.Array('d', [0, -math.inf])
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_processos,
+                initializer=_inicializar_processo,
+                initargs=(self._alfa, self.memoria_tt_mb,
+                          self.finais.diretorio if self.finais else None,
+                          self.opcoes),
+            )
+        return self._executor
+
+    def encerrar(self):
+        """Encerra o pool de processos"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def melhor_movimento(self, estado, lado):
+        self._id_busca += 1
+        self.tempo_processos = 0.0
+        self.pesquisas_refeitas = 0
+        self.tempo_serial = self.nos_serial = self.mesmo_movimento_serial = None
+        self.tempo_completo = 0.0
+
+        # Profundidade fixa: busca reprodutível, para chegar ao resultado da serial
+        profundidade_fixa = self.tempo_limite is None and self.gerenciador_tempo is None
+        self._configurar_selecao(self._reprodutivel_configurado or profundidade_fixa)
+        movimento = super().melhor_movimento(estado, lado)
+        self.tempo_busca = time.monotonic() - self.inicio_busca
+
+        if self.medir_speedup and self.profundidade_completa > 0 and not self.acertos_analises:
+            self.mesmo_movimento_serial = self._medir_serial(estado, lado) == movimento
+        return movimento
+
+    def _medir_serial(self, estado, lado):
+        """
+        Repete a jogada na busca serial, até a profundidade completada aqui
+        e com a mesma busca (reprodutível ou seletiva)
+        """
+        if self._serial is None:
+            self._serial = BuscaAdversarial(memoria_tt_mb=self.memoria_tt_mb,
+                                            finais=self.finais, **self.opcoes)
+        self._serial.profundidade_maxima = self.profundidade_completa
+        self._serial._configurar_selecao(self.reprodutivel)
+        # Como nos processos, a tabela não guarda a jogada anterior
+        self._serial.tabela.limpar()
+        inicio = time.monotonic()
+        movimento = self._serial.melhor_movimento(estado, lado)
+        self.tempo_serial = time.monotonic() - inicio
+        self.nos_serial = self._serial.nos_explorados
+        return movimento
+
+    def _iteracao_raiz(self, estado, lado, prof, movimentos, alfa, beta):
+        """Distribui os movimentos da raiz entre os processos"""
+        if prof < PROFUNDIDADE_MINIMA_PARALELA or len(movimentos) < 2:
+            resultado = super()._iteracao_raiz(estado, lado, prof, movimentos, alfa, beta)
+        else:
+            resultado = self._iteracao_paralela(estado, lado, prof, movimentos, alfa, beta)
+        if resultado[2]:
+            # Instante em que a última profundidade completa terminou
+            self.tempo_completo = time.monotonic() - self.inicio_busca
+        return resultado
+
+    def _iteracao_paralela(self, estado, lado, prof, movimentos, alfa, beta):
+        """Uma rodada com os movimentos da raiz buscados pelos processos"""
+        executor = self._obter_executor()
+        prazo = self._prazo
+
+        self._rodada += 1
+        with self._alfa.get_lock():
+            self._alfa[0] = self._rodada
+            self._alfa[1] = alfa
+
+        # As tarefas são serializadas depois, por outra thread, enquanto o
+        # estado é alterado aqui pelas pesquisas refeitas: vai uma cópia
+        raiz = estado.copiar()
+        futuros = [
+            executor.submit(_buscar_movimento_raiz, self._id_busca, self._rodada, raiz,
+                            lado, movimento, prof, beta, prazo, self.reprodutivel)
+            for movimento in movimentos
+        ]
+
+        pendentes = set(futuros)
+        while pendentes:
+            restante = None if prazo is None else max(0.0, prazo - time.monotonic())
+            _, pendentes = wait(pendentes, timeout=restante,
+                                return_when=FIRST_COMPLETED)
+            if self.prazo_vencido():
+                for futuro in pendentes:
+                    futuro.cancel()
+                break
+
+        try:
+            return self._conciliar(estado, lado, prof, movimentos, futuros, alfa, beta)
+        finally:
+            # Tarefas que sobraram (corte beta ou prazo) não chegam a começar
+            for futuro in futuros:
+                futuro.cancel()
+
+    def _conciliar(self, estado, lado, prof, movimentos, futuros, alfa, beta):
+        """Junta os resultados dos processos na ordem dos movimentos, como a busca serial"""
+        melhor_mov = None
+        melhor_valor = -math.inf
+        for movimento, futuro in zip(movimentos, futuros):
+            if not futuro.done() or futuro.cancelled():
+                return melhor_mov, melhor_valor, False
+
+            valor, alfa_usado, completo, contadores, tempo = futuro.result()
+            for nome, quantidade in contadores.items():
+                setattr(self, nome, getattr(self, nome) + quantidade)
+            self.tempo_processos += tempo
+
+            if not completo:
+                return melhor_mov, melhor_valor, False
+
+            if valor <= alfa_usado and valor > alfa:
+                # Valor é só um limite superior obtido com um alfa que a busca
+                # serial ainda não teria; refaz com o alfa serial
+                self.pesquisas_refeitas += 1
+                estado.fazer_movimento(lado, movimento)
+                valor = self._minimax(estado, prof - 1, alfa, beta, False, lado)
+                estado.desfazer_movimento()
+                if self.tempo_esgotado():
+                    return melhor_mov, melhor_valor, False
+
+            if valor > melhor_valor:
+                melhor_valor = valor
+            if valor > alfa:
+                alfa = valor
+                melhor_mov = movimento
+                if valor >= beta:
+                    break
+
+        return melhor_mov, melhor_valor, True
+
+    def obter_estatisticas(self):
+        """Retorna estatísticas da última busca, incluindo a ocupação dos processos"""
+        stats = super().obter_estatisticas()
+        # Sem o tempo da busca serial de referência
+        decorrido = stats['tempo_decorrido'] = self.tempo_busca
+        stats['processos'] = self.num_processos
+        stats['tempo_processos'] = self.tempo_processos
+        stats['pesquisas_refeitas'] = self.pesquisas_refeitas
+        # Fração do tempo de relógio em que os processos estiveram buscando
+        # (não é o ganho sobre a busca serial, que também depende dos nós
+        # a mais que a divisão da raiz custa)
+        capacidade = decorrido * self.num_processos
+        stats['utilizacao'] = self.tempo_processos / capacidade if capacidade > 0 else 0.0
+        if self.tempo_serial is not None:
+            # Ganho real: a serial contra a paralela até a mesma profundidade
+            # (sem a iteração que o prazo interrompeu)
+            stats['tempo_serial'] = self.tempo_serial
+            stats['nos_serial'] = self.nos_serial
+            stats['tempo_profundidade'] = self.tempo_completo
+            stats['speedup'] = (self.tempo_serial / self.tempo_completo
+                                if self.tempo_completo > 0 else 0.0)
+            stats['mesmo_movimento_serial'] = self.mesmo_movimento_serial
+        return stats
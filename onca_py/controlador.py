@@ -2,20 +2,35 @@ import redis
 import sys
 import time
 
+from tabuleiro import conexao, codificar_tabuleiro, jogada_para_texto
+from registro import GravadorPartidas
+
 MAXSTR = 512
 MAXINT = 16
 OUTRO = lambda l: 'c' if l == 'o' else 'o'
 POS = lambda l, c: (l) * 8 + (c)
 ABS = lambda x: abs(x)
 
+TABULEIRO_INICIAL = ("#######\n"
+                     "#ccccc#\n"
+                     "#ccccc#\n"
+                     "#ccocc#\n"
+                     "#-----#\n"
+                     "#-----#\n"
+                     "# --- #\n"
+                     "#- - -#\n"
+                     "#######\n")
+
 def inicia(args):
     if len(args) < 4:
-        print("Formato: python controlador.py lado jogadas tempo [ip porta]")
+        print("Formato: python controlador.py lado jogadas tempo [ip porta formato registro]")
         print("  lado: 'o' ou 'c' para indicar quem começa")
         print("  jogadas: número máximo de jogadas")
         print("  tempo: limite em segundos por jogada (0 para sem limite)")
         print("  ip: (opcional) IP do servidor redis (padrão: 127.0.0.1)")
         print("  porta: (opcional) Porta do servidor redis (padrão: 10001)")
+        print("  formato: (opcional) 'texto' (padrão) ou 'binario' para o tabuleiro")
+        print("  registro: (opcional) arquivo onde a partida é acrescentada (registro.py)")
         sys.exit(1)
 
     lado = args[1]
@@ -23,15 +38,25 @@ def inicia(args):
     tempo = args[3]
     ip = args[4] if len(args) > 4 else "127.0.0.1"
     porta = int(args[5]) if len(args) > 5 else 10001
+    formato = args[6] if len(args) > 6 else "texto"
+    registro = args[7] if len(args) > 7 else None
 
     try:
-        redis_context = redis.Redis(host=ip, port=porta, db=0)
+        redis_context = conexao(ip, porta)
         redis_context.ping()
     except redis.exceptions.ConnectionError as e:
         print(f"Erro ao conectar com o servidor redis: {e}")
         sys.exit(1)
     
-    return redis_context, lado, jogadas, tempo
+    return redis_context, lado, jogadas, tempo, formato, registro
+
+def mensagem(lado, jogada, tabuleiro, formato):
+    if formato == 'binario':
+        try:
+            return codificar_tabuleiro(lado, jogada, tabuleiro)
+        except ValueError:
+            pass # caminho longo demais para o código binário: vai em texto
+    return f"{lado}\n{jogada}\n{tabuleiro}"
 
 def parse(jogada_str):
     parts = jogada_str.strip().split()
@@ -102,16 +127,57 @@ def mov_possivel(tipo, lo, co, ld, cd):
         
     return False
 
+def constroi_tabelas():
+    """
+    Pré-calcula as regras de mov_possivel por força bruta
+
+    mov_possivel só aceita casas com 1 <= l <= 7 e 1 <= c <= 5, então
+    testar todos os pares dessas casas dá tabelas com exatamente as mesmas
+    regras. As chaves são as coordenadas, e não POS, porque POS de
+    coordenadas fora do tabuleiro coincide com o de casas válidas.
+
+    Returns:
+        passos: {(lo, co, ld, cd): (p, pn)} dos movimentos 'm' válidos
+        saltos: {(lo, co, ld, cd): (pm, pn)} dos saltos válidos, com a casa
+            do meio
+        alvos_onca: por POS, tuplas (pn, pm) que vitoria testa para a onça,
+            com pm = -1 nos passos; como em vitoria, só os 9 deslocamentos
+            de passo e os de salto por cima de uma casa vizinha
+    """
+    casas = [(l, c) for l in range(1, 8) for c in range(1, 6)]
+    passos, saltos = {}, {}
+    alvos_onca = [()] * len(TABULEIRO_INICIAL)
+
+    for lo, co in casas:
+        for ld, cd in casas:
+            if mov_possivel('m', lo, co, ld, cd):
+                passos[(lo, co, ld, cd)] = (POS(lo, co), POS(ld, cd))
+            if mov_possivel('s', lo, co, ld, cd):
+                saltos[(lo, co, ld, cd)] = (POS((lo + ld) // 2, (co + cd) // 2), POS(ld, cd))
+
+        alvos = []
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                if mov_possivel('m', lo, co, lo + i, co + j):
+                    alvos.append((POS(lo + i, co + j), -1))
+                if mov_possivel('s', lo, co, lo + 2*i, co + 2*j):
+                    alvos.append((POS(lo + 2*i, co + 2*j), POS(lo + i, co + j)))
+        alvos_onca[POS(lo, co)] = tuple(alvos)
+
+    return passos, saltos, alvos_onca
+
+PASSOS, SALTOS, ALVOS_ONCA = constroi_tabelas()
+
 def aplica(tabuleiro, lado, tipo, num_mov, mov_l, mov_c):
     tab_list = list(tabuleiro)
     
     if tipo == 'n': return "".join(tab_list)
 
     if tipo == 'm':
-        l, c, ln, cn = mov_l[0], mov_c[0], mov_l[1], mov_c[1]
-        if not mov_possivel('m', l, c, ln, cn): return None
+        passo = PASSOS.get((mov_l[0], mov_c[0], mov_l[1], mov_c[1]))
+        if passo is None: return None
         
-        p, pn = POS(l, c), POS(ln, cn)
+        p, pn = passo
         if tab_list[p] != lado or tab_list[pn] != '-': return None
         
         tab_list[p], tab_list[pn] = '-', lado
@@ -123,13 +189,11 @@ def aplica(tabuleiro, lado, tipo, num_mov, mov_l, mov_c):
 
         for i in range(1, num_mov + 1):
             ln, cn = mov_l[i], mov_c[i]
-            if not mov_possivel('s', l, c, ln, cn): return None
+            salto = SALTOS.get((l, c, ln, cn))
+            if salto is None: return None
             
-            pn = POS(ln, cn)
+            pm, pn = salto
             if tab_list[pn] != '-': return None
-            
-            lm, cm = (l + ln) // 2, (c + cn) // 2
-            pm = POS(lm, cm)
             if tab_list[pm] != 'c': return None
             
             tab_list[p], tab_list[pm], tab_list[pn] = '-', '-', 'o'
@@ -137,53 +201,54 @@ def aplica(tabuleiro, lado, tipo, num_mov, mov_l, mov_c):
             
     return "".join(tab_list)
 
-def vitoria(lado, tab):
+def vitoria(lado, tab, onca=None):
+    # onca: POS da onça, se quem chama já sabe (evita procurar no tabuleiro)
     if lado == 'o':
         return tab.count('c') <= 9
     else: # lado 'c'
-        for l in range(1, 8):
-            for c in range(1, 6):
-                if tab[POS(l, c)] == 'o':
-                    for i in range(-1, 2):
-                        for j in range(-1, 2):
-                            if mov_possivel('m', l, c, l + i, c + j) and tab[POS(l + i, c + j)] == '-':
-                                return False
-                            if mov_possivel('s', l, c, l + 2*i, c + 2*j) and \
-                               tab[POS(l + i, c + j)] == 'c' and tab[POS(l + 2*i, c + 2*j)] == '-':
-                                return False
+        if onca is None: onca = tab.find('o')
+        if onca < 0: return True
+        for pn, pm in ALVOS_ONCA[onca]:
+            if tab[pn] == '-' and (pm < 0 or tab[pm] == 'c'):
+                return False
         return True
     return False
 
 def main():
-    c, quem_joga, num_jogadas, timeout_str = inicia(sys.argv)
+    c, quem_joga, num_jogadas, timeout_str, formato, registro = inicia(sys.argv)
     timeout = int(timeout_str) if timeout_str != "0" else None
+
+    gravador = None
+    if registro:
+        gravador = GravadorPartidas(registro)
+        gravador.iniciar(time.strftime("%Y%m%d-%H%M%S"), quem_joga)
     
     vencedor = ' '
-    tabuleiro = ("#######\n"
-                 "#ccccc#\n"
-                 "#ccccc#\n"
-                 "#ccocc#\n"
-                 "#-----#\n"
-                 "#-----#\n"
-                 "# --- #\n"
-                 "#- - -#\n"
-                 "#######\n")
+    tabuleiro = TABULEIRO_INICIAL
+    onca = POS(3, 3)
 
     print(f"{num_jogadas}:\n{tabuleiro}")
 
-    buffer = f"{quem_joga}\n{OUTRO(quem_joga)} n\n{tabuleiro}"
+    buffer = mensagem(quem_joga, f"{OUTRO(quem_joga)} n", tabuleiro, formato)
 
     while num_jogadas > 0:
         chave = f"tabuleiro_{quem_joga}"
-        c.ltrim(chave, 1, 0)
-        c.rpush(chave, buffer)
+        chave_jogada = f"jogada_{quem_joga}"
+
+        # publica o tabuleiro e espera a jogada em uma só ida ao redis
+        pipe = c.pipeline(transaction=False)
+        pipe.ltrim(chave, 1, 0)
+        pipe.rpush(chave, buffer)
+        pipe.blpop(chave_jogada, timeout=timeout)
+        inicio = time.monotonic()
+        resposta = pipe.execute()[-1]
+        decorrido = time.monotonic() - inicio
 
         ok = False
-        chave_jogada = f"jogada_{quem_joga}"
         
         try:
-            _, jogada_bytes = c.blpop(chave_jogada, timeout=timeout)
-            jogada = jogada_bytes.decode('utf-8')
+            _, jogada_bytes = resposta
+            jogada = jogada_para_texto(jogada_bytes)
             
             lado_p, tipo_mov, num_mov, mov_l, mov_c = parse(jogada)
             
@@ -192,6 +257,8 @@ def main():
                 if novo_tabuleiro:
                     tabuleiro = novo_tabuleiro
                     ok = True
+                    if lado_p == 'o' and tipo_mov != 'n':
+                        onca = POS(mov_l[-1], mov_c[-1])
         except TypeError: # blpop returns None on timeout
             jogada = f"{quem_joga} n"
 
@@ -200,26 +267,34 @@ def main():
 
         print(f"{num_jogadas}: {jogada.strip()}")
         print(tabuleiro)
+        if gravador:
+            gravador.jogada_texto(jogada, decorrido)
 
-        if vitoria(quem_joga, tabuleiro):
+        if vitoria(quem_joga, tabuleiro, onca):
             print(f"{num_jogadas}: vitória de {quem_joga}")
             vencedor = quem_joga
             break
 
         quem_joga = OUTRO(quem_joga)
-        buffer = f"{quem_joga}\n{jogada.strip()}\n{tabuleiro}"
+        buffer = mensagem(quem_joga, jogada.strip(), tabuleiro, formato)
         num_jogadas -= 1
 
-    buffer_o = f"o\nc n\n{tabuleiro}"
-    c.rpush("tabuleiro_o", buffer_o)
+    pipe = c.pipeline(transaction=False)
+    buffer_o = mensagem("o", "c n", tabuleiro, formato)
+    pipe.rpush("tabuleiro_o", buffer_o)
     
-    buffer_c = f"c\no n\n{tabuleiro}"
-    c.rpush("tabuleiro_c", buffer_c)
+    buffer_c = mensagem("c", "o n", tabuleiro, formato)
+    pipe.rpush("tabuleiro_c", buffer_c)
+    pipe.execute()
 
     if num_jogadas == 0:
         print("empate")
     else:
         print(f"vencedor: {vencedor}")
 
+    if gravador:
+        gravador.terminar('empate' if num_jogadas == 0 else vencedor)
+        gravador.fechar()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,310 @@
+"""
+Medidas de desempenho do motor - perft, busca e avaliação
+
+Três grupos de medidas sobre um conjunto fixo de posições (POSICOES):
+
+    perft: folhas da árvore de movimentos até PROFUNDIDADE_PERFT, com
+           gerar_movimentos/aplicar_movimento, em EstadoJogo e
+           EstadoBitboard. As contagens conferem a geração de movimentos
+           (as duas classes têm de dar o mesmo número) e o tempo mede a
+           velocidade de gerar e aplicar.
+    busca: BuscaAdversarial com profundidade fixa e sem limite de tempo,
+           uma busca nova por posição: nós, nós por segundo e taxas de
+           corte.
+    micro: tempo por chamada de _avaliar, _parse_tabuleiro e para_string.
+
+As medidas são gravadas em JSON e podem ser comparadas com um arquivo de
+referência, por padrão BASE (desempenho_base.json, ao lado deste módulo,
+com a máquina e a versão do Python em que foi medido): uma contagem de
+perft diferente é um erro, e uma piora de velocidade maior que o limite é
+uma regressão (saída com código 1). Os tempos são o melhor de REPETICOES
+execuções e só são comparáveis entre medidas da mesma máquina; a
+referência deve ser regravada quando a máquina muda.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+from jogo import EstadoJogo
+from jogo_bitboard import EstadoBitboard
+from busca import BuscaAdversarial
+
+VERSAO = 1
+REPETICOES = 5
+LIMITE_REGRESSAO = 0.10  # Piora relativa tolerada
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'desempenho_base.json')
+
+PROFUNDIDADE_PERFT = 5
+PROFUNDIDADE_BUSCA = 5
+
+# Posições de teste: tabuleiro do controlador e lado a jogar. As do meio
+# do jogo saíram de partidas com lances sorteados (sementes fixas).
+POSICOES = {
+    'abertura': (None, 'o'),
+    'meio_saltos': ("#######\n#ccccc#\n#c---c#\n#ccccc#\n#---o-#\n"
+                    "#--c--#\n# --- #\n#- - -#\n#######\n", 'o'),
+    'meio_cerco': ("#######\n#ccccc#\n#cc-cc#\n#--c-c#\n#-c-c-#\n"
+                   "#--oc-#\n# --- #\n#- - -#\n#######\n", 'c'),
+    'meio_avancado': ("#######\n#c-ccc#\n#c-ccc#\n#-cc--#\n#----c#\n"
+                      "#-o---#\n# --c #\n#- - -#\n#######\n", 'o'),
+    'final': ("#######\n#-c-cc#\n#ccc-c#\n#cc-cc#\n#--c--#\n"
+              "#-o---#\n# --- #\n#- - -#\n#######\n", 'c'),
+}
+
+OUTRO = lambda l: 'c' if l == 'o' else 'o'
+
+
+def perft(estado, lado, profundidade):
+    """
+    Conta as folhas da árvore de movimentos até a profundidade dada
+
+    Uma posição com vencedor é folha (a partida acabou); um lado sem
+    movimentos não contribui com folhas.
+    """
+    if profundidade == 0 or estado.vencedor() is not None:
+        return 1
+    proximo = OUTRO(lado)
+    if profundidade == 1:
+        return len(estado.gerar_movimentos(lado))
+    return sum(perft(estado.aplicar_movimento(lado, mov), proximo, profundidade - 1)
+               for mov in estado.gerar_movimentos(lado))
+
+
+def perft_dividido(estado, lado, profundidade):
+    """Perft de cada movimento da raiz, para localizar uma diferença"""
+    return {
+        estado.movimento_para_string(lado, mov):
+            perft(estado.aplicar_movimento(lado, mov), OUTRO(lado), profundidade - 1)
+        for mov in estado.gerar_movimentos(lado)
+    }
+
+
+def _melhor_tempo(funcao, numero=1):
+    """Menor tempo (s) de uma chamada de funcao entre REPETICOES rodadas"""
+    return min(timeit.repeat(funcao, number=numero, repeat=REPETICOES)) / numero
+
+
+def medir_perft(profundidade=PROFUNDIDADE_PERFT):
+    """Contagens por profundidade e velocidade do perft em cada posição e classe"""
+    resultados = {}
+    for nome, (tabuleiro, lado) in POSICOES.items():
+        for Estado in (EstadoJogo, EstadoBitboard):
+            estado = Estado(tabuleiro)
+            contagens = [perft(estado, lado, p) for p in range(1, profundidade + 1)]
+            segundos = _melhor_tempo(lambda: perft(Estado(tabuleiro), lado, profundidade))
+            resultados[f"{nome}/{Estado.__name__}"] = {
+                'contagens': contagens,
+                'segundos': segundos,
+                'folhas_por_segundo': contagens[-1] / segundos,
+            }
+    return resultados
+
+
+def medir_busca(profundidade=PROFUNDIDADE_BUSCA):
+    """Busca de profundidade fixa em cada posição, como no ia_jogador"""
+    resultados = {}
+    for nome, (tabuleiro, lado) in POSICOES.items():
+        melhor = None
+        for _ in range(REPETICOES):
+            busca = BuscaAdversarial(profundidade_maxima=profundidade, memoria_tt_mb=16)
+            inicio = time.perf_counter()
+            movimento = busca.melhor_movimento(EstadoBitboard(tabuleiro), lado)
+            segundos = time.perf_counter() - inicio
+            if melhor is None or segundos < melhor[0]:
+                melhor = (segundos, busca, movimento)
+
+        segundos, busca, movimento = melhor
+        stats = busca.obter_estatisticas()
+        nos = stats['nos_explorados']
+        cortes = stats['cortes_alfa'] + stats['cortes_beta']
+        resultados[nome] = {
+            'movimento': EstadoJogo(tabuleiro).movimento_para_string(lado, movimento)
+                         if movimento else f"{lado} n",
+            'valor': stats['valor'],
+            'nos': nos,
+            'segundos': segundos,
+            'nos_por_segundo': nos / segundos,
+            'taxa_cortes': cortes / nos if nos else 0.0,
+            'cortes_primeiro_movimento': (stats['cortes_primeiro_movimento'] / cortes
+                                          if cortes else 0.0),
+            'tt_acertos': (stats['tt_acertos'] / stats['tt_consultas']
+                           if stats['tt_consultas'] else 0.0),
+        }
+    return resultados
+
+
+def _avaliar_sem_analise(busca, estado, lado):
+    """_avaliar como numa folha nova, sem a análise guardada no estado"""
+    estado._analise = None
+    return busca._avaliar(estado, lado)
+
+
+def medir_micro(numero=2000):
+    """Tempo por chamada (ns) das funções mais chamadas pela busca"""
+    busca = BuscaAdversarial()
+    tabuleiro, lado = POSICOES['meio_saltos']
+    jogo = EstadoJogo(tabuleiro)
+    bitboard = EstadoBitboard(tabuleiro)
+
+    funcoes = {
+        '_avaliar/EstadoJogo': lambda: _avaliar_sem_analise(busca, jogo, lado),
+        '_avaliar/EstadoBitboard': lambda: _avaliar_sem_analise(busca, bitboard, lado),
+        '_parse_tabuleiro': lambda: jogo._parse_tabuleiro(tabuleiro),
+        'para_string/EstadoJogo': jogo.para_string,
+        'para_string/EstadoBitboard': bitboard.para_string,
+    }
+    return {nome: {'ns_por_chamada': _melhor_tempo(funcao, numero) * 1e9}
+            for nome, funcao in funcoes.items()}
+
+
+def medir():
+    """Todas as medidas, no formato gravado em JSON"""
+    return {
+        'versao': VERSAO,
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'maquina': platform.machine(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor(),
+        'cpus': os.cpu_count(),
+        'perft': medir_perft(),
+        'busca': medir_busca(),
+        'micro': medir_micro(),
+    }
+
+
+def carregar_base(caminho=BASE):
+    """Medidas de referência gravadas por medir"""
+    with open(caminho) as arquivo:
+        return json.load(arquivo)
+
+
+def comparar(atual, base=None, limite=LIMITE_REGRESSAO):
+    """
+    Compara medidas com as de referência (None = as de BASE)
+
+    Returns:
+        Tupla (erros, regressoes, avisos) com uma linha de texto por item:
+        contagens de perft diferentes, pioras de velocidade acima do limite
+        e mudanças que não são necessariamente um problema (nós da busca,
+        medidas ausentes)
+    """
+    if base is None:
+        base = carregar_base()
+    erros, regressoes, avisos = [], [], []
+
+    for campo in ('maquina', 'processador', 'python'):
+        if base.get(campo) != atual.get(campo):
+            avisos.append(f"{campo} da referência: {base.get(campo)!r}, "
+                          f"atual: {atual.get(campo)!r} (tempos pouco comparáveis)")
+
+    def piora(nome, valor, referencia, maior_melhor):
+        if not referencia:
+            return
+        variacao = valor / referencia - 1
+        if maior_melhor:
+            variacao = -variacao
+        if variacao > limite:
+            regressoes.append(f"{nome}: {referencia:.6g} -> {valor:.6g} "
+                              f"({variacao:+.1%} pior)")
+
+    for grupo in ('perft', 'busca', 'micro'):
+        for nome, ref in base.get(grupo, {}).items():
+            med = atual.get(grupo, {}).get(nome)
+            chave = f"{grupo}/{nome}"
+            if med is None:
+                avisos.append(f"{chave}: ausente nas medidas atuais")
+                continue
+
+            if grupo == 'perft':
+                n = min(len(med['contagens']), len(ref['contagens']))
+                if med['contagens'][:n] != ref['contagens'][:n]:
+                    erros.append(f"{chave}: contagens {med['contagens'][:n]} "
+                                 f"!= {ref['contagens'][:n]}")
+                    continue
+                if len(med['contagens']) == len(ref['contagens']):
+                    piora(chave, med['folhas_por_segundo'], ref['folhas_por_segundo'], True)
+            elif grupo == 'busca':
+                if med['nos'] != ref['nos']:
+                    avisos.append(f"{chave}: {ref['nos']} -> {med['nos']} nós")
+                if med['movimento'] != ref['movimento']:
+                    avisos.append(f"{chave}: movimento {ref['movimento']!r} -> "
+                                  f"{med['movimento']!r}")
+                piora(chave, med['nos_por_segundo'], ref['nos_por_segundo'], True)
+            else:
+                piora(chave, med['ns_por_chamada'], ref['ns_por_chamada'], False)
+
+    return erros, regressoes, avisos
+
+
+def mostrar(medidas):
+    """Resumo legível das medidas"""
+    print("perft:")
+    for nome, med in medidas['perft'].items():
+        print(f"  {nome:32} {med['contagens']}  {med['folhas_por_segundo']:10.0f} folhas/s")
+    print("busca:")
+    for nome, med in medidas['busca'].items():
+        print(f"  {nome:16} {med['nos']:8} nós {med['nos_por_segundo']:8.0f} nós/s  "
+              f"cortes {med['taxa_cortes']:.1%} (1º mov. {med['cortes_primeiro_movimento']:.1%})"
+              f"  {med['movimento']}")
+    print("micro:")
+    for nome, med in medidas['micro'].items():
+        print(f"  {nome:32} {med['ns_por_chamada']:10.0f} ns")
+
+
+def _relatorio(atual, base, limite):
+    """Mostra a comparação e retorna o código de saída (1 = erro ou regressão)"""
+    print(f"referência de {base.get('data')}: Python {base.get('python')}, "
+          f"{base.get('plataforma', base.get('maquina'))}, {base.get('cpus')} CPUs")
+    erros, regressoes, avisos = comparar(atual, base, limite)
+    for titulo, linhas in (("erros", erros), ("regressões", regressoes), ("avisos", avisos)):
+        if linhas:
+            print(f"{titulo}:")
+            for linha in linhas:
+                print(f"  {linha}")
+    if not (erros or regressoes):
+        print(f"sem regressões (limite {limite:.0%})")
+    return 1 if erros or regressoes else 0
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Formato:")
+        print("  python desempenho.py medir saida.json [base.json limite]")
+        print("  python desempenho.py comparar atual.json [base.json limite]")
+        print("  saida.json: arquivo onde as medidas são gravadas ('-' para só mostrar)")
+        print("  base.json: (opcional) medidas de referência; em comparar, '-' ou")
+        print(f"      ausente = {os.path.basename(BASE)} (em medir, ausente = não compara)")
+        print(f"  limite: (opcional) piora relativa tolerada (padrão: {LIMITE_REGRESSAO})")
+        sys.exit(1)
+
+    modo = sys.argv[1]
+    if modo == 'medir':
+        medidas = medir()
+        mostrar(medidas)
+        if sys.argv[2] != '-':
+            with open(sys.argv[2], 'w') as arquivo:
+                json.dump(medidas, arquivo, indent=1)
+        if len(sys.argv) < 4:
+            return
+        caminho_base = sys.argv[3]
+        limite = float(sys.argv[4]) if len(sys.argv) > 4 else LIMITE_REGRESSAO
+    elif modo == 'comparar':
+        with open(sys.argv[2]) as arquivo:
+            medidas = json.load(arquivo)
+        caminho_base = sys.argv[3] if len(sys.argv) > 3 else '-'
+        limite = float(sys.argv[4]) if len(sys.argv) > 4 else LIMITE_REGRESSAO
+    else:
+        print(f"Erro: modo desconhecido '{modo}' (use medir ou comparar)")
+        sys.exit(1)
+
+    base = carregar_base(BASE if caminho_base == '-' else caminho_base)
+    sys.exit(_relatorio(medidas, base, limite))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Base de finais do Jogo da Onça por análise retrógrada
+
+Resolve exatamente uma classe limitada de posições: a onça e exatamente k
+cachorros, todos dentro de uma região do tabuleiro (por padrão as linhas
+4 a 7), com qualquer um dos lados a jogar. Cada posição recebe vitória ou
+derrota do lado a jogar e a distância (em lances) até o fim, ou fica como
+desconhecida quando o resultado depende de posições fora da classe.
+
+As regras são as de EstadoJogo: a onça vence com 9 cachorros ou menos e os
+cachorros vencem quando a onça não tem movimentos. Se os cachorros não
+tiverem movimento, passam a vez.
+
+Cada tabela (uma por número de cachorros) é um arquivo com um byte por
+posição, indexado diretamente a partir dos bitboards, de modo que a
+consulta custa O(1). A geração é feita em passadas sucessivas; ao fim de
+cada passada a tabela parcial é gravada em disco, então uma geração
+interrompida é retomada da última passada concluída. Cada passada é
+dividida entre processos.
+"""
+
+import glob
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+from jogo import CASAS, INDICE
+from jogo_bitboard import PASSOS, SALTOS, MASCARA_PASSOS, TODAS, EstadoBitboard, _bits
+
+MAGIA = b'ONCF'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sHBBBBHH')
+INICIO_DADOS = 48
+
+# Valores de cada byte da tabela
+DESCONHECIDO = 0
+INVALIDA = 1
+MAX_DISTANCIA = 126
+
+REGIAO_PADRAO = tuple(pos for pos in CASAS if pos[0] >= 4)
+
+OUTRO = lambda l: 'c' if l == 'o' else 'o'
+LADOS = ('o', 'c')
+
+
+def _codificar(vence, distancia):
+    """Byte de uma posição resolvida: vitória/derrota do lado a jogar e distância"""
+    return 2 + 2 * distancia + (0 if vence else 1)
+
+
+def _decodificar(valor):
+    """Inverso de _codificar; retorna (vence, distancia)"""
+    valor -= 2
+    return (valor & 1) == 0, valor >> 1
+
+
+def _onca_presa(cachorros, onca):
+    """Verifica se a onça não tem nenhum passo ou salto"""
+    i = onca.bit_length() - 1
+    vazio = TODAS & ~(cachorros | onca)
+    if MASCARA_PASSOS[i] & vazio:
+        return False
+    for bit_meio, _, bit_destino in SALTOS[i]:
+        if cachorros & bit_meio and vazio & bit_destino:
+            return False
+    return True
+
+
+def _vencedor(cachorros, onca):
+    """Mesma regra de EstadoJogo.vencedor sobre bitboards"""
+    if cachorros.bit_count() <= 9:
+        return 'o'
+    if _onca_presa(cachorros, onca):
+        return 'c'
+    return None
+
+
+def _sucessores(cachorros, onca, lado):
+    """Lista os bitboards (cachorros, onca) alcançáveis em um lance"""
+    vazio = TODAS & ~(cachorros | onca)
+    filhos = []
+
+    if lado == 'c':
+        for i in _bits(cachorros):
+            for _, bit in PASSOS[i]:
+                if vazio & bit:
+                    filhos.append((cachorros ^ (1 << i) ^ bit, onca))
+        return filhos
+
+    i = onca.bit_length() - 1
+    for _, bit in PASSOS[i]:
+        if vazio & bit:
+            filhos.append((cachorros, bit))
+
+    # Saltos (inclusive múltiplos); a casa de origem da onça não fica vazia
+    # durante a sequência, como em EstadoJogo._gerar_saltos_recursivos
+    pilha = [(i, 0)]
+    while pilha:
+        atual, capturados = pilha.pop()
+        for bit_meio, j, bit_destino in SALTOS[atual]:
+            if not cachorros & bit_meio or capturados & bit_meio:
+                continue
+            if not vazio & bit_destino:
+                continue
+            novos = capturados | bit_meio
+            filhos.append((cachorros & ~novos, bit_destino))
+            pilha.append((j, novos))
+
+    return filhos
+
+
+class Indexador:
+    """Numeração das posições da classe (região, k cachorros, lado a jogar)"""
+
+    def __init__(self, regiao, num_cachorros):
+        self.regiao = tuple(sorted(regiao, key=INDICE.get))
+        self.num_cachorros = num_cachorros
+        self.tamanho_regiao = len(self.regiao)
+        self.mascara = sum(1 << INDICE[pos] for pos in self.regiao)
+
+        # Índice regional de cada bit global (-1 fora da região) e o inverso
+        self.regional = [-1] * len(CASAS)
+        for r, pos in enumerate(self.regiao):
+            self.regional[INDICE[pos]] = r
+        self.bit_global = [1 << INDICE[pos] for pos in self.regiao]
+
+        self.combinacoes = comb(self.tamanho_regiao, num_cachorros)
+        self.tamanho = 2 * self.tamanho_regiao * self.combinacoes
+        self._comb = [[comb(n, i) for i in range(num_cachorros + 1)]
+                      for n in range(self.tamanho_regiao + 1)]
+
+    def contem(self, cachorros, onca):
+        """Verifica se a posição pertence à classe"""
+        return (not ((cachorros | onca) & ~self.mascara)
+                and cachorros.bit_count() == self.num_cachorros)
+
+    def indice(self, cachorros, onca, lado):
+        """Índice da posição na tabela (a posição precisa pertencer à classe)"""
+        regional = self.regional
+        comb_ = self._comb
+        posto = 0
+        for n, i in enumerate(_bits(cachorros), 1):
+            posto += comb_[regional[i]][n]
+        r_onca = regional[onca.bit_length() - 1]
+        return ((0 if lado == 'o' else 1) * self.tamanho_regiao + r_onca) * self.combinacoes + posto
+
+    def posicao(self, indice):
+        """Inverso de indice; retorna (cachorros, onca, lado) ou None se inválida"""
+        posto = indice % self.combinacoes
+        resto = indice // self.combinacoes
+        r_onca = resto % self.tamanho_regiao
+        lado = 'o' if resto < self.tamanho_regiao else 'c'
+
+        cachorros = 0
+        n = self.tamanho_regiao
+        for i in range(self.num_cachorros, 0, -1):
+            n -= 1
+            while self._comb[n][i] > posto:
+                n -= 1
+            posto -= self._comb[n][i]
+            cachorros |= self.bit_global[n]
+
+        onca = self.bit_global[r_onca]
+        if cachorros & onca:
+            return None
+        return cachorros, onca, lado
+
+
+class TabelaFinais:
+    """Tabela de finais (uma quantidade de cachorros) lida via mmap"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(caminho, 'rb') as arquivo:
+            self._dados = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magia, versao, num_cachorros, tamanho_regiao, self.completa, _,
+         self.passada, self.distancia_maxima) = CABECALHO.unpack_from(self._dados, 0)
+        if magia != MAGIA or versao != VERSAO:
+            self._dados.close()
+            raise ValueError(f"Arquivo não é uma tabela de finais válida: {caminho}")
+
+        inicio = CABECALHO.size
+        regiao = tuple(CASAS[i] for i in self._dados[inicio:inicio + tamanho_regiao])
+        self.indexador = Indexador(regiao, num_cachorros)
+        self.num_cachorros = num_cachorros
+
+    def fechar(self):
+        self._dados.close()
+
+    def valor(self, cachorros, onca, lado):
+        """Byte bruto da posição, ou DESCONHECIDO se ela não pertence à classe"""
+        if not self.indexador.contem(cachorros, onca):
+            return DESCONHECIDO
+        return self._dados[INICIO_DADOS + self.indexador.indice(cachorros, onca, lado)]
+
+    def sondar_bits(self, cachorros, onca, lado):
+        """Retorna (vence, distancia) para o lado a jogar, ou None"""
+        valor = self.valor(cachorros, onca, lado)
+        if valor < 2:
+            return None
+        return _decodificar(valor)
+
+
+class BaseFinais:
+    """Conjunto de tabelas de finais de um diretório, uma por número de cachorros"""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.tabelas = {}
+        for caminho in sorted(glob.glob(os.path.join(diretorio, 'finais_*.bin'))):
+            tabela = TabelaFinais(caminho)
+            if tabela.completa:
+                self.tabelas[tabela.num_cachorros] = tabela
+            else:
+                tabela.fechar()
+        self.consultas = 0
+        self.acertos = 0
+
+    def __len__(self):
+        return len(self.tabelas)
+
+    def sondar(self, estado, lado):
+        """
+        Consulta a posição com o lado a jogar
+
+        Returns:
+            None se a posição não está resolvida, ou a tupla
+            (vencedor, distancia) com o lado vencedor ('o' ou 'c') e o
+            número de lances até o fim com jogo perfeito
+        """
+        self.consultas += 1
+        if isinstance(estado, EstadoBitboard):
+            cachorros, onca = estado.cachorros, estado.onca
+        else:
+            cachorros = sum(1 << INDICE[pos] for pos in estado.posicoes_cachorros())
+            pos_onca = estado.posicao_onca()
+            if pos_onca is None:
+                return None
+            onca = 1 << INDICE[pos_onca]
+
+        tabela = self.tabelas.get(cachorros.bit_count())
+        if tabela is None:
+            return None
+        resultado = tabela.sondar_bits(cachorros, onca, lado)
+        if resultado is None:
+            return None
+
+        self.acertos += 1
+        vence, distancia = resultado
+        return (lado if vence else OUTRO(lado)), distancia
+
+
+# Estado de cada processo da geração
+_inferiores = {}
+
+
+def _inicializar_processo(caminhos_inferiores):
+    """Abre, em cada processo, as tabelas já concluídas com menos cachorros"""
+    global _inferiores
+    _inferiores = {}
+    for caminho in caminhos_inferiores:
+        tabela = TabelaFinais(caminho)
+        _inferiores[tabela.num_cachorros] = tabela
+
+
+def _resolver_faixa(caminho_parcial, inicio, fim, passada):
+    """
+    Executa uma passada sobre os índices [inicio, fim) da tabela parcial
+
+    Uma posição vence em `passada` lances se algum lance leva a uma posição
+    perdida em no máximo passada - 1, e perde se todos os lances levam a
+    posições vencidas pelo adversário em no máximo passada - 1.
+
+    Returns:
+        Lista de (indice, byte) das posições resolvidas nesta passada
+    """
+    atual = TabelaFinais(caminho_parcial)
+    indexador = atual.indexador
+    dados = atual._dados
+    limite = passada - 1
+    resolvidas = []
+
+    def valor_filho(cachorros, onca, lado):
+        vencedor = _vencedor(cachorros, onca)
+        if vencedor is not None:
+            return vencedor == lado, 0
+        if indexador.contem(cachorros, onca):
+            valor = dados[INICIO_DADOS + indexador.indice(cachorros, onca, lado)]
+        else:
+            tabela = _inferiores.get(cachorros.bit_count())
+            if tabela is None:
+                return None
+            valor = tabela.valor(cachorros, onca, lado)
+        if valor < 2:
+            return None
+        return _decodificar(valor)
+
+    for indice in range(inicio, fim):
+        if dados[INICIO_DADOS + indice] != DESCONHECIDO:
+            continue
+        cachorros, onca, lado = indexador.posicao(indice)
+        outro = OUTRO(lado)
+
+        filhos = _sucessores(cachorros, onca, lado)
+        if not filhos:
+            filhos = [(cachorros, onca)]  # Passa a vez
+
+        menor_derrota = None
+        maior_vitoria = -1
+        todas_vencidas = True
+        for filho_c, filho_o in filhos:
+            resultado = valor_filho(filho_c, filho_o, outro)
+            if resultado is None or resultado[1] > limite:
+                todas_vencidas = False
+                continue
+            vence_filho, distancia = resultado
+            if not vence_filho:
+                if menor_derrota is None or distancia < menor_derrota:
+                    menor_derrota = distancia
+                todas_vencidas = False
+            elif distancia > maior_vitoria:
+                maior_vitoria = distancia
+
+        if menor_derrota is not None:
+            resolvidas.append((indice, _codificar(True, menor_derrota + 1)))
+        elif todas_vencidas:
+            resolvidas.append((indice, _codificar(False, maior_vitoria + 1)))
+
+    atual.fechar()
+    return resolvidas
+
+
+def _gravar_tabela(caminho, indexador, dados, completa, passada, distancia_maxima):
+    """Grava a tabela de forma atômica (arquivo temporário + rename)"""
+    cabecalho = bytearray(INICIO_DADOS)
+    CABECALHO.pack_into(cabecalho, 0, MAGIA, VERSAO, indexador.num_cachorros,
+                        indexador.tamanho_regiao, 1 if completa else 0, 0,
+                        passada, distancia_maxima)
+    inicio = CABECALHO.size
+    cabecalho[inicio:inicio + indexador.tamanho_regiao] = bytes(
+        INDICE[pos] for pos in indexador.regiao
+    )
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(cabecalho)
+        arquivo.write(dados)
+    os.replace(temporario, caminho)
+
+
+def _tabela_inicial(indexador):
+    """Marca posições inválidas e terminais (distância 0)"""
+    dados = bytearray(indexador.tamanho)
+    for indice in range(indexador.tamanho):
+        posicao = indexador.posicao(indice)
+        if posicao is None:
+            dados[indice] = INVALIDA
+            continue
+        cachorros, onca, lado = posicao
+        vencedor = _vencedor(cachorros, onca)
+        if vencedor is not None:
+            dados[indice] = _codificar(vencedor == lado, 0)
+    return dados
+
+
+def gerar_tabela(diretorio, num_cachorros, regiao=REGIAO_PADRAO, processos=None):
+    """
+    Gera (ou retoma) a tabela de finais com num_cachorros cachorros
+
+    As tabelas com menos cachorros já concluídas no diretório são usadas
+    para resolver as capturas. Retorna o caminho da tabela concluída.
+    """
+    processos = processos or os.cpu_count() or 1
+    indexador = Indexador(regiao, num_cachorros)
+    caminho = os.path.join(diretorio, f'finais_{num_cachorros}.bin')
+    parcial = caminho + '.parcial'
+
+    if os.path.exists(caminho):
+        existente = TabelaFinais(caminho)
+        existente.fechar()
+        if existente.completa and existente.indexador.regiao == indexador.regiao:
+            return caminho
+
+    caminhos_inferiores = []
+    distancia_inferior = 0
+    for k in range(10, num_cachorros):
+        caminho_k = os.path.join(diretorio, f'finais_{k}.bin')
+        if os.path.exists(caminho_k):
+            tabela = TabelaFinais(caminho_k)
+            if tabela.completa and tabela.indexador.regiao == indexador.regiao:
+                caminhos_inferiores.append(caminho_k)
+                distancia_inferior = max(distancia_inferior, tabela.distancia_maxima)
+            tabela.fechar()
+
+    # Retoma a partir da última passada gravada, se houver
+    passada = 0
+    if os.path.exists(parcial):
+        anterior = TabelaFinais(parcial)
+        if anterior.indexador.regiao == indexador.regiao:
+            dados = bytearray(anterior._dados[INICIO_DADOS:INICIO_DADOS + indexador.tamanho])
+            passada = anterior.passada
+            print(f"Retomando {caminho} após a passada {passada}", file=sys.stderr)
+        anterior.fechar()
+    if passada == 0:
+        dados = _tabela_inicial(indexador)
+        _gravar_tabela(parcial, indexador, dados, False, 0, 0)
+
+    distancia_maxima = passada
+    tamanho_faixa = -(-indexador.tamanho // (4 * processos))
+    faixas = [(i, min(i + tamanho_faixa, indexador.tamanho))
+              for i in range(0, indexador.tamanho, tamanho_faixa)]
+
+    with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo,
+                             initargs=(caminhos_inferiores,)) as executor:
+        while passada < MAX_DISTANCIA:
+            passada += 1
+            futuros = [executor.submit(_resolver_faixa, parcial, inicio, fim, passada)
+                       for inicio, fim in faixas]
+            novas = 0
+            for futuro in futuros:
+                for indice, valor in futuro.result():
+                    dados[indice] = valor
+                    novas += 1
+
+            if novas:
+                distancia_maxima = passada
+            _gravar_tabela(parcial, indexador, dados, False, passada, distancia_maxima)
+            print(f"{num_cachorros} cachorros, passada {passada}: {novas} posições resolvidas",
+                  file=sys.stderr)
+
+            # Sem novidades e sem distâncias das tabelas inferiores por alcançar
+            if not novas and passada > distancia_inferior:
+                break
+
+    _gravar_tabela(caminho, indexador, dados, True, passada, distancia_maxima)
+    os.remove(parcial)
+    return caminho
+
+
+def gerar(diretorio, cachorros=(10, 11), regiao=REGIAO_PADRAO, processos=None):
+    """Gera as tabelas em ordem crescente de cachorros"""
+    os.makedirs(diretorio, exist_ok=True)
+    return [gerar_tabela(diretorio, k, regiao, processos) for k in sorted(cachorros)]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Formato: python finais.py diretorio [cachorros processos linha_inicial]")
+        print("  diretorio: onde gravar as tabelas (finais_<k>.bin)")
+        print("  cachorros: (opcional) quantidades separadas por vírgula (padrão: 10,11)")
+        print("  processos: (opcional) processos em paralelo (padrão: número de CPUs)")
+        print("  linha_inicial: (opcional) região = linhas a partir desta (padrão: 4)")
+        sys.exit(1)
+
+    diretorio = sys.argv[1]
+    cachorros = tuple(int(k) for k in sys.argv[2].split(',')) if len(sys.argv) > 2 else (10, 11)
+    processos = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    linha = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    regiao = tuple(pos for pos in CASAS if pos[0] >= linha)
+
+    for caminho in gerar(diretorio, cachorros, regiao, processos):
+        print(f"Tabela concluída: {caminho}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
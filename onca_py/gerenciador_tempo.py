@@ -0,0 +1,127 @@
+"""
+Gerenciamento do tempo de pensamento por jogada
+
+O controlador dá a cada jogada um limite fixo (`tempo` em controlador.py) e
+passa a vez com 'n' quem não responde a tempo. O gerenciador transforma esse
+limite em dois prazos absolutos, medidos com time.monotonic a partir do
+momento em que o tabuleiro chega:
+
+    prazo rígido: limite do controlador menos uma margem para a latência do
+                  Redis e da própria máquina; a busca é interrompida nele
+    prazo suave:  uma fração do tempo disponível; depois dele não se começa
+                  uma nova iteração, que custaria várias vezes a anterior
+
+Com um orçamento total por partida (tempo_partida), o tempo disponível de
+cada jogada é o que sobrou do orçamento dividido pelas jogadas que ainda
+restam até o limite de jogadas da partida (`jogadas` em controlador.py),
+sem passar do limite por jogada.
+
+Quando o melhor movimento muda entre duas iterações, o prazo suave é
+estendido, já que a decisão ainda não se firmou, até no máximo o dobro.
+"""
+
+import time
+
+# Margem descontada do limite do controlador: fração do limite, com mínimo
+FRACAO_MARGEM = 0.05
+MARGEM_MINIMA = 0.3
+
+# Fração do tempo disponível até o prazo suave, extensão a cada troca do
+# melhor movimento e máximo das extensões somadas (frações do prazo suave
+# original)
+FRACAO_SUAVE = 0.4
+FRACAO_EXTENSAO = 0.5
+MAXIMO_EXTENSAO = 1.0
+
+
+class GerenciadorTempo:
+    """Calcula os prazos de cada jogada e acompanha o orçamento da partida"""
+
+    def __init__(self, tempo_jogada=None, num_jogadas=None, tempo_partida=None,
+                 fracao_suave=FRACAO_SUAVE):
+        """
+        Args:
+            tempo_jogada: Limite do controlador por jogada em segundos
+                (None = sem limite)
+            num_jogadas: Limite de jogadas da partida no controlador (as dos
+                dois lados), usado para dividir tempo_partida
+            tempo_partida: Orçamento total de pensamento do jogador na
+                partida (None = só o limite por jogada)
+            fracao_suave: Fração do tempo disponível até o prazo suave
+        """
+        self.tempo_jogada = tempo_jogada
+        self.num_jogadas = num_jogadas
+        self.tempo_partida = tempo_partida
+        self.fracao_suave = fracao_suave
+
+        self.tempo_usado = 0.0
+        self.inicio = None
+        self.prazo_suave = None
+        self.prazo_rigido = None
+        self._extensao = 0.0
+        self._prazo_suave_maximo = None
+        self.extensoes = 0
+
+    def jogadas_restantes(self, jogadas_feitas):
+        """Jogadas deste lado que ainda cabem no limite da partida"""
+        if self.num_jogadas is None:
+            return None
+        # O limite do controlador conta as jogadas dos dois lados
+        return max(1, (self.num_jogadas - 2 * jogadas_feitas + 1) // 2)
+
+    def tempo_disponivel(self, jogadas_feitas=0):
+        """Segundos que a jogada pode usar até o prazo rígido (None = sem limite)"""
+        disponivel = None
+        if self.tempo_jogada is not None:
+            margem = max(MARGEM_MINIMA, self.tempo_jogada * FRACAO_MARGEM)
+            disponivel = max(0.0, self.tempo_jogada - margem)
+
+        restantes = self.jogadas_restantes(jogadas_feitas)
+        if self.tempo_partida is not None and restantes is not None:
+            cota = max(0.0, self.tempo_partida - self.tempo_usado) / restantes
+            disponivel = cota if disponivel is None else min(disponivel, cota)
+
+        return disponivel
+
+    def iniciar(self, jogadas_feitas=0):
+        """
+        Marca o início de uma jogada e calcula os seus prazos
+
+        Args:
+            jogadas_feitas: Jogadas já feitas por este lado na partida
+        """
+        self.inicio = time.monotonic()
+        self.extensoes = 0
+        disponivel = self.tempo_disponivel(jogadas_feitas)
+        if disponivel is None:
+            self.prazo_suave = self.prazo_rigido = None
+            self._extensao = 0.0
+            return
+
+        suave = disponivel * self.fracao_suave
+        self.prazo_rigido = self.inicio + disponivel
+        self.prazo_suave = self.inicio + suave
+        self._extensao = suave * FRACAO_EXTENSAO
+        self._prazo_suave_maximo = min(self.prazo_rigido,
+                                       self.prazo_suave + suave * MAXIMO_EXTENSAO)
+
+    def estender(self):
+        """Adia o prazo suave (o melhor movimento mudou), dentro do máximo"""
+        if self.prazo_suave is None:
+            return
+        self.prazo_suave = min(self._prazo_suave_maximo,
+                               self.prazo_suave + self._extensao)
+        self.extensoes += 1
+
+    def pode_iterar(self):
+        """Verifica se ainda há tempo para começar uma nova iteração"""
+        return self.prazo_suave is None or time.monotonic() < self.prazo_suave
+
+    def terminar(self):
+        """Encerra a jogada e desconta o tempo gasto do orçamento da partida"""
+        if self.inicio is None:
+            return 0.0
+        gasto = time.monotonic() - self.inicio
+        self.tempo_usado += gasto
+        self.inicio = None
+        return gasto
@@ -3,10 +3,20 @@ Jogador de IA para o Jogo da Onça
 Utiliza Minimax com poda Alfa-Beta para decidir os movimentos
 """
 
+import os
 import sys
 import tabuleiro
 from jogo import EstadoJogo
+from jogo_bitboard import EstadoBitboard
 from busca import BuscaAdversarial
+from busca_paralela import BuscaParalela
+from livro import LivroAberturas
+from finais import BaseFinais
+from mcts import BuscaMCTS
+from gerenciador_tempo import GerenciadorTempo
+from ponderacao import Ponderador
+from analises import CacheAnalises
+from telemetria import TelemetriaBusca, resumo
 
 def main():
     """Programa principal do jogador IA"""
@@ -21,24 +31,82 @@ def main():
     print("=" * 50, file=sys.stderr)
     
     profundidade = 5
-    tempo_limite = 30  # 30 segundos por jogada
+    tempo_jogada = 30  # Limite por jogada do controlador (argumento tempo; None = sem limite)
+    num_jogadas = 100  # Limite de jogadas do controlador (argumento jogadas)
+    tempo_partida = None  # Orçamento total de pensamento (None = só o limite por jogada)
+    usar_bitboard = True  # Representa o estado em bitboards (mais rápido)
+    memoria_tt_mb = 64  # Limite da tabela de transposição (mantida entre jogadas)
+    modo_busca = 'serial'  # 'serial' ou 'paralela' (movimentos da raiz em processos)
+    num_processos = None  # Processos da busca paralela (None = número de CPUs)
+    medir_speedup = False  # Repete cada jogada da paralela na serial para medir o ganho (gasta o tempo da serial)
+    caminho_livro = 'livro.bin'  # Livro de aberturas (ignorado se não existir)
+    diretorio_finais = 'finais'  # Tabelas de finais (ignoradas se não existirem)
+    avaliacao_lote = False  # Avalia as folhas em lote com NumPy (opcional)
+    motor_onca = 'alfabeta'  # Motor de cada lado: 'alfabeta' ou 'mcts'
+    motor_cachorros = 'alfabeta'
+    ponderar = True  # Busca no tempo do adversário (só alfabeta serial)
+    caminho_analises = None  # Cache persistente de análises (ex.: 'analises.db'; None = desligado)
+    caminho_telemetria = None  # Relatório JSON da telemetria da busca (None = desligada; só alfabeta serial)
     
-    busca = BuscaAdversarial(profundidade_maxima=profundidade, tempo_limite=tempo_limite)
+    Estado = EstadoBitboard if usar_bitboard else EstadoJogo
+    
+    finais = BaseFinais(diretorio_finais) if os.path.isdir(diretorio_finais) else None
+    if finais:
+        print(f"Tabelas de finais: {sorted(finais.tabelas)} cachorros", file=sys.stderr)
+    
+    motor = motor_onca if lado_meu == 'o' else motor_cachorros
+    print(f"Motor de busca: {motor}", file=sys.stderr)
+    
+    analises = CacheAnalises(caminho_analises) if caminho_analises else None
+    if analises:
+        print(f"Cache de análises: {analises.num_entradas()} posições", file=sys.stderr)
+    
+    telemetria = None
+    if caminho_telemetria and motor == 'alfabeta' and modo_busca == 'serial':
+        telemetria = TelemetriaBusca()
+        print(f"Telemetria da busca: {caminho_telemetria}", file=sys.stderr)
+    
+    # Prazos de cada jogada a partir do limite do controlador
+    tempo = GerenciadorTempo(tempo_jogada, num_jogadas, tempo_partida)
+    
+    if motor == 'mcts':
+        busca = BuscaMCTS(tempo_limite=tempo.tempo_disponivel(),
+                          num_processos=num_processos if modo_busca == 'paralela' else 1)
+    elif modo_busca == 'paralela':
+        busca = BuscaParalela(profundidade_maxima=profundidade,
+                              memoria_tt_mb=memoria_tt_mb, finais=finais,
+                              num_processos=num_processos,
+                              gerenciador_tempo=tempo, analises=analises,
+                              medir_speedup=medir_speedup,
+                              avaliacao_lote=avaliacao_lote)
+    else:
+        busca = BuscaAdversarial(profundidade_maxima=profundidade,
+                                 memoria_tt_mb=memoria_tt_mb, finais=finais,
+                                 gerenciador_tempo=tempo, analises=analises,
+                                 avaliacao_lote=avaliacao_lote, telemetria=telemetria)
+    
+    ponderador = None
+    if ponderar and motor == 'alfabeta' and modo_busca == 'serial':
+        ponderador = Ponderador(busca)
+    
+    livro = LivroAberturas(caminho_livro) if os.path.exists(caminho_livro) else None
+    if livro:
+        print(f"Livro de aberturas: {livro.num_entradas} entradas", file=sys.stderr)
     
     contador_jogadas = 0
     historico_posicoes = []  # Rastreia últimas N posições para detectar repetições
     MAX_HISTORICO = 10  # Quantidade de posições para rastrear
+    recebido = None  # Tabuleiro já recebido junto com o envio da jogada
     
     while True:
-        # Recebe o estado atual do jogo
-        buf = tabuleiro.receber()
-        
-        # Separa os elementos da string recebida
-        parts = buf.split('\n', 2)
-        lado_confirma = parts[0]
-        mov_adv_str = parts[1]
-        tabuleiro_str = parts[2]
+        # Recebe o estado atual do jogo, já como bitboards
+        if recebido is None:
+            recebido = tabuleiro.receber_bits()
+        lado_confirma, mov_adv_str, cachorros, onca = recebido
+        recebido = None
         
+        # O relógio da jogada começa quando o tabuleiro chega
+        tempo.iniciar(contador_jogadas)
         contador_jogadas += 1
         
         print(f"\n{'=' * 50}", file=sys.stderr)
@@ -47,11 +115,21 @@ def main():
         print(f"Movimento adversário: {mov_adv_str}", file=sys.stderr)
         
         # Cria o estado do jogo a partir do tabuleiro recebido
-        estado = EstadoJogo(tabuleiro_str)
+        estado = Estado.de_bits(cachorros, onca)
         
         # Debug: mostra tabuleiro parseado
         print(f"DEBUG - Tabuleiro parseado: {len(estado.tabuleiro)} posições", file=sys.stderr)
         
+        # A ponderação acaba antes de qualquer outro uso da busca
+        acerto_ponderacao = False
+        if ponderador is not None and ponderador.em_andamento():
+            acerto_ponderacao = ponderador.acertou(estado)
+            if not acerto_ponderacao:
+                fim = estado.eh_terminal()
+                ponderador.abandonar(erro=not fim)
+                if not fim:
+                    print("Ponderação: resposta não prevista (tabelas mantidas)", file=sys.stderr)
+        
         if estado.eh_terminal():
             vencedor = estado.vencedor()
             print(f"Jogo terminado! Vencedor: {vencedor}", file=sys.stderr)
@@ -67,17 +145,60 @@ def main():
         movs_teste = estado.gerar_movimentos(lado_meu)
         print(f"DEBUG - Movimentos possíveis: {len(movs_teste)}", file=sys.stderr)
         
-        # Busca o melhor movimento
-        print(f"Buscando melhor movimento (profundidade={profundidade})...", file=sys.stderr)
+        # Consulta o livro de aberturas antes de buscar
+        melhor_movimento = None
+        if livro and not acerto_ponderacao:
+            melhor_movimento = livro.consultar(estado, lado_meu)
         
-        melhor_movimento = busca.melhor_movimento(estado, lado_meu)
-        
-        # Mostra estatísticas da busca
-        stats = busca.obter_estatisticas()
-        print(f"Nós explorados: {stats['nos_explorados']}", file=sys.stderr)
-        print(f"Cortes alfa: {stats['cortes_alfa']}", file=sys.stderr)
-        print(f"Cortes beta: {stats['cortes_beta']}", file=sys.stderr)
-        print(f"Tempo: {stats['tempo_decorrido']:.2f}s", file=sys.stderr)
+        if melhor_movimento:
+            print("Movimento do livro de aberturas (busca dispensada)", file=sys.stderr)
+        elif len(movs_teste) == 1 and not acerto_ponderacao:
+            melhor_movimento = movs_teste[0]
+            print("Único movimento possível (busca dispensada)", file=sys.stderr)
+        else:
+            # Busca o melhor movimento
+            if acerto_ponderacao:
+                print("Ponderação: resposta prevista, continuando a busca já iniciada", file=sys.stderr)
+                melhor_movimento = ponderador.aproveitar()
+            elif motor == 'mcts':
+                # MCTS melhora até o fim do prazo: usa o tempo disponível inteiro
+                busca.tempo_limite = tempo.tempo_disponivel(contador_jogadas - 1)
+                print(f"Buscando melhor movimento (MCTS, {busca.tempo_limite}s)...", file=sys.stderr)
+            else:
+                print(f"Buscando melhor movimento (profundidade={profundidade})...", file=sys.stderr)
+            
+            if not acerto_ponderacao:
+                melhor_movimento = busca.melhor_movimento(estado, lado_meu)
+            
+            # Mostra estatísticas da busca
+            stats = busca.obter_estatisticas()
+            print(f"Nós explorados: {stats['nos_explorados']}", file=sys.stderr)
+            if motor == 'mcts':
+                print(f"Jogadas simuladas: {stats['jogadas_simuladas']}", file=sys.stderr)
+                print(f"Profundidade atingida: {stats['profundidade_atingida']} (valor {stats['valor']})", file=sys.stderr)
+                print(f"Visitas reaproveitadas: {stats['visitas_reaproveitadas']}", file=sys.stderr)
+            else:
+                print(f"Profundidade completa: {stats['profundidade_completa']} (valor {stats['valor']})", file=sys.stderr)
+                print(f"Cortes alfa: {stats['cortes_alfa']}", file=sys.stderr)
+                print(f"Cortes beta: {stats['cortes_beta']}", file=sys.stderr)
+                print(f"Tabela de transposição: {stats['tt_acertos']}/{stats['tt_consultas']} acertos", file=sys.stderr)
+                if finais:
+                    print(f"Acertos na base de finais: {stats['finais_acertos']}", file=sys.stderr)
+                if stats['analises_acertos']:
+                    print("Análise reaproveitada do cache (busca dispensada)", file=sys.stderr)
+            print(f"Tempo: {stats['tempo_decorrido']:.2f}s", file=sys.stderr)
+            if motor != 'mcts' and tempo.extensoes:
+                print(f"Prazo suave estendido {tempo.extensoes}x (melhor movimento mudou)", file=sys.stderr)
+            if stats.get('utilizacao'):
+                print(f"Utilização dos processos: {stats['utilizacao']:.0%} ({stats['processos']} processos)", file=sys.stderr)
+            if stats.get('speedup') is not None:
+                print(f"Speedup sobre a serial: {stats['speedup']:.2f}x até a profundidade "
+                      f"{stats['profundidade_completa']} ({stats['tempo_serial']:.2f}s serial, "
+                      f"{stats['tempo_profundidade']:.2f}s paralela)", file=sys.stderr)
+            if telemetria is not None and telemetria.jogadas:
+                for linha in resumo(telemetria.relatorio_jogada()):
+                    print(linha, file=sys.stderr)
+                telemetria.gravar(caminho_telemetria)
         
         # Converte o movimento para string
         if melhor_movimento:
@@ -88,10 +209,32 @@ def main():
             movimento_str = f"{lado_meu} n"
             print("Sem movimentos possíveis!", file=sys.stderr)
         
-        # Envia o movimento
-        tabuleiro.enviar(movimento_str + '\n')
-        
+        tempo.terminar()
         print("=" * 50, file=sys.stderr)
+        
+        if ponderador is None or not melhor_movimento:
+            # Envia o movimento e espera o próximo tabuleiro em uma só ida ao Redis
+            recebido = tabuleiro.enviar_e_receber_bits(movimento_str + '\n')
+            continue
+        
+        # Envia o movimento e pondera a resposta prevista enquanto o
+        # adversário pensa (a thread só começa depois do envio)
+        tabuleiro.enviar(movimento_str + '\n')
+        if ponderador.iniciar(estado, lado_meu, melhor_movimento):
+            print(f"Ponderando a resposta prevista: {ponderador.resposta_prevista}", file=sys.stderr)
+    
+    if ponderador is not None:
+        if ponderador.em_andamento():
+            ponderador.abandonar(erro=False)
+        stats = ponderador.obter_estatisticas()
+        print(f"Ponderação: {stats['acertos']} acertos, {stats['erros']} erros "
+              f"({stats['taxa_acerto']:.0%}), {stats['tempo_economizado']:.1f}s economizados "
+              f"de {stats['tempo_ponderado']:.1f}s ponderados", file=sys.stderr)
+    
+    if hasattr(busca, 'encerrar'):
+        busca.encerrar()
+    if analises:
+        analises.fechar()
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,8 @@ Módulo de modelagem do Jogo da Onça como problema de busca adversarial.
 Implementa a representação do estado do jogo, geração de movimentos e validação.
 """
 
+import random
+
 class EstadoJogo:
     """Representa o estado do jogo da Onça"""
     
@@ -54,6 +56,9 @@ class EstadoJogo:
             self.tabuleiro = self._tabuleiro_inicial()
         else:
             self.tabuleiro = self._parse_tabuleiro(tabuleiro_str)
+        self.chave = self._calcular_chave()
+        self._analise = None  # Resultado de analisar() até o próximo movimento
+        self._desfazer = []  # Pilha de registros de fazer_movimento
     
     def _tabuleiro_inicial(self):
         """Retorna o tabuleiro na configuração inicial"""
@@ -99,10 +104,34 @@ class EstadoJogo:
         
         return tab
     
+    @classmethod
+    def de_bits(cls, cachorros, onca):
+        """Cria um estado a partir de bitboards (bit i = casa CASAS[i])"""
+        novo = cls.__new__(cls)
+        novo.tabuleiro = {
+            pos: 'c' if cachorros >> i & 1 else 'o' if onca >> i & 1 else '-'
+            for i, pos in enumerate(CASAS)
+        }
+        novo.chave = novo._calcular_chave()
+        novo._analise = None
+        novo._desfazer = []
+        return novo
+    
+    def _calcular_chave(self):
+        """Calcula do zero a chave Zobrist da posição"""
+        chave = 0
+        for pos, peca in self.tabuleiro.items():
+            if peca != '-':
+                chave ^= ZOBRIST[(pos, peca)]
+        return chave
+    
     def copiar(self):
-        """Cria uma cópia do estado atual"""
-        novo = EstadoJogo()
+        """Cria uma cópia do estado atual (sem a pilha de desfazer)"""
+        novo = EstadoJogo.__new__(EstadoJogo)
         novo.tabuleiro = self.tabuleiro.copy()
+        novo.chave = self.chave
+        novo._analise = self._analise
+        novo._desfazer = []
         return novo
     
     def contar_cachorros(self):
@@ -120,49 +149,58 @@ class EstadoJogo:
         """Retorna lista de posições dos cachorros"""
         return [pos for pos, peca in self.tabuleiro.items() if peca == 'c']
     
-    def eh_terminal(self):
-        """Verifica se o estado é terminal (alguém ganhou)"""
-        if self.contar_cachorros() <= 9:
-            return True
+    def analisar(self):
+        """
+        Análise da posição, calculada uma vez e guardada até o próximo movimento
         
-        movs_onca = self.gerar_movimentos('o')
-        if not movs_onca:
-            return True
+        A busca consulta o fim de jogo, a avaliação e os movimentos da onça
+        do mesmo nó; com a análise guardada, os saltos da onça são gerados
+        uma única vez por posição.
         
-        return False
+        Returns:
+            Tupla (num_cachorros, movimentos_onca, saltos, vencedor), com
+            saltos = número de movimentos 's' e vencedor 'o', 'c' ou None
+        """
+        if self._analise is None:
+            num_cachorros = self.contar_cachorros()
+            movimentos_onca = self._gerar_movimentos_onca()
+            saltos = sum(1 for mov in movimentos_onca if mov[0] == 's')
+            
+            if num_cachorros <= 9:
+                vencedor = 'o'
+            elif not movimentos_onca:
+                vencedor = 'c'
+            else:
+                vencedor = None
+            
+            self._analise = (num_cachorros, movimentos_onca, saltos, vencedor)
+        return self._analise
+    
+    def eh_terminal(self):
+        """Verifica se o estado é terminal (alguém ganhou)"""
+        return self.analisar()[3] is not None
     
     def vencedor(self):
         """Retorna o vencedor ('o', 'c') ou None se não há vencedor ainda"""
-        if self.contar_cachorros() <= 9:
-            return 'o'
-        
-        if not self.gerar_movimentos('o'):
-            return 'c'
-        
-        return None
+        return self.analisar()[3]
     
     def gerar_movimentos(self, lado):
         """Gera todos os movimentos possíveis para um lado"""
         if lado == 'o':
-            return self._gerar_movimentos_onca()
+            # Cópia da lista guardada, que o chamador pode reordenar
+            return list(self.analisar()[1])
         else:
             return self._gerar_movimentos_cachorros()
     
     def _gerar_movimentos_cachorros(self):
         """Gera todos os movimentos possíveis para os cachorros"""
         movimentos = []
+        tab = self.tabuleiro
         
         for pos in self.posicoes_cachorros():
-            l, c = pos
-            for vizinho in self.ADJACENCIAS.get(pos, []):
-                if self.tabuleiro.get(vizinho) == '-':
-                    lv, cv = vizinho
-                    distl, distc = abs(l - lv), abs(c - cv)
-                    
-                    if (l + c) % 2 != 0 and (distl + distc) > 1:
-                        continue
-                    
-                    movimentos.append(('m', [(l, c), vizinho]))
+            for destino in PASSOS[pos]:
+                if tab.get(destino) == '-':
+                    movimentos.append(('m', [pos, destino]))
         
         return movimentos
     
@@ -174,17 +212,10 @@ class EstadoJogo:
         if not pos_onca:
             return movimentos
         
-        l, c = pos_onca
-        
-        for vizinho in self.ADJACENCIAS.get(pos_onca, []):
-            if self.tabuleiro.get(vizinho) == '-':
-                lv, cv = vizinho
-                distl, distc = abs(l - lv), abs(c - cv)
-                
-                if (l + c) % 2 != 0 and (distl + distc) > 1:
-                    continue 
-                
-                movimentos.append(('m', [(l, c), vizinho]))
+        tab = self.tabuleiro
+        for destino in PASSOS[pos_onca]:
+            if tab.get(destino) == '-':
+                movimentos.append(('m', [pos_onca, destino]))
         
         saltos = self._gerar_saltos_recursivos(pos_onca, set(), [pos_onca])
         movimentos.extend(saltos)
@@ -194,30 +225,16 @@ class EstadoJogo:
     def _gerar_saltos_recursivos(self, pos_atual, capturados, caminho):
         """Gera saltos recursivos da onça (pode capturar múltiplos cachorros)"""
         saltos = []
-        l, c = pos_atual
+        tab = self.tabuleiro
         
-        for vizinho in self.ADJACENCIAS.get(pos_atual, []):
-            lv, cv = vizinho
-            
-            if self.tabuleiro.get(vizinho) != 'c':
+        for meio, destino in SALTOS[pos_atual]:
+            if tab.get(meio) != 'c' or meio in capturados:
                 continue
-            
-            if vizinho in capturados:
-                continue
-            
-            dl, dc = lv - l, cv - c
-            destino = (lv + dl, cv + dc)
-            
-            if destino not in self.ADJACENCIAS:
-                continue
-            if self.tabuleiro.get(destino) != '-':
-                continue
-            
-            if not self._salto_valido(pos_atual, vizinho, destino):
+            if tab.get(destino) != '-':
                 continue
             
             novo_caminho = caminho + [destino]
-            novos_capturados = capturados | {vizinho}
+            novos_capturados = capturados | {meio}
             
             saltos.append(('s', novo_caminho.copy()))
             
@@ -228,7 +245,8 @@ class EstadoJogo:
         
         return saltos
     
-    def _salto_valido(self, origem, meio, destino):
+    @staticmethod
+    def _salto_valido(origem, meio, destino):
         """
         Verifica se um salto é geometricamente válido
         IMPORTANTE: Segue a lógica do controlador.py, que tem limitações específicas
@@ -263,16 +281,49 @@ class EstadoJogo:
     def aplicar_movimento(self, lado, movimento):
         """Aplica um movimento e retorna um novo estado"""
         novo_estado = self.copiar()
+        novo_estado._mover(lado, movimento)
+        return novo_estado
+    
+    def fazer_movimento(self, lado, movimento):
+        """
+        Aplica um movimento no próprio estado, sem criar cópias
+        
+        O registro necessário para reverter o movimento (incluindo os
+        cachorros capturados em saltos múltiplos) é empilhado e consumido
+        por desfazer_movimento.
+        """
+        self._desfazer.append(self._mover(lado, movimento))
+    
+    def desfazer_movimento(self):
+        """Reverte o último movimento feito com fazer_movimento"""
+        lado, origem, destino, capturados, chave, analise = self._desfazer.pop()
+        
+        self.tabuleiro[destino] = '-'
+        for pos in capturados:
+            self.tabuleiro[pos] = 'c'
+        self.tabuleiro[origem] = lado
+        self.chave = chave
+        self._analise = analise
+    
+    def _mover(self, lado, movimento):
+        """Altera o tabuleiro conforme o movimento e retorna o registro de desfazer"""
         tipo, posicoes = movimento
+        chave_anterior = self.chave
+        analise_anterior = self._analise
+        self._analise = None
+        capturados = []
         
         if tipo == 'm':
             origem, destino = posicoes
-            novo_estado.tabuleiro[origem] = '-'
-            novo_estado.tabuleiro[destino] = lado
+            self.tabuleiro[origem] = '-'
+            self.tabuleiro[destino] = lado
+            self.chave ^= ZOBRIST[(origem, lado)] ^ ZOBRIST[(destino, lado)]
         
-        elif tipo == 's':
+        else:  # tipo 's'
+            lado = 'o'
             origem = posicoes[0]
-            novo_estado.tabuleiro[origem] = '-'
+            self.tabuleiro[origem] = '-'
+            self.chave ^= ZOBRIST[(origem, 'o')]
             
             for i in range(1, len(posicoes)):
                 pos_anterior = posicoes[i - 1]
@@ -280,14 +331,17 @@ class EstadoJogo:
                 
                 lp, cp = pos_anterior
                 la, ca = pos_atual
-                lm, cm = (lp + la) // 2, (cp + ca) // 2
+                meio = ((lp + la) // 2, (cp + ca) // 2)
                 
-                novo_estado.tabuleiro[(lm, cm)] = '-'
+                self.tabuleiro[meio] = '-'
+                self.chave ^= ZOBRIST[(meio, 'c')]
+                capturados.append(meio)
             
             destino = posicoes[-1]
-            novo_estado.tabuleiro[destino] = 'o'
+            self.tabuleiro[destino] = 'o'
+            self.chave ^= ZOBRIST[(destino, 'o')]
         
-        return novo_estado
+        return lado, origem, destino, capturados, chave_anterior, analise_anterior
     
     def movimento_para_string(self, lado, movimento):
         """Converte um movimento para o formato de string esperado"""
@@ -306,6 +360,28 @@ class EstadoJogo:
         
         return f"{lado} n"
     
+    @staticmethod
+    def string_para_movimento(texto):
+        """
+        Converte uma string no formato de movimento_para_string de volta
+        
+        Returns:
+            Tupla (lado, movimento); movimento é None para 'n' (passar a vez)
+        """
+        partes = texto.split()
+        lado, tipo = partes[0], partes[1]
+        
+        if tipo == 'm':
+            lo, co, ld, cd = (int(x) for x in partes[2:6])
+            return lado, ('m', [(lo, co), (ld, cd)])
+        
+        if tipo == 's':
+            num_saltos = int(partes[2])
+            coords = [int(x) for x in partes[3:3 + 2 * (num_saltos + 1)]]
+            return lado, ('s', list(zip(coords[0::2], coords[1::2])))
+        
+        return lado, None
+    
     def para_string(self):
         """Converte o estado para string no formato do controlador"""
         linhas = []
@@ -330,8 +406,99 @@ class EstadoJogo:
         return "\n".join(linhas) + "\n"
     
     def hash_posicao(self):
-        """Retorna um hash único da posição do tabuleiro para detectar repetições"""
-        posicoes_ordenadas = tuple(sorted(
-            (pos, peca) for pos, peca in self.tabuleiro.items() if peca != '-'
-        ))
-        return hash(posicoes_ordenadas)
+        """
+        Retorna a chave Zobrist de 64 bits da posição do tabuleiro
+        
+        A chave é mantida incrementalmente por aplicar_movimento e é estável
+        entre processos, ao contrário de hash(), que o Python salga.
+        """
+        return self.chave
+
+
+# Chaves Zobrist de 64 bits por (posição, peça), geradas com semente fixa
+_rng_zobrist = random.Random(0x0CA)
+ZOBRIST = {
+    (pos, peca): _rng_zobrist.getrandbits(64)
+    for pos in EstadoJogo.ADJACENCIAS
+    for peca in ('c', 'o')
+}
+# Chave do lado a jogar, combinada pela busca com a chave da posição
+ZOBRIST_LADO = {lado: _rng_zobrist.getrandbits(64) for lado in ('o', 'c')}
+
+
+def _construir_tabelas():
+    """
+    Pré-calcula, para cada casa, os destinos de passo simples e os pares
+    (meio, destino) de salto, a partir de ADJACENCIAS e de _salto_valido
+    
+    A ordem segue ADJACENCIAS, de modo que os geradores produzem os
+    movimentos na mesma ordem da versão que calculava a geometria a cada nó.
+    """
+    passos = {}
+    saltos = {}
+    
+    for pos, vizinhos in EstadoJogo.ADJACENCIAS.items():
+        l, c = pos
+        destinos = []
+        pares = []
+        
+        for vizinho in vizinhos:
+            lv, cv = vizinho
+            distl, distc = abs(l - lv), abs(c - cv)
+            
+            # Posições ímpares só se movem ortogonalmente
+            if not ((l + c) % 2 != 0 and (distl + distc) > 1):
+                destinos.append(vizinho)
+            
+            destino = (lv + (lv - l), cv + (cv - c))
+            if destino in EstadoJogo.ADJACENCIAS and \
+               EstadoJogo._salto_valido(pos, vizinho, destino):
+                pares.append((vizinho, destino))
+        
+        passos[pos] = tuple(destinos)
+        saltos[pos] = tuple(pares)
+    
+    return passos, saltos
+
+
+# Destinos de passo simples e pares (meio, destino) de salto de cada casa
+PASSOS, SALTOS = _construir_tabelas()
+
+# Casas válidas na ordem de ADJACENCIAS e o índice (0-30) de cada uma
+CASAS = tuple(EstadoJogo.ADJACENCIAS)
+INDICE = {pos: i for i, pos in enumerate(CASAS)}
+
+# Maior caminho que cabe em um código de 64 bits (1 + 4 + 11 * 5 bits)
+MAX_POSICOES_CODIGO = 11
+
+
+def codificar_movimento(movimento):
+    """
+    Codifica um movimento em um inteiro de até 64 bits
+    
+    Bit 0 é o tipo (0 = 'm', 1 = 's'), os bits 1-4 o número de posições do
+    caminho e cada posição ocupa mais 5 bits, com o índice da casa em CASAS.
+    """
+    tipo, posicoes = movimento
+    if len(posicoes) > MAX_POSICOES_CODIGO:
+        raise ValueError(f"Caminho longo demais para codificar: {len(posicoes)} posições")
+    
+    codigo = 0
+    for pos in reversed(posicoes):
+        codigo = (codigo << 5) | INDICE[pos]
+    codigo = (codigo << 4) | len(posicoes)
+    return (codigo << 1) | (1 if tipo == 's' else 0)
+
+
+def decodificar_movimento(codigo):
+    """Inverso de codificar_movimento"""
+    tipo = 's' if codigo & 1 else 'm'
+    codigo >>= 1
+    num_posicoes = codigo & 0xF
+    codigo >>= 4
+    
+    posicoes = []
+    for _ in range(num_posicoes):
+        posicoes.append(CASAS[codigo & 0x1F])
+        codigo >>= 5
+    return tipo, posicoes
@@ -0,0 +1,287 @@
+"""
+Representação alternativa do estado do Jogo da Onça usando bitboards.
+
+Os 31 pontos do tabuleiro são numerados na ordem de EstadoJogo.ADJACENCIAS
+(linha a linha) e o estado é guardado em dois inteiros: um com os bits dos
+cachorros e outro com o bit da onça. As máscaras de vizinhança e os pares de
+salto de cada casa são derivados uma única vez das tabelas PASSOS e SALTOS
+de jogo.py, então a geração de movimentos vira testes de bits.
+
+Além da chave Zobrist, o estado mantém dois termos aditivos da avaliação
+dos cachorros, atualizados pela diferença de cada movimento: `conexoes`
+(pares cachorro → vizinho em ADJACENCIAS também ocupado por cachorro) e
+`avanco` (soma do avanço dos cachorros nas linhas 4 a 7).
+"""
+
+import jogo
+from jogo import EstadoJogo, ZOBRIST, CASAS, INDICE
+
+# Casas válidas na ordem de ADJACENCIAS; o bit de cada uma é INDICE[pos]
+TODAS = (1 << len(CASAS)) - 1
+
+# Chaves Zobrist de EstadoJogo indexadas pelo bit de cada casa
+ZOBRIST_C = tuple(ZOBRIST[(pos, 'c')] for pos in CASAS)
+ZOBRIST_O = tuple(ZOBRIST[(pos, 'o')] for pos in CASAS)
+
+
+def _construir_mascaras():
+    """Converte as tabelas de jogo.py em máscaras e índices de bits"""
+    vizinhos = []  # Máscara com todas as casas adjacentes
+    passos = []    # (indice, bit) de cada destino de passo simples, em ordem
+    saltos = []    # (bit_meio, indice_destino, bit_destino) de cada salto
+
+    for pos in CASAS:
+        vizinhos.append(sum(1 << INDICE[v] for v in EstadoJogo.ADJACENCIAS[pos]))
+        passos.append(tuple(
+            (INDICE[destino], 1 << INDICE[destino]) for destino in jogo.PASSOS[pos]
+        ))
+        saltos.append(tuple(
+            (1 << INDICE[meio], INDICE[destino], 1 << INDICE[destino])
+            for meio, destino in jogo.SALTOS[pos]
+        ))
+
+    return tuple(vizinhos), tuple(passos), tuple(saltos)
+
+
+VIZINHOS, PASSOS, SALTOS = _construir_mascaras()
+
+# Casas que têm cada casa entre seus vizinhos (ADJACENCIAS não é simétrica)
+VIZINHOS_INVERSOS = tuple(
+    sum(1 << j for j, mascara in enumerate(VIZINHOS) if mascara >> i & 1)
+    for i in range(len(CASAS))
+)
+
+# Máscara de todos os destinos de passo simples de cada casa
+MASCARA_PASSOS = tuple(
+    sum(bit for _, bit in destinos) for destinos in PASSOS
+)
+
+# Avanço de um cachorro em cada casa, como em BuscaAdversarial._avaliar_cachorros
+AVANCO = tuple((l - 3) * 15 if l >= 4 else 0 for l, c in CASAS)
+
+# Casas iniciais: cachorros nas linhas 1-3 (exceto o centro) e onça em (3, 3)
+_ONCA_INICIAL = 1 << INDICE[(3, 3)]
+_CACHORROS_INICIAIS = sum(
+    1 << i for i, (l, c) in enumerate(CASAS) if l <= 3
+) & ~_ONCA_INICIAL
+
+
+def _bits(mascara):
+    """Itera os índices dos bits ligados, do menor para o maior"""
+    while mascara:
+        bit = mascara & -mascara
+        yield bit.bit_length() - 1
+        mascara ^= bit
+
+
+class EstadoBitboard(EstadoJogo):
+    """
+    Estado do jogo com o tabuleiro em dois bitboards (cachorros e onça)
+
+    Oferece a mesma interface de EstadoJogo, de modo que BuscaAdversarial
+    pode operar sobre ele sem alterações. O atributo `tabuleiro` é um
+    dicionário {(l, c): peca} montado sob demanda a partir dos bitboards e
+    mantido apenas por compatibilidade; alterá-lo não afeta o estado.
+    """
+
+    def __init__(self, tabuleiro_str=None):
+        """Inicializa o estado a partir de uma string do tabuleiro"""
+        if tabuleiro_str is None:
+            self.cachorros = _CACHORROS_INICIAIS
+            self.onca = _ONCA_INICIAL
+        else:
+            self.cachorros = 0
+            self.onca = 0
+            for pos, peca in self._parse_tabuleiro(tabuleiro_str).items():
+                if peca == 'c':
+                    self.cachorros |= 1 << INDICE[pos]
+                elif peca == 'o':
+                    self.onca |= 1 << INDICE[pos]
+        self._tabuleiro = None
+        self.chave = self._calcular_chave()
+        self._calcular_componentes()
+        self._analise = None
+        self._desfazer = []
+
+    @classmethod
+    def de_estado(cls, estado):
+        """Converte um EstadoJogo (dicionário) para bitboards"""
+        cachorros = 0
+        onca = 0
+        for pos, peca in estado.tabuleiro.items():
+            if peca == 'c':
+                cachorros |= 1 << INDICE[pos]
+            elif peca == 'o':
+                onca |= 1 << INDICE[pos]
+        return cls.de_bits(cachorros, onca)
+
+    @classmethod
+    def de_bits(cls, cachorros, onca):
+        """Cria um estado diretamente a partir dos dois bitboards"""
+        novo = cls.__new__(cls)
+        novo.cachorros = cachorros
+        novo.onca = onca
+        novo._tabuleiro = None
+        novo.chave = novo._calcular_chave()
+        novo._calcular_componentes()
+        novo._analise = None
+        novo._desfazer = []
+        return novo
+
+    @property
+    def tabuleiro(self):
+        """Dicionário {(l, c): peca} equivalente aos bitboards"""
+        if self._tabuleiro is None:
+            tab = dict.fromkeys(CASAS, '-')
+            for i in _bits(self.cachorros):
+                tab[CASAS[i]] = 'c'
+            if self.onca:
+                tab[CASAS[self.onca.bit_length() - 1]] = 'o'
+            self._tabuleiro = tab
+        return self._tabuleiro
+
+    def _calcular_chave(self):
+        """Calcula do zero a chave Zobrist da posição"""
+        chave = 0
+        for i in _bits(self.cachorros):
+            chave ^= ZOBRIST_C[i]
+        for i in _bits(self.onca):
+            chave ^= ZOBRIST_O[i]
+        return chave
+
+    def _calcular_componentes(self):
+        """Calcula do zero as conexões e o avanço dos cachorros"""
+        self.conexoes = 0
+        self.avanco = 0
+        for i in _bits(self.cachorros):
+            self.conexoes += (VIZINHOS[i] & self.cachorros).bit_count()
+            self.avanco += AVANCO[i]
+
+    def copiar(self):
+        """Cria uma cópia do estado atual (sem a pilha de desfazer)"""
+        novo = EstadoBitboard.__new__(EstadoBitboard)
+        novo.cachorros = self.cachorros
+        novo.onca = self.onca
+        novo._tabuleiro = None
+        novo.chave = self.chave
+        novo.conexoes = self.conexoes
+        novo.avanco = self.avanco
+        novo._analise = self._analise
+        novo._desfazer = []
+        return novo
+
+    def contar_cachorros(self):
+        """Conta quantos cachorros ainda estão no tabuleiro"""
+        return self.cachorros.bit_count()
+
+    def posicao_onca(self):
+        """Retorna a posição da onça"""
+        if not self.onca:
+            return None
+        return CASAS[self.onca.bit_length() - 1]
+
+    def posicoes_cachorros(self):
+        """Retorna lista de posições dos cachorros"""
+        return [CASAS[i] for i in _bits(self.cachorros)]
+
+    def _gerar_movimentos_cachorros(self):
+        """Gera todos os movimentos possíveis para os cachorros"""
+        movimentos = []
+        vazio = TODAS & ~(self.cachorros | self.onca)
+
+        for i in _bits(self.cachorros):
+            origem = CASAS[i]
+            for j, bit in PASSOS[i]:
+                if vazio & bit:
+                    movimentos.append(('m', [origem, CASAS[j]]))
+
+        return movimentos
+
+    def _gerar_movimentos_onca(self):
+        """Gera todos os movimentos possíveis para a onça"""
+        movimentos = []
+        if not self.onca:
+            return movimentos
+
+        i = self.onca.bit_length() - 1
+        origem = CASAS[i]
+        vazio = TODAS & ~(self.cachorros | self.onca)
+
+        for j, bit in PASSOS[i]:
+            if vazio & bit:
+                movimentos.append(('m', [origem, CASAS[j]]))
+
+        self._gerar_saltos_bits(i, vazio, 0, [origem], movimentos)
+        return movimentos
+
+    def _gerar_saltos_bits(self, i, vazio, capturados, caminho, saltos):
+        """Gera saltos recursivos da onça a partir da casa de índice i"""
+        for bit_meio, j, bit_destino in SALTOS[i]:
+            if not self.cachorros & bit_meio or capturados & bit_meio:
+                continue
+            if not vazio & bit_destino:
+                continue
+
+            novo_caminho = caminho + [CASAS[j]]
+            saltos.append(('s', novo_caminho.copy()))
+            self._gerar_saltos_bits(
+                j, vazio, capturados | bit_meio, novo_caminho, saltos
+            )
+
+    def fazer_movimento(self, lado, movimento):
+        """
+        Aplica um movimento no próprio estado, sem criar cópias
+
+        Como o estado cabe em poucos inteiros, o registro de desfazer é o
+        próprio estado anterior, o que já inclui os cachorros capturados.
+        """
+        self._desfazer.append((self.cachorros, self.onca, self.chave,
+                               self.conexoes, self.avanco, self._analise))
+        self._mover(lado, movimento)
+
+    def desfazer_movimento(self):
+        """Reverte o último movimento feito com fazer_movimento"""
+        (self.cachorros, self.onca, self.chave,
+         self.conexoes, self.avanco, self._analise) = self._desfazer.pop()
+        self._tabuleiro = None
+
+    def _mover(self, lado, movimento):
+        """Altera os bitboards, a chave e os componentes conforme o movimento"""
+        tipo, posicoes = movimento
+        self._tabuleiro = None
+        self._analise = None
+
+        if tipo == 'm':
+            i, j = INDICE[posicoes[0]], INDICE[posicoes[1]]
+            bits = (1 << i) | (1 << j)
+            if lado == 'c':
+                self.cachorros ^= bits
+                self.chave ^= ZOBRIST_C[i] ^ ZOBRIST_C[j]
+                outros = self.cachorros ^ (1 << j)
+                self.conexoes += (
+                    (VIZINHOS[j] & outros).bit_count()
+                    + (VIZINHOS_INVERSOS[j] & outros).bit_count()
+                    - (VIZINHOS[i] & outros).bit_count()
+                    - (VIZINHOS_INVERSOS[i] & outros).bit_count()
+                )
+                self.avanco += AVANCO[j] - AVANCO[i]
+            else:
+                self.onca ^= bits
+                self.chave ^= ZOBRIST_O[i] ^ ZOBRIST_O[j]
+
+        elif tipo == 's':
+            for k in range(1, len(posicoes)):
+                lp, cp = posicoes[k - 1]
+                la, ca = posicoes[k]
+                meio = INDICE[((lp + la) // 2, (cp + ca) // 2)]
+                self.cachorros &= ~(1 << meio)
+                self.chave ^= ZOBRIST_C[meio]
+                self.conexoes -= (
+                    (VIZINHOS[meio] & self.cachorros).bit_count()
+                    + (VIZINHOS_INVERSOS[meio] & self.cachorros).bit_count()
+                )
+                self.avanco -= AVANCO[meio]
+
+            i, j = INDICE[posicoes[0]], INDICE[posicoes[-1]]
+            self.onca = 1 << j
+            self.chave ^= ZOBRIST_O[i] ^ ZOBRIST_O[j]
@@ -0,0 +1,262 @@
+"""
+Livro de aberturas do Jogo da Onça
+
+O livro associa posições (chave Zobrist combinada com o lado a jogar) a
+estatísticas de movimentos. Ele é construído offline, a partir de partidas
+do autojogo ou de buscas profundas, e gravado em um arquivo binário
+ordenado pela chave. O jogador abre esse arquivo com mmap e faz busca
+binária direto nos bytes, sem desserializar nada na inicialização.
+
+Formato do arquivo (little-endian):
+    cabeçalho: magia b'ONCL', versão (u16), reservado (u16), entradas (u32)
+    entrada:   chave (u64), movimento codificado (u64), peso (u32), valor (f32)
+
+As entradas de uma mesma chave ficam juntas, da melhor para a pior pelo
+limite inferior de confiança do valor (limite_inferior): um movimento
+visto em poucas partidas não passa à frente de um bem amostrado só por
+acaso.
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+from collections import defaultdict
+
+from jogo import (EstadoJogo, ZOBRIST_LADO, codificar_movimento,
+                  decodificar_movimento)
+from jogo_bitboard import EstadoBitboard
+from busca import BuscaAdversarial
+
+MAGIA = b'ONCL'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sHHI')
+ENTRADA = struct.Struct('<QQIf')
+
+Z_CONFIANCA = 1.96  # Limite inferior de ~95% (intervalo de Wilson)
+
+OUTRO = lambda l: 'c' if l == 'o' else 'o'
+
+
+def chave_livro(estado, lado):
+    """Chave de uma posição no livro: posição + lado a jogar"""
+    return estado.chave ^ ZOBRIST_LADO[lado]
+
+
+def construir_de_partidas(caminho_partidas, max_lances=12, min_peso=2):
+    """
+    Monta as estatísticas do livro a partir de partidas do autojogo
+
+    Só entram lances escolhidos por busca (nós > 0), não os sorteados para
+    variar a abertura. O valor de um movimento é a pontuação média do lado
+    que o jogou (vitória = 1, empate = 0.5, derrota = 0).
+
+    Returns:
+        Dicionário {(chave, codigo_movimento): (peso, valor)}
+    """
+    estatisticas = defaultdict(lambda: [0, 0.0])
+
+    with open(caminho_partidas, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                partida = json.loads(linha)
+            except ValueError:
+                continue
+
+            resultado = partida['resultado']
+            nos = partida.get('nos')
+            estado = EstadoBitboard()
+
+            for i, texto in enumerate(partida['movimentos'][:max_lances]):
+                lado, movimento = EstadoJogo.string_para_movimento(texto)
+                if movimento is None:
+                    continue
+
+                if nos is None or nos[i] > 0:
+                    if resultado == 'empate':
+                        pontos = 0.5
+                    else:
+                        pontos = 1.0 if resultado == lado else 0.0
+                    item = estatisticas[(chave_livro(estado, lado),
+                                         codificar_movimento(movimento))]
+                    item[0] += 1
+                    item[1] += pontos
+
+                estado.fazer_movimento(lado, movimento)
+
+    return {
+        chave: (peso, pontos / peso)
+        for chave, (peso, pontos) in estatisticas.items()
+        if peso >= min_peso
+    }
+
+
+def construir_por_busca(max_lances=4, profundidade=7, tempo_limite=None,
+                        lado_inicial='o'):
+    """
+    Monta o livro buscando a fundo todas as posições até max_lances
+
+    Todas as respostas possíveis são expandidas, então o livro cobre os dois
+    lados. Cada posição recebe o movimento escolhido pela busca com peso 1
+    e valor 1.0.
+
+    Returns:
+        Dicionário {(chave, codigo_movimento): (peso, valor)}
+    """
+    entradas = {}
+    buscas = {lado: BuscaAdversarial(profundidade, tempo_limite) for lado in ('o', 'c')}
+    fronteira = [EstadoBitboard()]
+    lado = lado_inicial
+    vistos = set()
+
+    for lance in range(max_lances):
+        proxima = []
+        for estado in fronteira:
+            chave = chave_livro(estado, lado)
+            if chave in vistos or estado.eh_terminal():
+                continue
+            vistos.add(chave)
+
+            movimento = buscas[lado].melhor_movimento(estado, lado)
+            if movimento is None:
+                continue
+            entradas[(chave, codificar_movimento(movimento))] = (1, 1.0)
+            print(f"Lance {lance + 1}: {len(vistos)} posições", file=sys.stderr)
+
+            if lance + 1 < max_lances:
+                for mov in estado.gerar_movimentos(lado):
+                    proxima.append(estado.aplicar_movimento(lado, mov))
+
+        fronteira = proxima
+        lado = OUTRO(lado)
+
+    return entradas
+
+
+def limite_inferior(peso, valor, z=Z_CONFIANCA):
+    """
+    Limite inferior do intervalo de Wilson para a pontuação média valor
+    observada em peso partidas (empates contam como meio ponto)
+    """
+    if peso <= 0:
+        return 0.0
+    z2 = z * z
+    centro = valor + z2 / (2 * peso)
+    margem = z * math.sqrt(max(0.0, valor * (1 - valor)) / peso + z2 / (4 * peso * peso))
+    return (centro - margem) / (1 + z2 / peso)
+
+
+def gravar_livro(entradas, caminho):
+    """Grava as entradas no formato binário ordenado"""
+    ordenadas = sorted(
+        ((chave, codigo, peso, valor) for (chave, codigo), (peso, valor) in entradas.items()),
+        key=lambda e: (e[0], -limite_inferior(e[2], e[3]), -e[2])
+    )
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(MAGIA, VERSAO, 0, len(ordenadas)))
+        for entrada in ordenadas:
+            arquivo.write(ENTRADA.pack(*entrada))
+
+
+class LivroAberturas:
+    """Consulta um livro de aberturas gravado por gravar_livro via mmap"""
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'rb')
+        try:
+            self._dados = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self._arquivo.close()
+            raise ValueError(f"Livro de aberturas vazio: {caminho}")
+
+        magia, versao, _, self.num_entradas = CABECALHO.unpack_from(self._dados, 0)
+        if magia != MAGIA or versao != VERSAO:
+            self.fechar()
+            raise ValueError(f"Arquivo não é um livro de aberturas válido: {caminho}")
+
+        self.consultas = 0
+        self.acertos = 0
+
+    def fechar(self):
+        """Libera o mapeamento e o arquivo"""
+        self._dados.close()
+        self._arquivo.close()
+
+    def _entrada(self, i):
+        return ENTRADA.unpack_from(self._dados, CABECALHO.size + i * ENTRADA.size)
+
+    def _primeira(self, chave):
+        """Busca binária pela primeira entrada com chave >= chave"""
+        baixo, alto = 0, self.num_entradas
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._entrada(meio)[0] < chave:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return baixo
+
+    def movimentos(self, estado, lado):
+        """
+        Lista os movimentos do livro para a posição, do melhor para o pior
+
+        Returns:
+            Lista de tuplas (movimento, peso, valor)
+        """
+        chave = chave_livro(estado, lado)
+        resultado = []
+
+        i = self._primeira(chave)
+        while i < self.num_entradas:
+            chave_i, codigo, peso, valor = self._entrada(i)
+            if chave_i != chave:
+                break
+            resultado.append((decodificar_movimento(codigo), peso, valor))
+            i += 1
+
+        return resultado
+
+    def consultar(self, estado, lado):
+        """Retorna o melhor movimento do livro para a posição, ou None"""
+        self.consultas += 1
+        opcoes = self.movimentos(estado, lado)
+        if not opcoes:
+            return None
+
+        # Protege contra colisões de chave: o movimento precisa ser legal
+        legais = estado.gerar_movimentos(lado)
+        for movimento, _, _ in opcoes:
+            if movimento in legais:
+                self.acertos += 1
+                return movimento
+        return None
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Formato:")
+        print("  python livro.py partidas partidas.jsonl livro.bin [max_lances min_peso]")
+        print("  python livro.py busca livro.bin [max_lances profundidade]")
+        sys.exit(1)
+
+    modo = sys.argv[1]
+    if modo == 'partidas':
+        caminho_partidas, caminho = sys.argv[2], sys.argv[3]
+        max_lances = int(sys.argv[4]) if len(sys.argv) > 4 else 12
+        min_peso = int(sys.argv[5]) if len(sys.argv) > 5 else 2
+        entradas = construir_de_partidas(caminho_partidas, max_lances, min_peso)
+    else:
+        caminho = sys.argv[2]
+        max_lances = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+        profundidade = int(sys.argv[4]) if len(sys.argv) > 4 else 7
+        entradas = construir_por_busca(max_lances, profundidade)
+
+    gravar_livro(entradas, caminho)
+    print(f"{len(entradas)} entradas gravadas em {caminho}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
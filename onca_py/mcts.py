@@ -0,0 +1,419 @@
+"""
+Busca em árvore Monte Carlo (MCTS) - alternativa à BuscaAdversarial
+
+Em vez de uma árvore de profundidade fixa, a árvore cresce de forma
+assimétrica na direção dos movimentos que dão melhores resultados em
+partidas simuladas (playouts) rápidas. A seleção usa UCT ou PUCT (UCT com
+probabilidades a priori dos movimentos). A busca pode parar a qualquer
+momento (tempo_limite), reaproveita a subárvore da jogada anterior e pode
+rodar árvores independentes em vários processos (paralelismo na raiz),
+somando as visitas dos movimentos da raiz no final.
+
+A interface é a mesma da BuscaAdversarial: melhor_movimento(estado, lado)
+e obter_estatisticas().
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from jogo import codificar_movimento, decodificar_movimento
+
+OUTRO = lambda l: 'c' if l == 'o' else 'o'
+
+# Iterações por busca quando não há tempo_limite
+ITERACOES_PADRAO = 5000
+
+
+class No:
+    """Nó da árvore: estatísticas do movimento que leva a ele"""
+
+    __slots__ = ('movimento', 'lado', 'pai', 'filhos', 'visitas', 'soma', 'prior')
+
+    def __init__(self, movimento, lado, pai, prior=1.0):
+        self.movimento = movimento  # None = passar a vez
+        self.lado = lado            # Lado que fez o movimento
+        self.pai = pai
+        self.filhos = None          # None = ainda não expandido
+        self.visitas = 0
+        self.soma = 0.0             # Resultados do ponto de vista de lado
+        self.prior = prior
+
+    def valor(self):
+        """Resultado médio para o lado que fez o movimento"""
+        return self.soma / self.visitas if self.visitas else 0.5
+
+
+def _prioridade(lado, movimento):
+    """Peso a priori de um movimento (PUCT)"""
+    tipo, posicoes = movimento
+    if lado == 'o':
+        return 1.0 + 3.0 * (len(posicoes) - 1) if tipo == 's' else 1.0
+    # Cachorros: avançar costuma ser melhor que recuar
+    return 2.0 if posicoes[-1][0] > posicoes[0][0] else 1.0
+
+
+class BuscaMCTS:
+    """Implementa busca em árvore Monte Carlo com UCT/PUCT"""
+
+    def __init__(self, tempo_limite=None, max_iteracoes=None, exploracao=1.4,
+                 puct=True, max_playout=40, num_processos=1, semente=None):
+        """
+        Inicializa a busca
+
+        Args:
+            tempo_limite: Tempo limite em segundos (None = usa max_iteracoes)
+            max_iteracoes: Máximo de iterações por busca (None = sem limite
+                se houver tempo_limite, senão ITERACOES_PADRAO)
+            exploracao: Constante de exploração da seleção
+            puct: Usa PUCT (com pesos a priori) em vez de UCT
+            max_playout: Máximo de jogadas de cada partida simulada
+            num_processos: Árvores independentes em paralelo (1 = serial)
+            semente: Semente do gerador aleatório (None = aleatória)
+        """
+        self.tempo_limite = tempo_limite
+        if max_iteracoes is None and tempo_limite is None:
+            max_iteracoes = ITERACOES_PADRAO
+        self.max_iteracoes = max_iteracoes
+        self.exploracao = exploracao
+        self.puct = puct
+        self.max_playout = max_playout
+        self.num_processos = num_processos or os.cpu_count() or 1
+        self.semente = semente
+        self.rng = random.Random(semente)
+
+        self.inicio_busca = None
+        self.iteracoes = 0
+        self.jogadas_simuladas = 0
+        self.profundidade_atingida = 0
+        self.visitas_reaproveitadas = 0
+        self.valor_raiz = None
+
+        # Árvore da última busca, para reaproveitar na próxima
+        self._raiz = None
+        self._estado_raiz = None
+        self._lado_raiz = None
+        self._executor = None
+
+    def tempo_esgotado(self):
+        """Verifica se o tempo limite foi atingido"""
+        if self.tempo_limite is None:
+            return False
+        return (time.monotonic() - self.inicio_busca) >= self.tempo_limite
+
+    def encerrar(self):
+        """Encerra o pool de processos (paralelismo na raiz)"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def melhor_movimento(self, estado, lado):
+        """
+        Encontra o melhor movimento (o mais visitado na raiz)
+
+        Args:
+            estado: EstadoJogo atual
+            lado: 'o' ou 'c'
+
+        Returns:
+            Tupla (tipo, posicoes) representando o melhor movimento
+        """
+        self.inicio_busca = time.monotonic()
+        self.iteracoes = 0
+        self.jogadas_simuladas = 0
+        self.profundidade_atingida = 0
+        self.visitas_reaproveitadas = 0
+        self.valor_raiz = None
+
+        movimentos = estado.gerar_movimentos(lado)
+        if not movimentos:
+            return None
+        if len(movimentos) == 1:
+            return movimentos[0]
+
+        if self.num_processos > 1:
+            visitas = self._buscar_paralelo(estado, lado)
+        else:
+            visitas = self._buscar_arvore(estado, lado)
+
+        # Sem nenhuma iteração (prazo ou orçamento zerado): joga o primeiro
+        if not visitas:
+            return movimentos[0]
+        codigo = max(visitas, key=lambda c: visitas[c][0])
+        return decodificar_movimento(codigo)
+
+    def _buscar_arvore(self, estado, lado):
+        """
+        Busca serial em uma árvore
+
+        Returns:
+            Dicionário {codigo_movimento: (visitas, soma)} dos filhos da raiz
+        """
+        estado = estado.copiar()
+        raiz = self._reaproveitar(estado, lado)
+        self.visitas_reaproveitadas = raiz.visitas
+
+        while not self.tempo_esgotado():
+            if self.max_iteracoes is not None and self.iteracoes >= self.max_iteracoes:
+                break
+            self._iteracao(raiz, estado, lado)
+            self.iteracoes += 1
+
+        self._raiz = raiz
+        self._estado_raiz = estado.copiar()
+        self._lado_raiz = lado
+        if raiz.visitas:
+            # A raiz guarda o ponto de vista do adversário
+            self.valor_raiz = 1.0 - raiz.valor()
+
+        return {
+            codificar_movimento(filho.movimento): (filho.visitas, filho.soma)
+            for filho in raiz.filhos or () if filho.movimento is not None
+        }
+
+    def _reaproveitar(self, estado, lado):
+        """
+        Procura a posição atual entre os netos da raiz da busca anterior
+        (nosso movimento seguido da resposta do adversário) e devolve essa
+        subárvore como nova raiz, ou uma raiz nova se não encontrar
+        """
+        anterior = self._raiz
+        if anterior is not None and self._lado_raiz == lado and anterior.filhos:
+            base = self._estado_raiz
+            for filho in anterior.filhos:
+                if filho.filhos is None:
+                    continue
+                desfazer = self._aplicar(base, filho)
+                for neto in filho.filhos:
+                    desfazer_neto = self._aplicar(base, neto)
+                    encontrado = base.chave == estado.chave
+                    if desfazer_neto:
+                        base.desfazer_movimento()
+                    if encontrado:
+                        if desfazer:
+                            base.desfazer_movimento()
+                        neto.pai = None
+                        return neto
+                if desfazer:
+                    base.desfazer_movimento()
+
+        return No(None, OUTRO(lado), None)
+
+    @staticmethod
+    def _aplicar(estado, no):
+        """Aplica o movimento do nó; retorna False se era passar a vez"""
+        if no.movimento is None:
+            return False
+        estado.fazer_movimento(no.lado, no.movimento)
+        return True
+
+    def _iteracao(self, raiz, estado, lado):
+        """Seleção, expansão, simulação e retropropagação"""
+        no = raiz
+        aplicados = 0
+        a_jogar = lado
+        profundidade = 0
+
+        # Seleção: desce pelos nós já expandidos
+        while no.filhos and not estado.eh_terminal():
+            no = self._selecionar(no)
+            if self._aplicar(estado, no):
+                aplicados += 1
+            a_jogar = OUTRO(a_jogar)
+            profundidade += 1
+
+        # Expansão: cria todos os filhos e desce para um deles
+        if no.filhos is None and not estado.eh_terminal():
+            self._expandir(no, estado, a_jogar)
+            no = self._selecionar(no)
+            if self._aplicar(estado, no):
+                aplicados += 1
+            a_jogar = OUTRO(a_jogar)
+            profundidade += 1
+
+        self.profundidade_atingida = max(self.profundidade_atingida, profundidade)
+
+        # Simulação a partir da folha
+        resultado_onca = self._simular(estado, a_jogar)
+
+        for _ in range(aplicados):
+            estado.desfazer_movimento()
+
+        # Retropropagação
+        while no is not None:
+            no.visitas += 1
+            no.soma += resultado_onca if no.lado == 'o' else 1.0 - resultado_onca
+            no = no.pai
+
+    def _expandir(self, no, estado, lado):
+        """Cria os filhos do nó; sem movimentos, o lado passa a vez"""
+        movimentos = estado.gerar_movimentos(lado)
+        if not movimentos:
+            no.filhos = [No(None, lado, no)]
+            return
+
+        pesos = [_prioridade(lado, mov) for mov in movimentos]
+        total = sum(pesos)
+        no.filhos = [
+            No(mov, lado, no, peso / total) for mov, peso in zip(movimentos, pesos)
+        ]
+        self.rng.shuffle(no.filhos)
+
+    def _selecionar(self, no):
+        """Escolhe o filho com maior prioridade UCT/PUCT"""
+        c = self.exploracao
+        if self.puct:
+            raiz_n = math.sqrt(no.visitas + 1)
+            return max(no.filhos, key=lambda f: (
+                f.valor() + c * f.prior * raiz_n / (1 + f.visitas)
+            ))
+
+        log_n = math.log(no.visitas + 1)
+        melhor = None
+        melhor_valor = -1.0
+        for filho in no.filhos:
+            if filho.visitas == 0:
+                return filho
+            valor = filho.valor() + c * math.sqrt(log_n / filho.visitas)
+            if valor > melhor_valor:
+                melhor, melhor_valor = filho, valor
+        return melhor
+
+    def _simular(self, estado, lado):
+        """
+        Joga uma partida rápida a partir do estado e desfaz no final
+
+        A onça captura sempre que pode (o salto mais longo); os demais
+        movimentos são sorteados.
+
+        Returns:
+            Resultado do ponto de vista da onça: 1 vitória, 0 derrota e,
+            se a partida não terminar, 0.5 mais 0.1 por cachorro capturado
+            durante a simulação
+        """
+        rng = self.rng
+        cachorros_inicio = estado.contar_cachorros()
+        aplicados = 0
+
+        for _ in range(self.max_playout):
+            if estado.eh_terminal():
+                break
+            movimentos = estado.gerar_movimentos(lado)
+            if movimentos:
+                if lado == 'o':
+                    saltos = [mov for mov in movimentos if mov[0] == 's']
+                    if saltos:
+                        movimento = max(saltos, key=lambda mov: len(mov[1]))
+                    else:
+                        movimento = rng.choice(movimentos)
+                else:
+                    movimento = rng.choice(movimentos)
+                estado.fazer_movimento(lado, movimento)
+                aplicados += 1
+            lado = OUTRO(lado)
+
+        self.jogadas_simuladas += aplicados
+        vencedor = estado.vencedor()
+        if vencedor == 'o':
+            resultado = 1.0
+        elif vencedor == 'c':
+            resultado = 0.0
+        else:
+            capturados = cachorros_inicio - estado.contar_cachorros()
+            resultado = min(1.0, 0.5 + 0.1 * capturados)
+
+        for _ in range(aplicados):
+            estado.desfazer_movimento()
+        return resultado
+
+    def _obter_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_processos,
+                initializer=_inicializar_processo,
+                initargs=(self.exploracao, self.puct, self.max_playout),
+            )
+        return self._executor
+
+    def _buscar_paralelo(self, estado, lado):
+        """Roda uma árvore por processo e soma as visitas da raiz"""
+        executor = self._obter_executor()
+        prazo = None
+        if self.tempo_limite is not None:
+            prazo = self.inicio_busca + self.tempo_limite
+        iteracoes = None
+        if self.max_iteracoes is not None:
+            iteracoes = -(-self.max_iteracoes // self.num_processos)
+
+        futuros = [
+            executor.submit(_buscar_processo, estado, lado, prazo, iteracoes,
+                            self.rng.getrandbits(64))
+            for _ in range(self.num_processos)
+        ]
+
+        visitas = {}
+        soma_total = 0.0
+        visitas_total = 0
+        for futuro in futuros:
+            filhos, estatisticas = futuro.result()
+            self.iteracoes += estatisticas['iteracoes']
+            self.jogadas_simuladas += estatisticas['jogadas_simuladas']
+            self.visitas_reaproveitadas += estatisticas['visitas_reaproveitadas']
+            self.profundidade_atingida = max(self.profundidade_atingida,
+                                             estatisticas['profundidade_atingida'])
+            for codigo, (n, soma) in filhos.items():
+                n_atual, soma_atual = visitas.get(codigo, (0, 0.0))
+                visitas[codigo] = (n_atual + n, soma_atual + soma)
+                visitas_total += n
+                soma_total += soma
+
+        if visitas_total:
+            self.valor_raiz = soma_total / visitas_total
+        return visitas
+
+    def obter_estatisticas(self):
+        """Retorna estatísticas da última busca"""
+        return {
+            'nos_explorados': self.iteracoes,
+            'iteracoes': self.iteracoes,
+            'jogadas_simuladas': self.jogadas_simuladas,
+            'profundidade_atingida': self.profundidade_atingida,
+            'visitas_reaproveitadas': self.visitas_reaproveitadas,
+            'valor': self.valor_raiz,
+            'processos': self.num_processos,
+            'tempo_decorrido': time.monotonic() - self.inicio_busca if self.inicio_busca else 0
+        }
+
+
+# Busca de cada processo trabalhador (mantém a própria árvore entre jogadas)
+_busca_processo = None
+
+
+def _inicializar_processo(exploracao, puct, max_playout):
+    """Inicializador do processo trabalhador"""
+    global _busca_processo
+    _busca_processo = BuscaMCTS(exploracao=exploracao, puct=puct,
+                                max_playout=max_playout)
+
+
+def _buscar_processo(estado, lado, prazo, max_iteracoes, semente):
+    """
+    Busca de uma árvore em um processo trabalhador
+
+    Returns:
+        Tupla (filhos, estatisticas) com as visitas dos filhos da raiz
+    """
+    busca = _busca_processo
+    busca.rng.seed(semente)
+    busca.inicio_busca = time.monotonic()
+    busca.tempo_limite = None if prazo is None else max(0.0, prazo - busca.inicio_busca)
+    busca.max_iteracoes = max_iteracoes
+    busca.iteracoes = 0
+    busca.jogadas_simuladas = 0
+    busca.profundidade_atingida = 0
+
+    filhos = busca._buscar_arvore(estado, lado)
+    estatisticas = busca.obter_estatisticas()
+    return filhos, estatisticas
@@ -0,0 +1,177 @@
+"""
+Ponderação - busca no tempo do adversário
+
+Enquanto o jogador espera a resposta do adversário (bloqueado em
+tabuleiro.receber()), uma thread busca a posição que se espera encontrar na
+volta: a do próprio movimento seguido da resposta prevista pela variação
+principal. A espera no Redis libera o GIL, então a thread tem a CPU só para
+ela.
+
+Quando o tabuleiro chega:
+    acerto: a busca em andamento vira a busca da jogada; como ela já tem a
+            profundidade do tempo ponderado, para no prazo suave do
+            gerenciador de tempo em vez do rígido
+    erro:   a busca é interrompida e a jogada é buscada do zero, mas com a
+            tabela de transposição e o histórico de cortes já aquecidos
+
+A thread usa o próprio objeto de busca do jogador, então nunca há duas
+buscas ao mesmo tempo. Só a busca serial (BuscaAdversarial) pondera. Com
+telemetria na busca, a busca ponderada só é registrada como jogada no
+acerto.
+"""
+
+import threading
+import time
+
+
+class Ponderador:
+    """Controla a busca em segundo plano e as estatísticas da partida"""
+
+    def __init__(self, busca):
+        """
+        Args:
+            busca: BuscaAdversarial do jogador (com ou sem gerenciador de tempo)
+        """
+        self.busca = busca
+        self._thread = None
+        self._previsto = None
+        self.resposta_prevista = None
+        self._inicio = None
+        self._resultado = None
+        self._gerenciador = None
+
+        # Estatísticas da partida
+        self.ponderacoes = 0
+        self.acertos = 0
+        self.erros = 0
+        self.tempo_ponderado = 0.0
+        self.tempo_economizado = 0.0
+
+    def em_andamento(self):
+        """Verifica se há uma ponderação à espera do tabuleiro"""
+        return self._thread is not None
+
+    def iniciar(self, estado, lado, movimento):
+        """
+        Começa a ponderar depois de jogar `movimento` em `estado`
+
+        A resposta prevista é o segundo lance da variação principal da
+        última busca, se ela começar por `movimento`.
+
+        Returns:
+            True se a ponderação começou (havia previsão)
+        """
+        variacao = self.busca.variacao_principal
+        if len(variacao) < 2 or variacao[0] != movimento:
+            return False
+
+        outro = 'c' if lado == 'o' else 'o'
+        previsto = estado.aplicar_movimento(lado, movimento)
+        if previsto.eh_terminal():
+            return False
+        # A variação pode ser de uma busca anterior (livro, lance único)
+        if variacao[1] not in previsto.gerar_movimentos(outro):
+            return False
+        previsto = previsto.aplicar_movimento(outro, variacao[1])
+        if previsto.eh_terminal():
+            return False
+
+        # Sem gerenciador a busca corre sem prazo até a profundidade máxima
+        self._gerenciador = self.busca.gerenciador_tempo
+        self.busca.gerenciador_tempo = None
+        self._previsto = previsto
+        self.resposta_prevista = variacao[1]
+        self._resultado = None
+        self._inicio = time.monotonic()
+        if self.busca.telemetria is not None:
+            self.busca.telemetria.iniciar_ponderacao()
+        self._thread = threading.Thread(
+            target=self._ponderar, args=(previsto, lado), daemon=True
+        )
+        self._thread.start()
+        self.ponderacoes += 1
+        return True
+
+    def _ponderar(self, estado, lado):
+        """Corpo da thread: busca a posição prevista"""
+        self._resultado = self.busca.melhor_movimento(estado, lado)
+
+    def acertou(self, estado):
+        """Verifica se o tabuleiro recebido é a posição prevista"""
+        if self._previsto is None or estado.chave != self._previsto.chave:
+            return False
+        return estado.para_string() == self._previsto.para_string()
+
+    def aproveitar(self):
+        """
+        Acerto: termina a busca em andamento no prazo suave da jogada
+
+        A iteração em andamento costuma ter começado bem antes da resposta e
+        dificilmente terminaria até o prazo rígido; interrompida, a busca
+        devolve o melhor movimento das iterações completas. O gerenciador
+        de tempo já deve ter sido iniciado para a jogada.
+
+        O tempo economizado é a parte do prazo suave que sobra quando a
+        busca ponderada termina; sem prazo, é o tempo ponderado, que a
+        busca da jogada não precisa refazer.
+        
+        Returns:
+            Movimento escolhido pela busca ponderada
+        """
+        ponderado = time.monotonic() - self._inicio
+        gerenciador = self._gerenciador
+        self.busca.gerenciador_tempo = gerenciador
+        prazo = None
+        if gerenciador is not None:
+            prazo = gerenciador.prazo_suave
+            self.busca.definir_prazo(prazo)
+        self._thread.join()
+        if self.busca.telemetria is not None:
+            self.busca.telemetria.aceitar_ponderacao()
+
+        self.acertos += 1
+        if prazo is not None:
+            self.tempo_economizado += max(0.0, gerenciador.prazo_suave - time.monotonic())
+        else:
+            self.tempo_economizado += ponderado
+        self.tempo_ponderado += ponderado
+        return self._encerrar()
+
+    def abandonar(self, erro=True):
+        """
+        Interrompe a busca em andamento, mantendo as tabelas aquecidas
+
+        Args:
+            erro: Conta como erro de previsão (False no fim da partida)
+        """
+        self.busca.interromper()
+        self._thread.join()
+        if self.busca.telemetria is not None:
+            self.busca.telemetria.descartar_ponderacao()
+        self.busca.limpar_interrupcao()
+        self.busca.gerenciador_tempo = self._gerenciador
+
+        if erro:
+            self.erros += 1
+        self.tempo_ponderado += time.monotonic() - self._inicio
+        self._encerrar()
+
+    def _encerrar(self):
+        """Volta ao estado sem ponderação e devolve o resultado da thread"""
+        resultado = self._resultado
+        self._thread = None
+        self._previsto = None
+        self._resultado = None
+        return resultado
+
+    def obter_estatisticas(self):
+        """Estatísticas da partida"""
+        decididas = self.acertos + self.erros
+        return {
+            'ponderacoes': self.ponderacoes,
+            'acertos': self.acertos,
+            'erros': self.erros,
+            'taxa_acerto': self.acertos / decididas if decididas else 0.0,
+            'tempo_ponderado': self.tempo_ponderado,
+            'tempo_economizado': self.tempo_economizado,
+        }
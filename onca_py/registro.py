@@ -0,0 +1,280 @@
+"""
+Registro binário de partidas
+
+As partidas são gravadas jogada a jogada, à medida que acontecem, em um
+arquivo binário compacto; um arquivo guarda várias partidas em sequência
+(um torneio inteiro, por exemplo). A leitura mapeia o arquivo com mmap e
+reconstrói os estados de cada partida sob demanda, por um gerador.
+
+Formato do arquivo (little-endian; varint = inteiro sem sinal em base 128,
+7 bits por byte, do menos para o mais significativo):
+    cabeçalho: magia b'ONCR', versão (u16)
+    partida:   b'P', id (varint com o tamanho + UTF-8), lado inicial (1 byte),
+               início (f64, time.time), cachorros (u32, um bit por casa na
+               ordem de CASAS), onça (u8, índice em CASAS ou 0xFF)
+    jogada:    lado (b'o' ou b'c'), caminho (varint n << 1 | salto, seguido
+               dos n índices das casas em um byte cada; 0 = passar a vez),
+               tempo (varint, em milissegundos)
+    fim:       b'F', resultado (b'o', b'c' ou b'e' = empate)
+
+Uma jogada simples ocupa 5 ou 6 bytes. Uma partida sem registro de fim
+(processo interrompido) é lida com resultado None.
+"""
+
+import mmap
+import struct
+import sys
+import time
+
+from jogo import EstadoJogo, CASAS, INDICE
+
+MAGIA = b'ONCR'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sH')
+INICIO_PARTIDA = struct.Struct('<cdIB')  # lado inicial, início, cachorros, onça
+
+SEM_ONCA = 0xFF
+RESULTADOS = {'o': b'o', 'c': b'c', 'empate': b'e'}
+_RESULTADOS_LIDOS = {ord(codigo): resultado for resultado, codigo in RESULTADOS.items()}
+
+
+def _varint(n):
+    """Codifica um inteiro sem sinal em varint"""
+    saida = bytearray()
+    while n >= 0x80:
+        saida.append(n & 0x7F | 0x80)
+        n >>= 7
+    saida.append(n)
+    return bytes(saida)
+
+
+def _ler_varint(dados, pos):
+    """Lê um varint de dados[pos:]; retorna (valor, posição seguinte)"""
+    valor = 0
+    deslocamento = 0
+    while True:
+        byte = dados[pos]
+        pos += 1
+        valor |= (byte & 0x7F) << deslocamento
+        if byte < 0x80:
+            return valor, pos
+        deslocamento += 7
+
+
+def _codificar_caminho(movimento):
+    """Bytes do caminho de uma jogada (None = passar a vez)"""
+    if movimento is None:
+        return _varint(0)
+    tipo, posicoes = movimento
+    return _varint(len(posicoes) << 1 | (tipo == 's')) + bytes(INDICE[p] for p in posicoes)
+
+
+class GravadorPartidas:
+    """
+    Grava partidas em um arquivo de registro durante o jogo
+
+    Cada registro é escrito e enviado ao sistema assim que acontece, sem
+    guardar a partida em memória; o arquivo é aberto para acréscimo.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'ab')
+        if self._arquivo.tell() == 0:
+            self._escrever(CABECALHO.pack(MAGIA, VERSAO))
+
+    def _escrever(self, dados):
+        self._arquivo.write(dados)
+        self._arquivo.flush()
+
+    def iniciar(self, id_partida, lado_inicial, estado=None):
+        """
+        Começa o registro de uma partida
+
+        Args:
+            id_partida: Identificador da partida
+            lado_inicial: Lado que joga primeiro
+            estado: Posição inicial (None = tabuleiro inicial)
+        """
+        estado = estado or EstadoJogo()
+        cachorros = 0
+        onca = SEM_ONCA
+        for pos, peca in estado.tabuleiro.items():
+            if peca == 'c':
+                cachorros |= 1 << INDICE[pos]
+            elif peca == 'o':
+                onca = INDICE[pos]
+
+        id_bytes = str(id_partida).encode('utf-8')
+        self._escrever(b'P' + _varint(len(id_bytes)) + id_bytes + INICIO_PARTIDA.pack(
+            lado_inicial.encode(), time.time(), cachorros, onca
+        ))
+
+    def jogada(self, lado, movimento, tempo=0.0):
+        """
+        Registra uma jogada
+
+        Args:
+            lado: Lado que jogou
+            movimento: Movimento no formato de gerar_movimentos (None = passar)
+            tempo: Tempo da jogada em segundos
+        """
+        self._escrever(lado.encode() + _codificar_caminho(movimento)
+                       + _varint(max(0, round(tempo * 1000))))
+
+    def jogada_texto(self, jogada, tempo=0.0):
+        """Registra uma jogada no formato de texto do controlador ("o m 3 3 4 3")"""
+        self.jogada(*EstadoJogo.string_para_movimento(jogada), tempo)
+
+    def terminar(self, resultado):
+        """Registra o fim da partida ('o', 'c' ou 'empate')"""
+        self._escrever(b'F' + RESULTADOS[resultado])
+
+    def fechar(self):
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class Partida:
+    """Partida lida de um arquivo de registro"""
+
+    def __init__(self, id_partida, lado_inicial, inicio, cachorros, onca):
+        self.id = id_partida
+        self.lado_inicial = lado_inicial
+        self.inicio = inicio
+        self.cachorros = cachorros
+        self.onca = onca
+        self.jogadas = []  # Tuplas (lado, movimento, tempo em segundos)
+        self.resultado = None  # 'o', 'c', 'empate' ou None (incompleta)
+
+    def estados(self, Estado=EstadoJogo):
+        """
+        Reconstrói a partida sob demanda
+
+        Yields:
+            O estado inicial e, depois de cada jogada, o estado seguinte
+            (objetos independentes, criados por aplicar_movimento)
+        """
+        estado = Estado.de_bits(self.cachorros, self.onca)
+        yield estado
+        for lado, movimento, _ in self.jogadas:
+            if movimento is not None:
+                estado = estado.aplicar_movimento(lado, movimento)
+            yield estado
+
+    def tempo_total(self, lado):
+        """Soma dos tempos das jogadas de um lado"""
+        return sum(tempo for l, _, tempo in self.jogadas if l == lado)
+
+
+def _ler_partida(dados, pos):
+    """Lê o cabeçalho de uma partida a partir do byte b'P'"""
+    tamanho, pos = _ler_varint(dados, pos + 1)
+    id_partida = bytes(dados[pos:pos + tamanho]).decode('utf-8')
+    pos += tamanho
+    lado, inicio, cachorros, onca = INICIO_PARTIDA.unpack_from(dados, pos)
+    pos += INICIO_PARTIDA.size
+    onca = 0 if onca == SEM_ONCA else 1 << onca
+    return Partida(id_partida, lado.decode(), inicio, cachorros, onca), pos
+
+
+def _ler_jogada(dados, pos):
+    """Lê uma jogada; retorna ((lado, movimento, tempo), posição seguinte)"""
+    lado = chr(dados[pos])
+    cabeca, pos = _ler_varint(dados, pos + 1)
+    movimento = None
+    if cabeca:
+        n = cabeca >> 1
+        posicoes = [CASAS[i] for i in dados[pos:pos + n]]
+        if len(posicoes) < n:
+            raise IndexError("jogada truncada")
+        movimento = ('s' if cabeca & 1 else 'm', posicoes)
+        pos += n
+    milissegundos, pos = _ler_varint(dados, pos)
+    return (lado, movimento, milissegundos / 1000), pos
+
+
+def ler_partidas(caminho):
+    """
+    Itera as partidas de um arquivo de registro, uma de cada vez
+
+    Um registro truncado no fim do arquivo (gravação interrompida) encerra
+    a leitura; a partida em que ele estava sai com resultado None.
+
+    Yields:
+        Objetos Partida
+    """
+    with open(caminho, 'rb') as arquivo:
+        try:
+            dados = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # Arquivo vazio
+
+        try:
+            if len(dados) < CABECALHO.size or \
+               CABECALHO.unpack_from(dados, 0) != (MAGIA, VERSAO):
+                raise ValueError(f"Arquivo não é um registro de partidas válido: {caminho}")
+
+            pos = CABECALHO.size
+            partida = None
+            while pos < len(dados):
+                tipo = dados[pos]
+                try:
+                    if tipo == ord('P'):
+                        if partida is not None:
+                            yield partida
+                        partida, pos = _ler_partida(dados, pos)
+                    elif partida is None:
+                        break  # Jogada ou fim fora de uma partida: arquivo corrompido
+                    elif tipo == ord('F'):
+                        partida.resultado = _RESULTADOS_LIDOS[dados[pos + 1]]
+                        pos += 2
+                        yield partida
+                        partida = None
+                    else:
+                        jogada, pos = _ler_jogada(dados, pos)
+                        partida.jogadas.append(jogada)
+                except (IndexError, KeyError, struct.error):
+                    break  # Registro truncado
+
+            if partida is not None:
+                yield partida
+        finally:
+            dados.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Formato: python registro.py partidas.onca [id]")
+        print("  Sem id, lista as partidas; com id, mostra os tabuleiros da partida")
+        sys.exit(1)
+
+    caminho = sys.argv[1]
+    id_partida = sys.argv[2] if len(sys.argv) > 2 else None
+
+    for partida in ler_partidas(caminho):
+        if id_partida is None:
+            data = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(partida.inicio))
+            print(f"{partida.id}: {data}, começa {partida.lado_inicial}, "
+                  f"{len(partida.jogadas)} jogadas, resultado {partida.resultado}, "
+                  f"tempo o {partida.tempo_total('o'):.1f}s c {partida.tempo_total('c'):.1f}s")
+            continue
+        if partida.id != id_partida:
+            continue
+
+        estados = partida.estados()
+        print(next(estados).para_string())
+        for (lado, movimento, tempo), estado in zip(partida.jogadas, estados):
+            texto = estado.movimento_para_string(lado, movimento) if movimento else f"{lado} n"
+            print(f"{texto} ({tempo:.2f}s)")
+            print(estado.para_string())
+        print(f"resultado: {partida.resultado}")
+
+
+if __name__ == "__main__":
+    main()
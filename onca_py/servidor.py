@@ -0,0 +1,278 @@
+"""
+Servidor de várias partidas - o controlador em um só processo asyncio
+
+Cada partida é uma tarefa asyncio que segue as mesmas regras de
+controlador.py (parse, aplica e vitoria), mas com as listas da partida sob
+o prefixo partida:<id>: (tabuleiro.chave). Os jogadores de uma partida
+recebem o id como último argumento:
+
+    python ia_jogador.py o 127.0.0.1 10001 p1
+
+As partidas entram por uma fila de admissão, a lista FILA do Redis, com
+pedidos "id lado jogadas tempo [formato]" nos argumentos do controlador.
+O servidor só retira um pedido quando há vaga (max_partidas), então os
+excedentes esperam na fila, em ordem, e vários servidores podem atender a
+mesma fila. O resultado de cada partida é gravado como uma linha JSON na
+lista RESULTADOS. Com um diretório de registros, cada partida também é
+gravada em <diretório>/<id>.onca (registro.py).
+
+Todas as partidas usam um cliente redis.asyncio sobre um pool de conexões
+compartilhado; cada partida ocupa uma conexão enquanto espera a jogada (um
+BLPOP com o limite de tempo da jogada). O relógio de cada lado soma o
+tempo que a partida esperou pelas suas jogadas.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import redis
+import redis.asyncio
+
+from controlador import OUTRO, POS, TABULEIRO_INICIAL, parse, aplica, vitoria, mensagem
+from registro import GravadorPartidas
+from tabuleiro import conexao, chave, jogada_para_texto
+
+FILA = "partidas:fila"
+RESULTADOS = "partidas:resultados"
+
+# Validade das listas de uma partida encerrada (s), para os jogadores
+# lerem o tabuleiro final
+EXPIRACAO = 3600
+
+
+def ler_pedido(pedido):
+    """
+    Interpreta um pedido da fila
+
+    Returns:
+        Tupla (id, lado, jogadas, tempo, formato), com tempo None = sem limite
+
+    Raises:
+        ValueError: se o pedido for inválido
+    """
+    partes = pedido.split()
+    if len(partes) < 4:
+        raise ValueError(f"pedido incompleto: {pedido!r}")
+
+    id_partida, lado = partes[0], partes[1]
+    jogadas = int(partes[2])
+    tempo = float(partes[3]) or None
+    formato = partes[4] if len(partes) > 4 else "texto"
+    if lado not in ('o', 'c') or formato not in ('texto', 'binario'):
+        raise ValueError(f"pedido inválido: {pedido!r}")
+    return id_partida, lado, jogadas, tempo, formato
+
+
+def _chaves_partida(id_partida):
+    """Chaves Redis das listas de uma partida, por (nome, lado)"""
+    return {(nome, lado): chave(nome, lado, id_partida)
+            for nome in ('tabuleiro', 'jogada') for lado in ('o', 'c')}
+
+
+async def jogar_partida(cliente, id_partida, quem_joga, num_jogadas, tempo,
+                        formato="texto", gravador=None):
+    """
+    Conduz uma partida até a vitória ou o limite de jogadas
+
+    Com um GravadorPartidas, as jogadas são gravadas à medida que acontecem.
+
+    Returns:
+        Dicionário com o resultado ('o', 'c' ou 'empate'), as jogadas feitas
+        e, por lado, o tempo de relógio e as jogadas perdidas (inválidas ou
+        fora do tempo)
+    """
+    chaves = _chaves_partida(id_partida)
+    # Restos de uma partida anterior com o mesmo id
+    await cliente.delete(*chaves.values())
+
+    tabuleiro = TABULEIRO_INICIAL
+    onca = POS(3, 3)
+    relogio = {'o': 0.0, 'c': 0.0}
+    perdidas = {'o': 0, 'c': 0}
+    resultado = 'empate'
+    jogadas = 0
+    if gravador:
+        gravador.iniciar(id_partida, quem_joga)
+
+    buffer = mensagem(quem_joga, f"{OUTRO(quem_joga)} n", tabuleiro, formato)
+
+    while num_jogadas > 0:
+        chave_tabuleiro = chaves[('tabuleiro', quem_joga)]
+
+        inicio = time.monotonic()
+        async with cliente.pipeline(transaction=False) as pipe:
+            pipe.ltrim(chave_tabuleiro, 1, 0)
+            pipe.rpush(chave_tabuleiro, buffer)
+            pipe.blpop(chaves[('jogada', quem_joga)], timeout=tempo)
+            resposta = (await pipe.execute())[-1]
+        decorrido = time.monotonic() - inicio
+        relogio[quem_joga] += decorrido
+
+        ok = False
+        if resposta is not None:
+            jogada = jogada_para_texto(resposta[1])
+            try:
+                lado_p, tipo_mov, num_mov, mov_l, mov_c = parse(jogada)
+            except IndexError:
+                lado_p = None  # Uma jogada malformada não derruba o servidor
+            if lado_p and quem_joga == lado_p:
+                novo_tabuleiro = aplica(tabuleiro, lado_p, tipo_mov, num_mov, mov_l, mov_c)
+                if novo_tabuleiro:
+                    tabuleiro = novo_tabuleiro
+                    ok = True
+                    if lado_p == 'o' and tipo_mov != 'n':
+                        onca = POS(mov_l[-1], mov_c[-1])
+
+        if not ok:
+            jogada = f"{quem_joga} n"
+            perdidas[quem_joga] += 1
+
+        jogadas += 1
+        if gravador:
+            gravador.jogada_texto(jogada, decorrido)
+        if vitoria(quem_joga, tabuleiro, onca):
+            resultado = quem_joga
+            break
+
+        quem_joga = OUTRO(quem_joga)
+        buffer = mensagem(quem_joga, jogada.strip(), tabuleiro, formato)
+        num_jogadas -= 1
+
+    async with cliente.pipeline(transaction=False) as pipe:
+        pipe.rpush(chaves[('tabuleiro', 'o')], mensagem("o", "c n", tabuleiro, formato))
+        pipe.rpush(chaves[('tabuleiro', 'c')], mensagem("c", "o n", tabuleiro, formato))
+        for nome in chaves.values():
+            pipe.expire(nome, EXPIRACAO)
+        await pipe.execute()
+
+    if gravador:
+        gravador.terminar(resultado)
+
+    return {
+        'id': id_partida,
+        'resultado': resultado,
+        'jogadas': jogadas,
+        'tabuleiro': tabuleiro,
+        'relogio': relogio,
+        'perdidas': perdidas,
+    }
+
+
+async def _partida_admitida(cliente, vagas, ativas, registros, id_partida, *args):
+    """
+    Joga uma partida admitida, grava o resultado e libera a vaga
+
+    Um erro qualquer (Redis, registro, bug) interrompe só esta partida: ele
+    é mostrado com o id, a vaga é liberada e as listas da partida são
+    apagadas, para não ficarem no Redis sem validade.
+    """
+    gravador = None
+    terminada = False
+    try:
+        if registros:
+            gravador = GravadorPartidas(os.path.join(registros, f"{id_partida}.onca"))
+        registro = await jogar_partida(cliente, id_partida, *args, gravador=gravador)
+        terminada = True
+        await cliente.rpush(RESULTADOS, json.dumps(registro))
+        print(f"partida {id_partida}: {registro['resultado']} em "
+              f"{registro['jogadas']} jogadas ({len(ativas) - 1} em andamento)")
+    except Exception as e:
+        print(f"partida {id_partida}: interrompida ({type(e).__name__}: {e})",
+              file=sys.stderr)
+    finally:
+        del ativas[id_partida]
+        vagas.release()
+        try:
+            if gravador:
+                gravador.fechar()
+            if not terminada:
+                await cliente.delete(*_chaves_partida(id_partida).values())
+        except Exception as e:
+            print(f"partida {id_partida}: limpeza falhou ({type(e).__name__}: {e})",
+                  file=sys.stderr)
+
+
+async def servir(ip="127.0.0.1", porta=10001, max_partidas=100, registros=None):
+    """
+    Admite partidas da fila e as joga, até max_partidas ao mesmo tempo
+
+    Com registros, cada partida é gravada em <registros>/<id>.onca.
+
+    O pool tem uma conexão por partida, para o BLPOP de cada uma, mais uma
+    para a fila e os resultados.
+    """
+    pool = redis.asyncio.BlockingConnectionPool(
+        host=ip, port=porta, db=0, max_connections=max_partidas + 1,
+        timeout=None, socket_timeout=None,
+    )
+    cliente = redis.asyncio.Redis(connection_pool=pool)
+    await cliente.ping()
+    if registros:
+        os.makedirs(registros, exist_ok=True)
+
+    vagas = asyncio.Semaphore(max_partidas)
+    ativas = {}
+    print(f"servidor: até {max_partidas} partidas, fila {FILA}")
+
+    try:
+        while True:
+            await vagas.acquire()
+            _, pedido = await cliente.blpop(FILA)
+            try:
+                id_partida, lado, jogadas, tempo, formato = ler_pedido(pedido.decode('utf-8'))
+                if id_partida in ativas:
+                    raise ValueError(f"partida {id_partida} já em andamento")
+            except ValueError as e:
+                print(f"pedido recusado: {e}", file=sys.stderr)
+                vagas.release()
+                continue
+
+            print(f"partida {id_partida}: começa com {lado}, {jogadas} jogadas, "
+                  f"tempo {tempo}, formato {formato}")
+            ativas[id_partida] = asyncio.create_task(_partida_admitida(
+                cliente, vagas, ativas, registros, id_partida, lado, jogadas, tempo, formato
+            ))
+    finally:
+        tarefas = list(ativas.values())
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        await pool.disconnect()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Formato:")
+        print("  python servidor.py servir max_partidas [ip porta registros]")
+        print("  python servidor.py partida id lado jogadas tempo [formato ip porta]")
+        sys.exit(1)
+
+    modo = sys.argv[1]
+    if modo == 'servir':
+        max_partidas = int(sys.argv[2])
+        ip = sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1"
+        porta = int(sys.argv[4]) if len(sys.argv) > 4 else 10001
+        registros = sys.argv[5] if len(sys.argv) > 5 else None
+        try:
+            asyncio.run(servir(ip, porta, max_partidas, registros))
+        except KeyboardInterrupt:
+            pass
+    else:
+        # Enfileira um pedido de partida
+        pedido = " ".join(sys.argv[2:7])
+        try:
+            ler_pedido(pedido)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            sys.exit(1)
+        ip = sys.argv[7] if len(sys.argv) > 7 else "127.0.0.1"
+        porta = int(sys.argv[8]) if len(sys.argv) > 8 else 10001
+        posicao = conexao(ip, porta).rpush(FILA, pedido)
+        print(f"pedido '{pedido}' na posição {posicao} da fila")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,261 @@
+"""
+Interface Redis entre os jogadores e o controlador
+
+O controlador publica em tabuleiro_<lado> a vez, a última jogada e o
+tabuleiro, e lê a resposta em jogada_<lado>. Há dois formatos de mensagem:
+
+    texto:   "lado\\njogada\\ntabuleiro" com o tabuleiro de 9 linhas do
+             controlador, e jogadas como "o m 3 3 4 3"
+    binário: tamanho fixo, começando pelo byte MARCADOR (as mensagens de
+             texto começam por 'o' ou 'c'):
+                 tabuleiro: marcador, lado, cachorros (31 bits, um por casa
+                            na ordem de CASAS), índice da onça, lado da
+                            jogada e código da jogada - 16 bytes
+                 jogada:    marcador, lado e código da jogada - 10 bytes
+             O código é o de jogo.codificar_movimento (0 = passar a vez).
+
+O jogador responde no formato em que recebeu o tabuleiro, então continua
+compatível com o controlador em texto; o binário só é usado quando o
+controlador é iniciado com o formato 'binario'.
+
+No servidor de várias partidas (servidor.py) as listas de cada partida
+levam o prefixo partida:<id>:, e o jogador recebe o id como argumento.
+"""
+
 import redis
+import struct
 import sys
 
+from jogo import CASAS, codificar_movimento, decodificar_movimento
+
+MARCADOR = 0xCA
+SEM_ONCA = 0xFF
+
+_TABULEIRO = struct.Struct('<BcIBcQ')  # marcador, lado, cachorros, onça, lado e código da jogada
+_JOGADA = struct.Struct('<BcQ')  # marcador, lado, código da jogada
+
+# Tabuleiro vazio no formato do controlador; a casa (l, c) fica em l * 8 + c
+_MODELO = ("#######\n"
+           "#-----#\n"
+           "#-----#\n"
+           "#-----#\n"
+           "#-----#\n"
+           "#-----#\n"
+           "# --- #\n"
+           "#- - -#\n"
+           "#######\n")
+_DESLOCAMENTOS = tuple(l * 8 + c for l, c in CASAS)
+
 redis_client = None
 lado_jogador = None
+partida = None  # Partida no servidor de várias partidas (None = controlador)
+binario = False  # Formato do último tabuleiro recebido
+
+_pools = {}
+
+
+def conexao(ip="127.0.0.1", porta=10001):
+    """
+    Cliente Redis sobre um pool de conexões compartilhado por endereço
+
+    Sem timeout de leitura no socket: um BLPOP dentro de um pipeline espera
+    o tempo que o próprio comando pedir.
+    """
+    if (ip, porta) not in _pools:
+        _pools[(ip, porta)] = redis.ConnectionPool(host=ip, port=porta, db=0,
+                                                   socket_timeout=None)
+    return redis.Redis(connection_pool=_pools[(ip, porta)])
+
+
+def chave(nome, lado, id_partida=None):
+    """
+    Chave Redis de uma lista da partida, como tabuleiro_o ou jogada_c
+
+    No servidor de várias partidas as chaves de cada uma ganham o prefixo
+    partida:<id>:.
+    """
+    if id_partida is None:
+        return f"{nome}_{lado}"
+    return f"partida:{id_partida}:{nome}_{lado}"
+
+
+def texto_para_bits(tabuleiro_str):
+    """Converte o tabuleiro do controlador em (cachorros, onça) como bitboards"""
+    linhas = tabuleiro_str.split('\n')
+    cachorros = 0
+    onca = 0
+    for i, (l, c) in enumerate(CASAS):
+        peca = linhas[l][c]
+        if peca == 'c':
+            cachorros |= 1 << i
+        elif peca == 'o':
+            onca = 1 << i
+    return cachorros, onca
+
+
+def bits_para_texto(cachorros, onca):
+    """Inverso de texto_para_bits"""
+    tab = list(_MODELO)
+    for i, desloc in enumerate(_DESLOCAMENTOS):
+        if cachorros >> i & 1:
+            tab[desloc] = 'c'
+        elif onca >> i & 1:
+            tab[desloc] = 'o'
+    return "".join(tab)
+
+
+def _codigo_jogada(jogada):
+    """Lado e código de uma jogada em texto (ValueError se não couber)"""
+    partes = jogada.split()
+    try:
+        lado, tipo = partes[0], partes[1]
+        if lado not in ('o', 'c') or tipo not in ('m', 's', 'n'):
+            raise ValueError(f"Jogada sem código binário: {jogada!r}")
+        if tipo == 'n':
+            return lado, 0
+        if tipo == 'm':
+            numeros = [int(x) for x in partes[2:6]]
+        else:
+            numeros = [int(x) for x in partes[3:3 + 2 * (int(partes[2]) + 1)]]
+        posicoes = list(zip(numeros[0::2], numeros[1::2]))
+        return lado, codificar_movimento((tipo, posicoes))
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"Jogada sem código binário: {jogada!r}") from e
+
+
+def _texto_jogada(lado, codigo):
+    """Inverso de _codigo_jogada"""
+    if codigo == 0:
+        return f"{lado} n"
+    tipo, posicoes = decodificar_movimento(codigo)
+    coords = ' '.join(f"{l} {c}" for l, c in posicoes)
+    if tipo == 'm':
+        return f"{lado} m {coords}"
+    return f"{lado} s {len(posicoes) - 1} {coords}"
+
+
+def codificar_jogada(jogada):
+    """Mensagem binária de uma jogada em texto (ValueError se não couber)"""
+    lado, codigo = _codigo_jogada(jogada)
+    return _JOGADA.pack(MARCADOR, lado.encode(), codigo)
+
+
+def codificar_tabuleiro(lado, jogada, tabuleiro_str):
+    """Mensagem binária com a vez, a última jogada e o tabuleiro do controlador"""
+    lado_jogada, codigo = _codigo_jogada(jogada)
+    cachorros, onca = texto_para_bits(tabuleiro_str)
+    indice_onca = onca.bit_length() - 1 if onca else SEM_ONCA
+    return _TABULEIRO.pack(MARCADOR, lado.encode(), cachorros, indice_onca,
+                           lado_jogada.encode(), codigo)
+
+
+def eh_binaria(mensagem):
+    """Verifica se uma mensagem recebida do Redis está no formato binário"""
+    return mensagem[:1] == bytes((MARCADOR,))
+
+
+def jogada_para_texto(mensagem):
+    """
+    Jogada recebida do Redis, em qualquer formato, como texto
+
+    Uma mensagem binária inválida vira uma string vazia, que o controlador
+    trata como jogada inválida.
+    """
+    if not eh_binaria(mensagem):
+        return mensagem.decode('utf-8')
+    try:
+        _, lado, codigo = _JOGADA.unpack(mensagem)
+        return _texto_jogada(lado.decode(), codigo)
+    except (struct.error, IndexError, UnicodeDecodeError):
+        return ""
+
+
+def _tabuleiro_para_bits(mensagem):
+    """Mensagem de tabuleiro em qualquer formato como (lado, jogada, cachorros, onça)"""
+    if eh_binaria(mensagem):
+        _, lado, cachorros, indice_onca, lado_jogada, codigo = _TABULEIRO.unpack(mensagem)
+        onca = 0 if indice_onca == SEM_ONCA else 1 << indice_onca
+        return lado.decode(), _texto_jogada(lado_jogada.decode(), codigo), cachorros, onca
+
+    lado, jogada, tabuleiro_str = mensagem.decode('utf-8').split('\n', 2)
+    return (lado, jogada) + texto_para_bits(tabuleiro_str)
+
 
 def conectar(args):
-    global redis_client, lado_jogador
+    global redis_client, lado_jogador, partida
     if len(args) < 2:
-        print("Formato: python tabuleiro.py lado [ip porta]")
+        print("Formato: python tabuleiro.py lado [ip porta partida]")
         print("  lado: 'o' para onça, 'c' para cachorro")
         print("  ip: (opcional) IP do servidor redis (padrão: 127.0.0.1)")
         print("  porta: (opcional) Porta do servidor redis (padrão: 10001)")
+        print("  partida: (opcional) id da partida no servidor.py")
         sys.exit(1)
 
     lado_jogador = args[1]
     ip = args[2] if len(args) > 2 else "127.0.0.1"
     porta = int(args[3]) if len(args) > 3 else 10001
+    partida = args[4] if len(args) > 4 else None
 
     try:
-        redis_client = redis.Redis(host=ip, port=porta, db=0)
+        redis_client = conexao(ip, porta)
         redis_client.ping()
     except redis.exceptions.ConnectionError as e:
         print(f"Erro ao conectar com o servidor redis: {e}")
         sys.exit(1)
 
+
+def _mensagem_jogada(jogada):
+    """Jogada no formato do último tabuleiro recebido"""
+    if binario:
+        try:
+            return codificar_jogada(jogada)
+        except ValueError:
+            pass  # Caminho longo demais para o código: vai em texto
+    return jogada
+
+
+def _registrar(mensagem):
+    """Guarda o formato de uma mensagem de tabuleiro recebida"""
+    global binario
+    binario = eh_binaria(mensagem)
+    return mensagem
+
+
 def enviar(jogada):
-    chave = f"jogada_{lado_jogador}"
-    redis_client.rpush(chave, jogada)
+    redis_client.rpush(chave("jogada", lado_jogador, partida), _mensagem_jogada(jogada))
+
 
 def receber():
-    chave = f"tabuleiro_{lado_jogador}"
-    _, jogada = redis_client.blpop(chave)
-    return jogada.decode('utf-8')
+    """Recebe o tabuleiro como texto "lado\\njogada\\ntabuleiro" (qualquer formato)"""
+    _, mensagem = redis_client.blpop(chave("tabuleiro", lado_jogador, partida))
+    if not eh_binaria(_registrar(mensagem)):
+        return mensagem.decode('utf-8')
+    lado, jogada, cachorros, onca = _tabuleiro_para_bits(mensagem)
+    return f"{lado}\n{jogada}\n{bits_para_texto(cachorros, onca)}"
+
+
+def receber_bits():
+    """
+    Recebe o tabuleiro já como bitboards, sem passar pelo texto no formato
+    binário
+
+    Returns:
+        Tupla (lado, jogada, cachorros, onça), com a jogada em texto e a
+        onça como máscara de um bit (0 se não houver)
+    """
+    _, mensagem = redis_client.blpop(chave("tabuleiro", lado_jogador, partida))
+    return _tabuleiro_para_bits(_registrar(mensagem))
+
+
+def enviar_e_receber_bits(jogada):
+    """
+    Envia a jogada e espera o próximo tabuleiro em uma só ida ao Redis
+
+    Returns:
+        O mesmo que receber_bits()
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.rpush(chave("jogada", lado_jogador, partida), _mensagem_jogada(jogada))
+    pipe.blpop(chave("tabuleiro", lado_jogador, partida))
+    _, (_, mensagem) = pipe.execute()
+    return _tabuleiro_para_bits(_registrar(mensagem))
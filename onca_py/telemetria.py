@@ -0,0 +1,275 @@
+"""
+Telemetria da busca - onde vão os nós e o tempo dentro do _minimax
+
+Ligada com BuscaAdversarial(telemetria=TelemetriaBusca()). A telemetria
+troca, só na instância de busca e no estado copiado na raiz, os métodos
+medidos por versões que contam e cronometram. Desligada, a busca não
+muda: o custo é um teste por chamada de melhor_movimento. Ligada, as
+medições deixam a busca mais lenta (os nós por segundo devem ser medidos
+sem ela, em desempenho.py).
+
+Por jogada (chamada de melhor_movimento) são registrados:
+    - por ply: nós, fator de ramificação (movimentos gerados por nó
+      expandido), cortes e a posição na ordenação do movimento que cortou
+      (0 = o primeiro; quanto menor, melhor a ordenação)
+    - por iteração do aprofundamento: nós e o fator de ramificação efetivo
+      (nós da iteração / nós da anterior)
+    - tempo em geração de movimentos, ordenação, avaliação e testes de fim
+      de jogo, cada um sem o tempo das medições chamadas dentro dele; o
+      restante (fazer/desfazer, tabela de transposição, quiescência) fica
+      em 'resto'. A análise da posição, que gera os movimentos da onça, é
+      guardada no estado e costuma ser feita no teste de fim de jogo.
+
+relatorio_partida() soma as jogadas; os relatórios são dicionários
+prontos para JSON. Uma busca da ponderação (ponderacao.py) fica de lado
+até o tabuleiro chegar: entra como a jogada num acerto (marcada como
+ponderada) e é descartada num erro.
+"""
+
+import json
+import time
+from collections import Counter, defaultdict
+
+CATEGORIAS = ('geracao', 'ordenacao', 'avaliacao', 'terminal')
+
+
+class _Contagem:
+    """Contadores brutos de uma jogada (ou da soma de várias)"""
+
+    def __init__(self):
+        self.tempos = dict.fromkeys(CATEGORIAS, 0.0)
+        self.tempo_total = 0.0
+        self.nos = Counter()  # Por ply
+        self.expandidos = Counter()  # Nós que geraram e ordenaram movimentos
+        self.movimentos = Counter()
+        self.cortes = Counter()
+        self.indices_corte = defaultdict(Counter)  # ply -> índice -> cortes
+        self.nos_iteracao = Counter()  # Profundidade -> nós
+        self.nos_iteracao_anterior = Counter()  # Nós da iteração anterior (para o EBF)
+
+    def somar(self, outra):
+        for categoria in CATEGORIAS:
+            self.tempos[categoria] += outra.tempos[categoria]
+        self.tempo_total += outra.tempo_total
+        self.nos.update(outra.nos)
+        self.expandidos.update(outra.expandidos)
+        self.movimentos.update(outra.movimentos)
+        self.cortes.update(outra.cortes)
+        for ply, indices in outra.indices_corte.items():
+            self.indices_corte[ply].update(indices)
+        self.nos_iteracao.update(outra.nos_iteracao)
+        self.nos_iteracao_anterior.update(outra.nos_iteracao_anterior)
+
+    def fechar_iteracoes(self):
+        """Registra, para cada iteração, os nós da anterior"""
+        for prof, nos in self.nos_iteracao.items():
+            anterior = self.nos_iteracao.get(prof - 1)
+            if anterior:
+                self.nos_iteracao_anterior[prof] = anterior
+
+    def relatorio(self):
+        """Resumo em dicionário (pronto para JSON)"""
+        tempos = {categoria: round(valor, 6) for categoria, valor in self.tempos.items()}
+        tempos['resto'] = round(max(0.0, self.tempo_total - sum(self.tempos.values())), 6)
+
+        plies = []
+        for ply in sorted(self.nos):
+            expandidos = self.expandidos[ply]
+            cortes = self.cortes[ply]
+            indices = self.indices_corte[ply]
+            plies.append({
+                'ply': ply,
+                'nos': self.nos[ply],
+                'expandidos': expandidos,
+                'ramificacao': self.movimentos[ply] / expandidos if expandidos else None,
+                'cortes': cortes,
+                'taxa_cortes': cortes / expandidos if expandidos else None,
+                'indice_medio_corte': (sum(i * n for i, n in indices.items()) / cortes
+                                       if cortes else None),
+                'cortes_por_indice': [indices[i] for i in range(max(indices, default=-1) + 1)],
+            })
+
+        iteracoes = []
+        for prof in sorted(self.nos_iteracao):
+            nos = self.nos_iteracao[prof]
+            anterior = self.nos_iteracao_anterior[prof]
+            iteracoes.append({
+                'profundidade': prof,
+                'nos': nos,
+                'ebf': nos / anterior if anterior else None,
+            })
+
+        return {
+            'tempo': round(self.tempo_total, 6),
+            'tempos': tempos,
+            'plies': plies,
+            'iteracoes': iteracoes,
+        }
+
+
+class TelemetriaBusca:
+    """Coleta a telemetria de uma BuscaAdversarial, jogada a jogada"""
+
+    def __init__(self):
+        self.jogadas = []  # Relatório de cada jogada, em ordem
+        self._total = _Contagem()
+        self._atual = _Contagem()  # Contagem da jogada em andamento
+        self._filhos = []  # Tempo das medições internas, por nível de aninhamento
+        self._ponderando = False
+        self._ponderada = None  # (contagem, relatório) da busca ponderada
+
+    def instrumentar(self, busca):
+        """Troca os métodos medidos da instância de busca (feito pelo construtor)"""
+        busca.melhor_movimento = self._jogada(busca, busca.melhor_movimento)
+        busca._iteracao_raiz = self._iteracao(busca, busca._iteracao_raiz)
+        busca._minimax = self._no(busca._minimax)
+        busca._registrar_corte = self._corte(busca._registrar_corte)
+        busca._ordenar_movimentos = self._cronometrar(
+            'ordenacao', self._ramificacao(busca._ordenar_movimentos)
+        )
+        busca._avaliar = self._cronometrar('avaliacao', busca._avaliar)
+
+    def instrumentar_estado(self, estado):
+        """Troca os métodos medidos do estado percorrido pela busca"""
+        estado.gerar_movimentos = self._cronometrar('geracao', estado.gerar_movimentos)
+        estado.eh_terminal = self._cronometrar('terminal', estado.eh_terminal)
+
+    def _cronometrar(self, categoria, funcao):
+        """Soma em categoria o tempo de funcao sem o das medições internas"""
+        filhos = self._filhos
+
+        def medida(*args):
+            filhos.append(0.0)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args)
+            finally:
+                decorrido = time.perf_counter() - inicio
+                self._atual.tempos[categoria] += decorrido - filhos.pop()
+                if filhos:
+                    filhos[-1] += decorrido
+        return medida
+
+    def _no(self, minimax):
+        def medido(estado, profundidade, alfa, beta, maximizando, lado_max, ply=1):
+            self._atual.nos[ply] += 1
+            return minimax(estado, profundidade, alfa, beta, maximizando, lado_max, ply)
+        return medido
+
+    def _ramificacao(self, ordenar):
+        def medido(estado, lado, movimentos, mov_tt=None, ply=None):
+            # A raiz e a quiescência ordenam sem ply
+            if ply is not None:
+                self._atual.expandidos[ply] += 1
+                self._atual.movimentos[ply] += len(movimentos)
+            return ordenar(estado, lado, movimentos, mov_tt, ply)
+        return medido
+
+    def _corte(self, registrar):
+        def medido(lado, movimento, profundidade, ply, indice):
+            self._atual.cortes[ply] += 1
+            self._atual.indices_corte[ply][indice] += 1
+            return registrar(lado, movimento, profundidade, ply, indice)
+        return medido
+
+    def _iteracao(self, busca, iteracao_raiz):
+        def medida(estado, lado, prof, movimentos, alfa, beta):
+            antes = busca.nos_explorados
+            try:
+                return iteracao_raiz(estado, lado, prof, movimentos, alfa, beta)
+            finally:
+                # Repetições da janela de aspiração somam na mesma iteração
+                self._atual.nos_iteracao[prof] += busca.nos_explorados - antes
+        return medida
+
+    def _jogada(self, busca, melhor_movimento):
+        def medida(estado, lado):
+            self._atual = _Contagem()
+            self._filhos.clear()
+            inicio = time.perf_counter()
+            movimento = None
+            try:
+                movimento = melhor_movimento(estado, lado)
+                return movimento
+            finally:
+                contagem = self._atual
+                contagem.tempo_total = time.perf_counter() - inicio
+                contagem.fechar_iteracoes()
+
+                relatorio = contagem.relatorio()
+                relatorio.update({
+                    'lado': lado,
+                    'movimento': (estado.movimento_para_string(lado, movimento)
+                                  if movimento else None),
+                    'nos': busca.nos_explorados,
+                    'nos_quiescencia': busca.nos_quiescencia,
+                    'profundidade': busca.profundidade_completa,
+                    'ramificacao_raiz': len(estado.gerar_movimentos(lado)),
+                    'ponderada': self._ponderando,
+                })
+                if self._ponderando:
+                    self._ponderada = (contagem, relatorio)
+                else:
+                    self._registrar(contagem, relatorio)
+        return medida
+
+    def _registrar(self, contagem, relatorio):
+        """Conta uma busca como jogada da partida"""
+        self._total.somar(contagem)
+        relatorio['jogada'] = len(self.jogadas) + 1
+        self.jogadas.append(relatorio)
+
+    def iniciar_ponderacao(self):
+        """A próxima busca é ponderada: só entra na partida se for aceita"""
+        self._ponderando = True
+        self._ponderada = None
+
+    def aceitar_ponderacao(self):
+        """Acerto: a busca ponderada (já terminada) é a busca da jogada"""
+        self._ponderando = False
+        if self._ponderada is not None:
+            self._registrar(*self._ponderada)
+        self._ponderada = None
+
+    def descartar_ponderacao(self):
+        """Erro: a busca ponderada era de uma posição que não aconteceu"""
+        self._ponderando = False
+        self._ponderada = None
+
+    def relatorio_jogada(self):
+        """Relatório da última jogada (None se ainda não houve busca)"""
+        return self.jogadas[-1] if self.jogadas else None
+
+    def relatorio_partida(self):
+        """Soma de todas as jogadas, com os relatórios de cada uma"""
+        relatorio = self._total.relatorio()
+        relatorio.update({
+            'jogadas': len(self.jogadas),
+            'nos': sum(jogada['nos'] for jogada in self.jogadas),
+            'por_jogada': self.jogadas,
+        })
+        return relatorio
+
+    def gravar(self, caminho):
+        """Grava o relatório da partida em JSON"""
+        with open(caminho, 'w') as arquivo:
+            json.dump(self.relatorio_partida(), arquivo, indent=1)
+
+
+def resumo(relatorio):
+    """Linhas de texto com o essencial de um relatório (jogada ou partida)"""
+    tempo = relatorio['tempo'] or 1.0
+    linhas = ["Tempo: " + ", ".join(
+        f"{categoria} {valor / tempo:.0%}" for categoria, valor in relatorio['tempos'].items()
+    )]
+    for ply in relatorio['plies']:
+        linha = f"  ply {ply['ply']:2}: {ply['nos']:7} nós"
+        if ply['ramificacao'] is not None:
+            linha += f", ramificação {ply['ramificacao']:4.1f}, cortes {ply['taxa_cortes']:.0%}"
+        if ply['indice_medio_corte'] is not None:
+            linha += f" (índice médio {ply['indice_medio_corte']:.2f})"
+        linhas.append(linha)
+    ebfs = [f"{it['profundidade']}:{it['ebf']:.1f}" for it in relatorio['iteracoes'] if it['ebf']]
+    if ebfs:
+        linhas.append("EBF por iteração: " + " ".join(ebfs))
+    return linhas
@@ -0,0 +1,85 @@
+"""
+Tabela de transposição para a busca adversarial
+
+Guarda, para cada posição já analisada (chave Zobrist), a profundidade da
+análise, o tipo de limite do valor, o valor e o melhor movimento encontrado.
+"""
+
+# Tipos de limite do valor armazenado
+EXATO = 0
+LIMITE_INFERIOR = 1  # Valor >= armazenado (houve corte beta)
+LIMITE_SUPERIOR = 2  # Valor <= armazenado (nenhum movimento superou alfa)
+
+# Estimativa de memória de uma entrada (tupla + inteiros + slot da lista)
+BYTES_POR_ENTRADA = 160
+
+
+class TabelaTransposicao:
+    """
+    Tabela de transposição de tamanho fixo com dois slots por balde
+
+    O primeiro slot prefere a análise mais profunda (só é substituído por
+    outra de profundidade maior ou igual, ou se for de uma busca anterior);
+    o segundo é sempre substituído. Cada entrada é a tupla
+    (chave, profundidade, tipo, valor, movimento, geracao).
+    """
+
+    def __init__(self, memoria_mb=32):
+        """
+        Args:
+            memoria_mb: Limite aproximado de memória da tabela em megabytes
+        """
+        self.num_baldes = max(1, int(memoria_mb * 1024 * 1024) // (2 * BYTES_POR_ENTRADA))
+        self.geracao = 0
+        self.consultas = 0
+        self.acertos = 0
+        self.limpar()
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        self._profundas = [None] * self.num_baldes
+        self._recentes = [None] * self.num_baldes
+
+    def nova_busca(self):
+        """Marca o início de uma nova busca, envelhecendo as entradas atuais"""
+        self.geracao += 1
+        self.consultas = 0
+        self.acertos = 0
+
+    def consultar(self, chave):
+        """Retorna a entrada da chave ou None se não estiver na tabela"""
+        self.consultas += 1
+        balde = chave % self.num_baldes
+
+        entrada = self._profundas[balde]
+        if entrada is not None and entrada[0] == chave:
+            self.acertos += 1
+            return entrada
+
+        entrada = self._recentes[balde]
+        if entrada is not None and entrada[0] == chave:
+            self.acertos += 1
+            return entrada
+
+        return None
+
+    def gravar(self, chave, profundidade, tipo, valor, movimento):
+        """Grava uma análise usando a política profundidade/sempre-substitui"""
+        balde = chave % self.num_baldes
+        entrada = (chave, profundidade, tipo, valor, movimento, self.geracao)
+
+        atual = self._profundas[balde]
+        if (atual is None or atual[0] == chave or profundidade >= atual[1]
+                or atual[5] != self.geracao):
+            # A entrada deslocada ainda pode ser útil no slot sempre-substitui
+            if atual is not None and atual[0] != chave:
+                self._recentes[balde] = atual
+            self._profundas[balde] = entrada
+        else:
+            self._recentes[balde] = entrada
+
+    def ocupacao(self):
+        """Fração dos slots ocupados"""
+        ocupados = sum(1 for e in self._profundas if e is not None)
+        ocupados += sum(1 for e in self._recentes if e is not None)
+        return ocupados / (2 * self.num_baldes)